@@ -8,7 +8,7 @@ def main():
     dag = sim.generate_dag(isolated_ratio=0.2)
 
     # 2. 初始化环境
-    env = SchedulingEnv(dag)
+    env = SchedulingEnv(dag, event_driven=True)
     obs = env.reset()
 
     # 3. 打印初始状态
@@ -22,8 +22,8 @@ def main():
     while not done:
         avail = env.get_avail_actions()
         if not avail:
-            print("当前无可调度任务，时间推进...")
-            env._tick()
+            print("当前无可调度任务，推进到下一个任务完成时刻...")
+            env.advance()
             continue
 
         action = avail[0]
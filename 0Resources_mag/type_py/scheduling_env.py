@@ -1,14 +1,18 @@
 from pprint import pprint
 from task_simulator import TaskSimulator 
+import heapq
 import random
+from collections import Counter
 
 class SchedulingEnv:
-    def __init__(self, dag, resource_pool=None, max_time=50):
+    def __init__(self, dag, resource_pool=None, max_time=50, event_driven=False, availability=None):
         self.task_graph = dag["tasks"]
         self.edges = dag["edges"]
         self.num_tasks = len(self.task_graph)
         self.max_time = max_time
         self.time = 0
+        # event_driven=True 时，step 之后若没有可调度任务，直接跳到下一个任务完成时刻
+        self.event_driven = event_driven
 
         # 默认资源池
         self.resources = resource_pool or {
@@ -17,11 +21,18 @@ class SchedulingEnv:
             "QPU": 1
         }
 
+        # 资源健康事件 (时刻, 资源类型, 槽位编号, 是否在线)，按时刻排序；
+        # 可用 mag_rl/resource_health.py 的 ResourceAvailability.events，构造时过滤一次
+        self.health_events = []
+        if availability is not None:
+            self.health_events = [(t, r, i, online) for t, r, i, online in availability.events
+                                  if r in self.resources and i < self.resources[r]]
+
+        # 子任务邻接表（CSR）：child_idx[child_ptr[i]:child_ptr[i + 1]] 为任务 i 的子任务
+        self.child_ptr, self.child_idx = self._build_children()
+
         # 初始化状态
-        self.resource_status = {r: [0] * self.resources[r] for r in self.resources}
-        self.task_status = ["waiting"] * self.num_tasks  # waiting, running, done
-        self.remaining_time = [0] * self.num_tasks
-        self.in_degrees = self._compute_in_degrees()
+        self._init_state()
 
     def _compute_in_degrees(self):
         in_deg = [0] * self.num_tasks
@@ -29,12 +40,43 @@ class SchedulingEnv:
             in_deg[v] += 1
         return in_deg
 
-    def reset(self):
-        self.time = 0
+    def _build_children(self):
+        counts = [0] * self.num_tasks
+        for u, v in self.edges:
+            counts[u] += 1
+        child_ptr = [0] * (self.num_tasks + 1)
+        for i in range(self.num_tasks):
+            child_ptr[i + 1] = child_ptr[i] + counts[i]
+        child_idx = [0] * len(self.edges)
+        fill = child_ptr[:-1]
+        for u, v in self.edges:
+            child_idx[fill[u]] = v
+            fill[u] += 1
+        return child_ptr, child_idx
+
+    def _init_state(self):
         self.resource_status = {r: [0] * self.resources[r] for r in self.resources}
-        self.task_status = ["waiting"] * self.num_tasks
+        self.free_slots = dict(self.resources)  # 每种资源的空闲槽位数
+        # 每种资源在线空闲槽位编号的小顶堆：分配取编号最小的空闲槽位，O(log n)，不再线性扫描
+        self.free_heap = {r: list(range(self.resources[r])) for r in self.resources}
+        self.task_status = ["waiting"] * self.num_tasks  # waiting, running, done
         self.remaining_time = [0] * self.num_tasks
         self.in_degrees = self._compute_in_degrees()
+        # 就绪集合：等待中且入度为 0 的任务
+        self.ready = {i for i in range(self.num_tasks) if self.in_degrees[i] == 0}
+        self.running = set()
+        self.events = []  # (完成时刻, task_id) 小顶堆
+        self.task_slots = {}  # 运行中任务占用的 [(资源类型, 槽位编号)]
+        self.offline = {r: [False] * self.resources[r] for r in self.resources}
+        self.requeued = 0
+        self.health_pos = 0
+        self.next_health = self.health_events[0][0] if self.health_events else float("inf")
+        if self.next_health <= self.time:
+            self._apply_health()
+
+    def reset(self):
+        self.time = 0
+        self._init_state()
         return self.get_obs()
 
     def step(self, task_id):
@@ -45,56 +87,112 @@ class SchedulingEnv:
 
         task = self.task_graph[task_id]
         resources_needed = task["need"]
-        assigned = []
 
-        # 分配资源
+        # 成组分配：need 中的每一项（可重复）都有空闲槽位才分配，不会只占用一部分
+        if any(self.free_slots.get(r, 0) < k for r, k in Counter(resources_needed).items()):
+            return self.get_obs(), -3, False  # penalize if resources not available
+        assigned = []
         for r in resources_needed:
-            slots = self.resource_status[r]
-            found = False
-            for i in range(len(slots)):
-                if slots[i] == 0:
-                    slots[i] = task["duration"]
-                    assigned.append((r, i))
-                    found = True
-                    break
-            if not found:
-                return self.get_obs(), -3, False  # penalize if resources not available
+            i = heapq.heappop(self.free_heap[r])
+            self.resource_status[r][i] = task["duration"]
+            self.free_slots[r] -= 1
+            assigned.append((r, i))
 
         # 启动任务
         self.task_status[task_id] = "running"
         self.remaining_time[task_id] = task["duration"]
+        self.ready.discard(task_id)
+        self.running.add(task_id)
+        self.task_slots[task_id] = assigned
+        heapq.heappush(self.events, (self.time + task["duration"], task_id))
         reward += 5  # 正常调度得分
 
         # 模拟时间前进一小步
         self._tick()
 
+        # 事件驱动：跳过没有可调度任务的空闲时间
+        if self.event_driven:
+            while (self.events or self.next_health != float("inf")) and not self.get_avail_actions() \
+                    and not all(s == "done" for s in self.task_status):
+                self.advance()
+
         done = all(s == "done" for s in self.task_status)
         return self.get_obs(), reward, done
 
-    def _tick(self):
-        self.time += 1
-
-        # 更新资源状态
-        for r in self.resource_status:
-            for i in range(len(self.resource_status[r])):
-                if self.resource_status[r][i] > 0:
-                    self.resource_status[r][i] -= 1
-
-        # 更新任务状态
-        for i in range(self.num_tasks):
-            if self.task_status[i] == "running":
-                self.remaining_time[i] -= 1
-                if self.remaining_time[i] == 0:
-                    self.task_status[i] = "done"
-                    for u, v in self.edges:
-                        if u == i:
-                            self.in_degrees[v] -= 1
+    def _tick(self, dt=1):
+        self.time += dt
+
+        # 只更新运行中任务占用的槽位与剩余时间；槽位在任务完成时释放
+        for i in self.running:
+            self.remaining_time[i] = max(0, self.remaining_time[i] - dt)
+            for r, k in self.task_slots[i]:
+                self.resource_status[r][k] = max(0, self.resource_status[r][k] - dt)
+
+        # 处理已经发生的完成事件，只更新完成任务的子任务入度
+        while self.events and self.events[0][0] <= self.time:
+            _, i = heapq.heappop(self.events)
+            self.running.discard(i)
+            self._release(self.task_slots.pop(i))
+            self.task_status[i] = "done"
+            for v in self.child_idx[self.child_ptr[i]:self.child_ptr[i + 1]]:
+                self.in_degrees[v] -= 1
+                if self.in_degrees[v] == 0 and self.task_status[v] == "waiting":
+                    self.ready.add(v)
+
+        if self.time >= self.next_health:
+            self._apply_health()
+
+    def _apply_health(self):
+        """应用到当前时刻为止的槽位上下线事件；离线槽位上运行的任务中止并重新排队（故障恢复）。"""
+        while self.health_pos < len(self.health_events) and self.health_events[self.health_pos][0] <= self.time:
+            _, r, i, online = self.health_events[self.health_pos]
+            self.health_pos += 1
+            if self.offline[r][i] != online:
+                continue
+            self.offline[r][i] = not online
+            if online:
+                self.free_slots[r] += 1
+                heapq.heappush(self.free_heap[r], i)
+                continue
+            busy = [task_id for task_id, assigned in self.task_slots.items() if (r, i) in assigned]
+            for task_id in busy:
+                self._requeue(task_id)  # 槽位已标记离线，不会放回空闲堆
+            if not busy:
+                self.free_slots[r] -= 1
+                self.free_heap[r].remove(i)  # 下线很少发生，直接从堆中删除
+                heapq.heapify(self.free_heap[r])
+        if self.health_pos < len(self.health_events):
+            self.next_health = self.health_events[self.health_pos][0]
+        else:
+            self.next_health = float("inf")
+
+    def _release(self, assigned):
+        for r, i in assigned:
+            self.resource_status[r][i] = 0
+            if not self.offline[r][i]:
+                self.free_slots[r] += 1
+                heapq.heappush(self.free_heap[r], i)
+
+    def _requeue(self, task_id):
+        self._release(self.task_slots.pop(task_id))
+        self.running.discard(task_id)
+        self.events = [e for e in self.events if e[1] != task_id]
+        heapq.heapify(self.events)
+        self.task_status[task_id] = "waiting"
+        self.remaining_time[task_id] = 0
+        self.ready.add(task_id)
+        self.requeued += 1
+
+    def advance(self):
+        """直接推进到下一个任务完成或槽位上下线的时刻；都没有时推进 1 个单位。"""
+        target = min(self.events[0][0] if self.events else float("inf"), self.next_health)
+        dt = target - self.time if target != float("inf") else 1
+        self._tick(max(dt, 1))
 
     def is_task_ready(self, task_id):
         return (
-            self.task_status[task_id] == "waiting" and
-            self.in_degrees[task_id] == 0 and
-            all(any(slot == 0 for slot in self.resource_status[r]) for r in self.task_graph[task_id]["need"])
+            task_id in self.ready and
+            all(self.free_slots.get(r, 0) > 0 for r in self.task_graph[task_id]["need"])
         )
 
     def get_obs(self):
@@ -114,8 +212,9 @@ class SchedulingEnv:
         return {
             "time": self.time,
             "tasks": task_info,
-            "resource_status": self.resource_status
+            "resource_status": self.resource_status,
+            "offline": self.offline
         }
 
     def get_avail_actions(self):
-        return [i for i in range(self.num_tasks) if self.is_task_ready(i)]
\ No newline at end of file
+        return [i for i in sorted(self.ready) if self.is_task_ready(i)]
\ No newline at end of file
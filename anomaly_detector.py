@@ -0,0 +1,430 @@
+"""在线多通道异常检测：滚动鲁棒 z-score + 半空间树（流式 isolation forest）+ 通道间相关性检查。
+
+    det = StreamingAnomalyDetector()                 # 通道与先验取自 correlation.csv
+    result = det.process(X)                          # X: (k, C) 对齐后的多通道样本
+    frame = det.process_frame(resample_run(run_dir)) # 或直接处理 resampler 的输出
+
+    bridge = SchedulerAlertBridge(env)               # 告警时 env.hold_resource("QPU")，恢复后 release
+    det.listeners.append(bridge)
+
+databases/processed_data/correlation.csv 实际保存的是各通道的 describe() 统计量
+（count / mean / std / min / 四分位数 / max），不是相关矩阵。这里用它给出先验：
+中位数与 IQR 作为鲁棒 z-score 在滚动窗口填满前的中心和尺度，mean / std 作为
+指数加权协方差的初值；通道间相关系数本身在线学习。
+
+每个样本的代价与历史长度无关：
+    鲁棒 z     最近 window 个样本的中位数 / MAD，每 refresh 个样本重算一次（均摊 O(window log window / refresh)）
+    半空间树   n_trees 棵深度 depth 的树，每个样本 O(n_trees * depth)；质量窗口长 hst_window
+    相关性     指数加权均值与协方差，|rho| >= min_rho 的通道对上检查标准化残差
+状态按 refresh 个样本为一段推进：段内样本用段开始时的状态打分，段结束后更新状态。
+process 内部按全局段边界切分输入，所以结果与调用方如何分批无关（逐样本调用也一样）。
+"""
+import asyncio
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+STATS_PATH = "databases/processed_data/correlation.csv"
+
+# 告警原因位掩码
+ZSCORE, HST, CORRELATION = 1, 2, 4
+REASONS = {ZSCORE: "zscore", HST: "half_space_trees", CORRELATION: "correlation"}
+
+
+def load_channel_stats(path=STATS_PATH):
+    """correlation.csv -> index 为通道名、列为 describe() 统计量的表。"""
+    return pd.read_csv(path, index_col=0).T
+
+
+class RollingRobustZ:
+    def __init__(self, median, scale, window=256, refresh=32, min_samples=32, min_rel_scale=0.05):
+        self.window = window
+        self.min_rel_scale = min_rel_scale
+        self.min_scale = np.asarray(scale, dtype=np.float64) * 1e-3
+        self.refresh = refresh
+        self.min_samples = min_samples
+        self.median = np.asarray(median, dtype=np.float64).copy()
+        self.scale = np.asarray(scale, dtype=np.float64).copy()
+        self.buffer = np.full((window, len(self.median)), np.nan)
+        self.pos = 0
+        self.count = 0
+
+    def score(self, X):
+        z = (X - self.median) / self.scale
+        return np.nan_to_num(z, nan=0.0)
+
+    def update(self, X):
+        idx = (self.pos + np.arange(len(X))) % self.window
+        self.buffer[idx] = X
+        self.pos = (self.pos + len(X)) % self.window
+        self.count += len(X)
+        if self.count >= self.min_samples and self.count % self.refresh == 0:
+            valid = (~np.isnan(self.buffer)).sum(axis=0) >= self.min_samples
+            if valid.any():
+                with np.errstate(all="ignore"):
+                    median = np.nanmedian(self.buffer[:, valid], axis=0)
+                    mad = np.nanmedian(np.abs(self.buffer[:, valid] - median), axis=0)
+                self.median[valid] = median
+                # 量化严重或近乎恒定的通道 MAD 很小甚至为 0：尺度下限取 |中位数| 的 min_rel_scale 倍
+                floor = np.maximum(self.min_rel_scale * np.abs(median), self.min_scale[valid])
+                self.scale[valid] = np.maximum(1.4826 * mad, floor)
+
+
+class HalfSpaceTrees:
+    """Tan, Ting & Liu (2011) 的流式半空间树。输入特征需在 [0, 1]^dim 内。
+
+    分数为样本落到的第一个质量不足 size_limit 的节点（或叶子）的参考质量 * 2^深度，
+    越小越异常。参考质量来自上一个完整的 window，当前 window 的质量只累积不参与打分。
+    """
+
+    def __init__(self, dim, n_trees=25, depth=8, window=256, size_limit=None, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_trees, self.depth, self.window = n_trees, depth, window
+        self.size_limit = 0.1 * window if size_limit is None else size_limit
+        num_internal = 2 ** depth - 1
+        self.split_dim = np.empty((n_trees, num_internal), dtype=np.int64)
+        self.split_val = np.empty((n_trees, num_internal))
+        for t in range(n_trees):
+            # 工作空间：以随机点为中心、向两侧各扩展 2 * max(s, 1 - s)
+            s = rng.random(dim)
+            half = 2 * np.maximum(s, 1 - s)
+            lo, hi = np.empty((num_internal, dim)), np.empty((num_internal, dim))
+            lo[0], hi[0] = s - half, s + half
+            for node in range(num_internal):
+                q = rng.integers(dim)
+                mid = (lo[node, q] + hi[node, q]) / 2
+                self.split_dim[t, node], self.split_val[t, node] = q, mid
+                for child, side in ((2 * node + 1, "left"), (2 * node + 2, "right")):
+                    if child < num_internal:
+                        lo[child], hi[child] = lo[node], hi[node]
+                        if side == "left":
+                            hi[child, q] = mid
+                        else:
+                            lo[child, q] = mid
+        num_nodes = 2 ** (depth + 1) - 1
+        self.ref_mass = np.zeros((n_trees, num_nodes))
+        self.latest_mass = np.zeros((n_trees, num_nodes))
+        self.count = 0
+        self.ready = False  # 至少完成一个参考窗口后分数才有意义
+        self._trees = np.arange(n_trees)
+        self._depth_weight = 2.0 ** np.arange(depth + 1)
+
+    def _paths(self, X):
+        """(k, n_trees, depth + 1) 的节点路径。"""
+        node = np.zeros((len(X), self.n_trees), dtype=np.int64)
+        paths = [node]
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            dim = self.split_dim[self._trees, node]
+            right = X[rows, dim] > self.split_val[self._trees, node]
+            node = 2 * node + 1 + right
+            paths.append(node)
+        return np.stack(paths, axis=2)
+
+    def score(self, X, paths=None):
+        paths = self._paths(X) if paths is None else paths
+        mass = self.ref_mass[self._trees[None, :, None], paths]
+        small = mass < self.size_limit
+        small[..., -1] = True  # 叶子
+        level = small.argmax(axis=2)
+        node_mass = np.take_along_axis(mass, level[..., None], axis=2)[..., 0]
+        return (node_mass * self._depth_weight[level]).sum(axis=1)
+
+    def update(self, X, paths=None):
+        """X 不得跨越窗口边界（由调用方按段切分）。返回本次是否完成了一个窗口。"""
+        paths = self._paths(X) if paths is None else paths
+        trees = np.broadcast_to(self._trees[None, :, None], paths.shape)
+        np.add.at(self.latest_mass, (trees.ravel(), paths.ravel()), 1)
+        self.count += len(X)
+        if self.count % self.window == 0:
+            self.ref_mass, self.latest_mass = self.latest_mass, self.ref_mass
+            self.latest_mass[:] = 0
+            self.ready = True
+            return True
+        return False
+
+
+class EWCorrelation:
+    def __init__(self, mean, std, alpha=0.005, min_rho=0.9, warmup=512):
+        self.alpha, self.min_rho, self.warmup = alpha, min_rho, warmup
+        self.mean = np.asarray(mean, dtype=np.float64).copy()
+        std = np.asarray(std, dtype=np.float64)
+        self.cov = np.diag(np.where(std > 0, std, 1.0) ** 2)
+        self.count = 0
+        self._pairs = None
+
+    def _refresh_pairs(self):
+        sd = np.sqrt(np.maximum(np.diag(self.cov), 1e-12))
+        rho = self.cov / np.outer(sd, sd)
+        i, j = np.triu_indices(len(sd), k=1)
+        keep = np.abs(rho[i, j]) >= self.min_rho
+        self._pairs = (i[keep], j[keep], rho[i, j][keep], sd)
+
+    def score(self, X):
+        """被强相关通道“预测”后的最大标准化残差（k,）；预热期或无强相关通道对时为 0。"""
+        if self.count < self.warmup or self._pairs is None or not len(self._pairs[0]):
+            return np.zeros(len(X))
+        i, j, rho, sd = self._pairs
+        u = np.nan_to_num((X - self.mean) / sd, nan=0.0)
+        residual = (u[:, i] - rho * u[:, j]) / np.sqrt(np.maximum(1 - rho ** 2, 1e-6))
+        return np.abs(residual).max(axis=1)
+
+    def update(self, X):
+        # 段内按逐样本指数加权的权重一次性合并（缺失值按当前均值处理）
+        X = np.where(np.isnan(X), self.mean, X)
+        k = len(X)
+        w = self.alpha * (1 - self.alpha) ** np.arange(k - 1, -1, -1)
+        total = w.sum()
+        new_mean = (1 - total) * self.mean + w @ X
+        shift = self.mean - new_mean
+        centered = X - new_mean
+        self.cov = (1 - total) * (self.cov + np.outer(shift, shift)) + (centered * w[:, None]).T @ centered
+        self.mean = new_mean
+        self.count += k
+        if self.count >= self.warmup:
+            self._refresh_pairs()
+
+
+class StreamingAnomalyDetector:
+    def __init__(self, columns=None, stats_path=STATS_PATH, z_threshold=6.0, hst_ratio=0.2,
+                 corr_threshold=6.0, window=256, refresh=32, n_trees=25, depth=8, hst_window=256,
+                 min_rho=0.9, corr_alpha=0.005, seed=0):
+        if hst_window % refresh:
+            raise ValueError("hst_window must be a multiple of refresh")
+        stats = load_channel_stats(stats_path)
+        self.columns = list(columns) if columns is not None else list(stats.index)
+        stats = stats.reindex(self.columns)
+        median = stats["50%"].fillna(0.0).to_numpy()
+        iqr_scale = ((stats["75%"] - stats["25%"]) / 1.349).to_numpy()
+        scale = np.where(iqr_scale > 0, iqr_scale, np.maximum(np.abs(median) * 1e-3, 1e-9))
+        scale = np.nan_to_num(scale, nan=1.0)
+
+        self.z_threshold, self.hst_ratio, self.corr_threshold = z_threshold, hst_ratio, corr_threshold
+        self.refresh = refresh
+        self.robust = RollingRobustZ(median, scale, window, refresh)
+        self.hst = HalfSpaceTrees(len(self.columns), n_trees, depth, hst_window, seed=seed)
+        self.corr = EWCorrelation(stats["mean"].fillna(0.0).to_numpy(), stats["std"].fillna(1.0).to_numpy(),
+                                  corr_alpha, min_rho)
+        self.expected_hst = None  # 上一个完整窗口的平均 HST 分数
+        self._window_scores = []
+        self._corr_pending = []  # 当前段内尚未并入相关性状态的样本
+        self.count = 0
+        self.listeners = []  # 每次 process 后以结果字典调用
+
+    def process(self, X, times=None):
+        """X: (k, C)，列顺序同 self.columns。返回各项分数与 alert / reasons 数组。"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        k = len(X)
+        z_max = np.empty(k)
+        z_channel = np.empty(k, dtype=np.int64)
+        hst_score = np.empty(k)
+        hst_ratio = np.full(k, np.nan)
+        corr_max = np.empty(k)
+
+        start = 0
+        while start < k:
+            stop = min(k, start + self.refresh - self.count % self.refresh)
+            seg = X[start:stop]
+            z = self.robust.score(seg)
+            az = np.abs(z)
+            z_channel[start:stop] = az.argmax(axis=1)
+            z_max[start:stop] = az.max(axis=1)
+            features = np.clip(z, -6.0, 6.0) / 12.0 + 0.5
+            paths = self.hst._paths(features)
+            if self.hst.ready:
+                hst_score[start:stop] = self.hst.score(features, paths)
+                if self.expected_hst:
+                    hst_ratio[start:stop] = hst_score[start:stop] / self.expected_hst
+                self._window_scores.append(hst_score[start:stop].sum())
+            else:
+                hst_score[start:stop] = np.nan
+            corr_max[start:stop] = self.corr.score(seg)
+
+            self.robust.update(seg)
+            if self.hst.update(features, paths) and self._window_scores:
+                self.expected_hst = sum(self._window_scores) / self.hst.window
+                self._window_scores = []
+            self._corr_pending.append(seg)
+            self.count += len(seg)
+            if self.count % self.refresh == 0:
+                self.corr.update(np.concatenate(self._corr_pending))
+                self._corr_pending = []
+            start = stop
+
+        reasons = np.zeros(k, dtype=np.int8)
+        reasons[z_max > self.z_threshold] |= ZSCORE
+        with np.errstate(invalid="ignore"):
+            reasons[hst_ratio < self.hst_ratio] |= HST
+        reasons[corr_max > self.corr_threshold] |= CORRELATION
+        result = {
+            "z_max": z_max, "z_channel": z_channel, "hst_score": hst_score, "hst_ratio": hst_ratio,
+            "corr_max": corr_max, "reasons": reasons, "alert": reasons != 0,
+        }
+        if times is not None:
+            result["time"] = np.asarray(times)
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    def process_frame(self, frame):
+        """frame: index 为时间、列为通道名（如 resample_run 的输出），缺少的通道视为缺失值。"""
+        X = frame.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        result = self.process(X, frame.index.to_numpy())
+        out = pd.DataFrame({key: value for key, value in result.items() if key != "time"}, index=frame.index)
+        out["z_channel"] = np.asarray(self.columns)[out["z_channel"].to_numpy()]
+        return out
+
+
+class SchedulerAlertBridge:
+    """把告警转成调度器上的资源暂停：出现告警即 hold，连续 clear_after 个正常样本后 release。
+
+    target 需要提供 hold_resource(rtype) / release_resource(rtype)，例如
+    SingleAgentSchedulingEnv 或 SchedulingService。SchedulingService.release_resource 是协程：
+    检测器在同一个事件循环中运行时作为任务调度；在其他线程中运行时传入服务所在的 loop，
+    hold / release 用 run_coroutine_threadsafe 交给该循环执行。release 后新开始的任务 {job: placements}
+    交给 on_placements（服务本身也会推送给各作业的提交方）；失败的操作记录在 errors 中。
+    await bridge.wait() 等待已提交的操作全部完成。
+    """
+
+    def __init__(self, target, resource="QPU", clear_after=10, on_placements=None, loop=None):
+        self.target = target
+        self.resource = resource
+        self.clear_after = clear_after
+        self.on_placements = on_placements
+        self.loop = loop
+        self.held = False
+        self.quiet = 0
+        self.events = []  # (样本时间或序号, "hold" / "release")
+        self.seen = 0
+        self.pending = set()  # 尚未完成的 release
+        self.errors = []
+
+    def __call__(self, result):
+        alert = result["alert"]
+        times = result.get("time")
+        # 只在状态可能变化的位置逐样本检查：未 hold 时找第一个告警，hold 时找足够长的安静段
+        i = 0
+        n = len(alert)
+        while i < n:
+            if not self.held:
+                hits = np.flatnonzero(alert[i:])
+                if not len(hits):
+                    break
+                i += int(hits[0])
+                self._set(True, times[i] if times is not None else self.seen + i)
+                self.quiet = 0
+                i += 1
+            else:
+                if alert[i]:
+                    self.quiet = 0
+                else:
+                    self.quiet += 1
+                    if self.quiet >= self.clear_after:
+                        self._set(False, times[i] if times is not None else self.seen + i)
+                i += 1
+        self.seen += n
+
+    def _set(self, held, when):
+        action = self.target.hold_resource if held else self.target.release_resource
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self.loop is not None and self.loop is not running:
+            # 检测器在其他线程：hold / release 整个交给服务所在的事件循环执行
+            self._track(asyncio.run_coroutine_threadsafe(self._apply(action), self.loop))
+        else:
+            outcome = action(self.resource)
+            if asyncio.iscoroutine(outcome):
+                if running is None:
+                    outcome.close()
+                    raise RuntimeError("target returned a coroutine but no event loop is running; pass loop=")
+                self._track(running.create_task(outcome))
+            elif outcome and self.on_placements is not None:
+                self.on_placements(outcome)
+        self.held = held
+        self.events.append((when, "hold" if held else "release"))
+
+    async def _apply(self, action):
+        outcome = action(self.resource)
+        return await outcome if asyncio.iscoroutine(outcome) else outcome
+
+    def _track(self, future):
+        self.pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.pending.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+        elif future.result() and self.on_placements is not None:
+            self.on_placements(future.result())
+
+    async def wait(self):
+        """等待已提交的 release 全部完成。"""
+        for future in list(self.pending):
+            await (future if isinstance(future, asyncio.Future) else asyncio.wrap_future(future))
+
+
+class AnomalySink:
+    """stream_pipeline 的 sink：把各传感器的长表数据对齐到 freq 网格后送入检测器。
+
+    每个网格桶取各通道最后一个非 outlier 值（没有新值时沿用上一个值）；
+    当所有已出现的传感器的数据都越过某个桶的结束时刻时，该桶才被送出。某个传感器落后最新数据超过
+    lateness 时不再等它：桶照常送出，该传感器的通道记为缺失值，之后到达的这些桶的数据被丢弃。
+    结果交给检测器的 listeners；results 只保留最近 keep 批。
+    """
+
+    def __init__(self, detector, freq="30s", lateness="5min", keep=100):
+        self.detector = detector
+        self.step = pd.Timedelta(freq).value
+        self.lateness = None if lateness is None else pd.Timedelta(lateness).value
+        self.index = {name: i for i, name in enumerate(detector.columns)}
+        # 传感器 -> 其通道的列下标（列名为 "{sensor}_channel{c}"）
+        self.sensor_cols = {}
+        for name, i in self.index.items():
+            self.sensor_cols.setdefault(name.rsplit("_channel", 1)[0], []).append(i)
+        self.last = np.full(len(detector.columns), np.nan)
+        self.pending = {}  # bucket -> {column: value}
+        self.watermark = {}  # sensor -> 最新时间戳
+        self.emitted = None  # 已送出的桶都早于该时刻
+        self.late = 0  # 因到达太晚被丢弃的值
+        self.results = deque(maxlen=keep)
+
+    def write(self, sensor, frame):
+        frame = frame[~frame["outlier"].to_numpy()] if "outlier" in frame else frame
+        if not len(frame):
+            return
+        stamps = frame["datetime"].to_numpy().astype("datetime64[ns]").view(np.int64)
+        buckets = stamps // self.step * self.step
+        cols = np.array([self.index.get(f"{sensor}_channel{c}", -1) for c in frame["channel"].to_numpy()])
+        keep = cols >= 0
+        if self.emitted is not None:
+            self.late += int((keep & (buckets < self.emitted)).sum())
+            keep &= buckets >= self.emitted
+        for bucket, col, value in zip(buckets[keep].tolist(), cols[keep].tolist(),
+                                      frame["value"].to_numpy()[keep].tolist()):
+            self.pending.setdefault(bucket, {})[col] = value
+        self.watermark[sensor] = max(self.watermark.get(sensor, stamps.max()), stamps.max())
+        self._flush()
+
+    def _flush(self):
+        done = min(self.watermark.values()) // self.step * self.step  # 该桶之前的桶都已完整
+        if self.lateness is not None:
+            done = max(done, (max(self.watermark.values()) - self.lateness) // self.step * self.step)
+        ready = sorted(b for b in self.pending if b < done)
+        if not ready:
+            return
+        rows = np.empty((len(ready), len(self.last)))
+        for r, bucket in enumerate(ready):
+            for sensor, stamp in self.watermark.items():
+                if stamp < bucket + self.step:  # 该传感器还没有覆盖这个桶：超时送出，没有新值的通道记为缺失
+                    self.last[self.sensor_cols.get(sensor, [])] = np.nan
+            for col, value in self.pending.pop(bucket).items():
+                self.last[col] = value
+            rows[r] = self.last
+        self.emitted = done if self.emitted is None else max(self.emitted, done)
+        self.results.append(self.detector.process(rows, np.array(ready, dtype="datetime64[ns]")))
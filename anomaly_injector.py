@@ -0,0 +1,241 @@
+"""向传感器数据批量注入带标签的异常（shift / spike / noise / freeze / drift / compound）。
+
+    python anomaly_injector.py                                  # 每个 run 重采样后注入，写 databases/processed_data/anomaly_injected/*.npz
+    python anomaly_injector.py --workers 4 --seed 1 --max-per-hour 8
+
+    from anomaly_injector import AnomalyInjector
+    injector = AnomalyInjector(columns)
+    X_anomalous, labels = injector.inject(X, seed=42)      # X: (行, 通道) NumPy 数组
+
+由笔记本 "Creating an Anomaly Injection Function..." 中的 EnhancedAnomalyInjector 改写：
+每个窗口（points_per_hour 行）抽取 [min, max] 个起点互相间隔不少于 min_spacing 的事件，
+时长、类型、通道等参数一次性抽好，再按事件类型对整块数组做掩码运算，最后只对被修改的单元格
+统一做物理约束裁剪。与笔记本的区别：事件的通道、方向在整个持续时间内保持不变（笔记本每一行
+重新抽取），因此 shift 是一段电平偏移，drift 是逐行累加的斜坡，freeze 保持在事件前一行的值。
+
+标签为 uint8 数组，0 为正常，其余为 ANOMALY_TYPES 中的下标 + 1（重叠时后面的事件覆盖前面的）。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from resampler import resample_run, run_folders
+
+ANOMALY_TYPES = ("shift", "spike", "noise", "freeze", "drift", "compound")
+ANOMALY_PROBS = (0.25, 0.25, 0.2, 0.1, 0.1, 0.1)
+GROUPS = ("cooling", "temperature", "maxigauge")  # 按列名前缀分组，其他列按 maxigauge 处理（同笔记本）
+
+# 各组的异常幅度（取自笔记本）：shift 为 ±幅度，spike 为倍数区间，noise 为标准差，drift 为每行增量区间
+MAGNITUDES = {
+    "cooling": {"shift": 5.0, "spike": (2.0, 5.0), "noise": 2.0, "drift": (0.1, 0.5)},
+    "temperature": {"shift": 10.0, "spike": (2.0, 5.0), "noise": 40.0, "drift": (1.0, 5.0)},
+    "maxigauge": {"shift": 100.0, "spike": (2.0, 10.0), "noise": 150.0, "drift": (10.0, 50.0)},
+}
+# 默认物理约束：冷却水温度 (°C)、温度计 (K)、压力 (mbar)
+LIMITS = {"cooling": (0.0, 100.0), "temperature": (0.0, 350.0), "maxigauge": (0.0, 2000.0)}
+
+EVENT_DTYPE = np.dtype([
+    ("start", np.int64),
+    ("length", np.int32),
+    ("kind", np.uint8),      # 标签编码 1..len(ANOMALY_TYPES)
+    ("channel", np.int16),   # 目标列；整组 shift 时为 -1
+    ("group", np.int8),      # 整组 shift 的组编号，否则为 -1
+    ("channel2", np.int16),  # compound 中 drift 的目标列
+    ("sign", np.int8),       # spike 符号 / drift 方向
+    ("level", np.float64),   # shift 幅度比例，[-1, 1]
+])
+
+
+def column_groups(columns):
+    return np.array([next((g for g, name in enumerate(GROUPS) if col.startswith(name)), len(GROUPS) - 1)
+                     for col in columns], dtype=np.int64)
+
+
+class AnomalyInjector:
+    def __init__(self, columns, physical_constraints=None, points_per_hour=120, min_spacing=10, magnitudes=None):
+        self.columns = list(columns)
+        self.points_per_hour = points_per_hour
+        self.min_spacing = min_spacing
+        self.group = column_groups(self.columns)
+        magnitudes = magnitudes or MAGNITUDES
+        # 每列的幅度参数，运算时按列下标取
+        per_col = [magnitudes[GROUPS[g]] for g in self.group]
+        self.shift = np.array([m["shift"] for m in per_col])
+        self.spike_lo, self.spike_hi = np.array([m["spike"] for m in per_col]).T
+        self.noise = np.array([m["noise"] for m in per_col])
+        self.drift_lo, self.drift_hi = np.array([m["drift"] for m in per_col]).T
+        constraints = physical_constraints or {}
+        limits = [constraints.get(col, dict(zip(("min", "max"), LIMITS[GROUPS[g]])))
+                  for col, g in zip(self.columns, self.group)]
+        self.lo = np.array([c["min"] for c in limits], dtype=np.float64)
+        self.hi = np.array([c["max"] for c in limits], dtype=np.float64)
+
+    # ---- 事件抽样 ----
+    def sample_events(self, n_rows, rng, min_per_hour=1, max_per_hour=5, min_duration=1, max_duration=15):
+        """一次抽出全部事件，返回按起点排序的 EVENT_DTYPE 数组。"""
+        P, s = self.points_per_hour, self.min_spacing
+        hour_start = np.arange(0, n_rows, P)
+        hour_end = np.minimum(hour_start + P, n_rows)
+        span = np.maximum(hour_end - max_duration - hour_start, 0)  # 起点候选区间长度
+        k = rng.integers(min_per_hour, max_per_hour + 1, size=len(hour_start))
+        k = np.where(span > 0, np.minimum(k, (span - 1) // s + 1), 0)
+
+        # 间隔约束：在 span - (k-1)(s-1) 个位置里不放回抽 k 个并排序，第 i 个再加 i*(s-1)
+        room = span - np.maximum(k - 1, 0) * (s - 1)
+        width = max(int(room.max(initial=0)), 1)
+        keys = rng.random((len(hour_start), width))
+        keys[np.arange(width) >= room[:, None]] = np.inf
+        kmax = int(k.max(initial=0))
+        q = np.sort(np.argsort(keys, axis=1)[:, :kmax], axis=1)
+        rank = np.arange(kmax)
+        take = rank < k[:, None]
+        offsets = (q + rank * (s - 1))[take]
+        hours = np.nonzero(take)[0]
+        start = hour_start[hours] + offsets
+
+        n = len(start)
+        events = np.zeros(n, dtype=EVENT_DTYPE)
+        events["start"] = start
+        duration = rng.integers(min_duration, max_duration + 1, size=n)
+        events["length"] = np.minimum(duration, hour_end[hours] - start)
+        events["kind"] = rng.choice(len(ANOMALY_TYPES), size=n, p=ANOMALY_PROBS) + 1
+        events["channel"] = rng.integers(len(self.columns), size=n)
+        events["channel2"] = rng.integers(len(self.columns), size=n)
+        events["sign"] = rng.choice((-1, 1), size=n)
+        events["level"] = rng.uniform(-1, 1, size=n)
+        # shift 在 3 个组和单个通道之间均匀选择
+        choice = rng.integers(len(GROUPS) + 1, size=n)
+        group_shift = (events["kind"] == ANOMALY_TYPES.index("shift") + 1) & (choice < len(GROUPS))
+        events["group"] = np.where(group_shift, choice, -1)
+        events["channel"][group_shift] = -1
+        return events
+
+    # ---- 批量应用 ----
+    def _cells(self, events, kind, channel_field="channel"):
+        """把某类事件展开成 (行, 列, 事件序号, 事件内位置)。"""
+        ev = events[np.isin(events["kind"], kind)]
+        if not len(ev):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, ev, empty, empty
+        lengths = ev["length"].astype(np.int64)
+        eid = np.repeat(np.arange(len(ev)), lengths)
+        pos = np.arange(len(eid)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = ev["start"][eid] + pos
+        return rows, ev[channel_field][eid].astype(np.int64), ev, eid, pos
+
+    def apply(self, X, events, rng):
+        """在 X 的副本上应用事件，返回 (数据, 标签)。运算顺序：freeze、shift、spike、noise、drift。"""
+        X = np.array(X, dtype=np.float64)
+        n, C = X.shape
+        modified = np.zeros((n, C), dtype=bool)
+        code = {name: i + 1 for i, name in enumerate(ANOMALY_TYPES)}
+
+        # freeze：保持在事件开始前一行的值（第 0 行开始的事件不变）
+        rows, cols, ev, eid, _ = self._cells(events, code["freeze"])
+        keep = ev["start"][eid] > 0
+        rows, cols, eid = rows[keep], cols[keep], eid[keep]
+        X[rows, cols] = X[ev["start"][eid] - 1, cols]
+        modified[rows, cols] = True
+
+        # shift：单通道或整组，事件内偏移不变
+        rows, cols, ev, eid, _ = self._cells(events, code["shift"])
+        single = cols >= 0
+        np.add.at(X, (rows[single], cols[single]), ev["level"][eid[single]] * self.shift[cols[single]])
+        modified[rows[single], cols[single]] = True
+        for g in range(len(GROUPS)):
+            members = np.flatnonzero(self.group == g)
+            sel = ev["group"][eid] == g
+            if not len(members) or not sel.any():
+                continue
+            r = np.repeat(rows[sel], len(members))
+            c = np.tile(members, int(sel.sum()))
+            np.add.at(X, (r, c), np.repeat(ev["level"][eid[sel]], len(members)) * self.shift[c])
+            modified[r, c] = True
+
+        # spike（含 compound 的 spike 部分）：每行独立抽倍数
+        rows, cols, ev, eid, _ = self._cells(events, (code["spike"], code["compound"]))
+        factor = ev["sign"][eid] * rng.uniform(self.spike_lo[cols], self.spike_hi[cols])
+        np.multiply.at(X, (rows, cols), factor)
+        modified[rows, cols] = True
+
+        # noise
+        rows, cols, ev, eid, _ = self._cells(events, code["noise"])
+        np.add.at(X, (rows, cols), rng.normal(0, self.noise[cols]))
+        modified[rows, cols] = True
+
+        # drift（compound 的 drift 作用于 channel2）：逐行增量在事件内累加成斜坡
+        for kind, field in ((code["drift"], "channel"), (code["compound"], "channel2")):
+            rows, cols, ev, eid, pos = self._cells(events, kind, field)
+            if not len(rows):
+                continue
+            step = rng.uniform(self.drift_lo[cols], self.drift_hi[cols])
+            ramp = np.cumsum(step)
+            ramp -= np.repeat((ramp - step)[pos == 0], ev["length"].astype(np.int64))
+            np.add.at(X, (rows, cols), ev["sign"][eid] * ramp)
+            modified[rows, cols] = True
+
+        # 物理约束：只裁剪被修改过的单元格
+        r, c = np.nonzero(modified)
+        X[r, c] = np.clip(X[r, c], self.lo[c], self.hi[c])
+
+        labels = np.zeros(n, dtype=np.uint8)
+        rows, _, ev, eid, _ = self._cells(events, np.arange(1, len(ANOMALY_TYPES) + 1))
+        labels[rows] = ev["kind"][eid]
+        return X, labels
+
+    def inject(self, X, min_per_hour=1, max_per_hour=5, min_duration=1, max_duration=15, seed=None):
+        rng = np.random.default_rng(seed)
+        events = self.sample_events(len(X), rng, min_per_hour, max_per_hour, min_duration, max_duration)
+        return self.apply(X, events, rng)
+
+
+def _inject_job(run_dir, out_dir, seed, kwargs):
+    frame = resample_run(run_dir)
+    injector = AnomalyInjector(frame.columns)
+    X, labels = injector.inject(frame.to_numpy(np.float64), seed=seed, **kwargs)
+    out = Path(out_dir) / f"{Path(run_dir).name}.npz"
+    np.savez_compressed(out, data=X.astype(np.float32), labels=labels, columns=np.array(injector.columns),
+                        time=frame.index.to_numpy().astype("datetime64[ns]").view(np.int64))
+    return {"run": Path(run_dir).name, "rows": len(X), "anomalous": float((labels > 0).mean()), "path": str(out)}
+
+
+def inject_runs(root="databases/data_csv", out_dir="databases/processed_data/anomaly_injected", pattern="cd*",
+                workers=None, seed=None, **kwargs):
+    """每个 run 重采样到 30 s 网格后注入异常，写成 npz（data / labels / columns / time）。"""
+    folders = run_folders(root, pattern)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    seeds = np.random.SeedSequence(seed).spawn(len(folders))  # 每个 run 独立的随机流，结果与进程数无关
+    workers = min(workers or os.cpu_count(), len(folders)) or 1
+    if workers == 1:
+        return [_inject_job(f, out_dir, s, kwargs) for f, s in zip(folders, seeds)]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_inject_job, folders, [out_dir] * len(folders), seeds, [kwargs] * len(folders)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--out", default="databases/processed_data/anomaly_injected")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--min-per-hour", type=int, default=1)
+    parser.add_argument("--max-per-hour", type=int, default=5)
+    parser.add_argument("--max-duration", type=int, default=15)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = inject_runs(args.root, args.out, args.pattern, args.workers, args.seed,
+                          min_per_hour=args.min_per_hour, max_per_hour=args.max_per_hour,
+                          max_duration=args.max_duration)
+    for r in results:
+        print(f"{r['run']}: {r['rows']} rows, {r['anomalous']:.1%} anomalous -> {r['path']}")
+    print(f"done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
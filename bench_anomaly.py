@@ -0,0 +1,94 @@
+"""Per-sample latency and detection delay of StreamingAnomalyDetector on the cd* runs.
+
+    python bench_anomaly.py --excursions 50 --size 0.5
+
+Each run is resampled to the 30 s grid (resampler.resample_run) and fed to the
+detector one sample at a time, as a live feed would. Reports p50/p99 wall-clock
+latency per sample and batch throughput. Detection delay is measured by
+injecting --excursions ramp excursions (value scaled linearly up to
+1 + size over --length samples) into random pressure/temperature channels,
+at positions where the unmodified run raised no alert nearby, and counting
+samples from the start of the ramp to the first alert.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import StreamingAnomalyDetector
+from resampler import resample_run, run_folders
+
+
+def per_sample(X):
+    det = StreamingAnomalyDetector()
+    latency = np.empty(len(X))
+    alerts = np.empty(len(X), dtype=bool)
+    for i in range(len(X)):
+        start = time.perf_counter()
+        alerts[i] = det.process(X[i:i + 1])["alert"][0]
+        latency[i] = time.perf_counter() - start
+    return latency, alerts
+
+
+def inject(X, columns, baseline, count, size, length, rng, warmup=1000, margin=60):
+    """返回注入后的数据与 [(起点, 通道)]；起点前后 margin 个样本内原始数据无告警。"""
+    X = X.copy()
+    candidates = [c for c, name in enumerate(columns) if name.startswith(("maxigauge", "temperature"))
+                  and not np.isnan(X[:, c]).all()]
+    quiet = np.convolve(baseline.astype(int), np.ones(2 * margin + 1, dtype=int), mode="same") == 0
+    positions = np.flatnonzero(quiet[warmup:len(X) - length]) + warmup
+    events = []
+    for start in rng.permutation(positions):
+        if len(events) == count:
+            break
+        if any(abs(start - s) < 4 * margin for s, _ in events):
+            continue
+        channel = int(rng.choice(candidates))
+        if np.isnan(X[start:start + length, channel]).any():
+            continue
+        X[start:start + length, channel] *= 1 + size * np.arange(1, length + 1) / length
+        events.append((int(start), channel))
+    return X, events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--excursions", type=int, default=50)
+    parser.add_argument("--size", type=float, default=0.5, help="relative size at the end of the ramp")
+    parser.add_argument("--length", type=int, default=20, help="ramp length in samples")
+    parser.add_argument("--freq", default="30s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    step = pd.Timedelta(args.freq).total_seconds()
+
+    print(f"{'run':>9} {'samples':>8} {'p50 ms':>7} {'p99 ms':>7} {'batch/s':>9} {'alert %':>8} "
+          f"{'detected':>9} {'delay p50':>10} {'delay p90':>10}")
+    for run_dir in run_folders(args.root):
+        frame = resample_run(run_dir, freq=args.freq)
+        columns = StreamingAnomalyDetector().columns
+        X = frame.reindex(columns=columns).to_numpy(dtype=np.float64)
+
+        latency, baseline = per_sample(X)
+        start = time.perf_counter()
+        StreamingAnomalyDetector().process(X)
+        batch_rate = len(X) / (time.perf_counter() - start)
+
+        injected, events = inject(X, columns, baseline, args.excursions, args.size, args.length, rng)
+        alerts = StreamingAnomalyDetector().process(injected)["alert"]
+        delays = []
+        for pos, _ in events:
+            hits = np.flatnonzero(alerts[pos:pos + args.length])
+            if len(hits):
+                delays.append(hits[0])
+        delays = np.array(delays) * step
+        p50, p99 = np.percentile(latency * 1000, [50, 99])
+        d50, d90 = np.percentile(delays, [50, 90]) if len(delays) else (np.nan, np.nan)
+        print(f"{run_dir.name:>9} {len(X):>8} {p50:>7.3f} {p99:>7.3f} {batch_rate:>9.0f} {baseline.mean():>8.1%} "
+              f"{len(delays):>4}/{len(events):<4} {d50:>9.0f}s {d90:>9.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""synthetic_eval vs. the notebook's TimeSeriesEvaluator loops on the same windows.
+
+    python bench_eval.py --windows 200 --seq-len 120 --window 12
+
+Real windows are non-overlapping 120-sample windows from every run (resampled,
+scaled to (-1, 1) like the notebooks); the "synthetic" set is the same windows
+with noise and a time shift, so the metrics are non-trivial. The notebook DTW is
+the classic O(T^2) double loop per (pair, feature) — dtaidistance's C version is
+faster but still pair-by-pair and unconstrained. The notebook baseline only gets
+--notebook-windows windows; the vectorized numbers are per window so they compare.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic_eval import acf_difference, evaluate, nearest_dtw, paired_dtw, predictive_score
+from windowing import build_from_runs, WindowDataset
+
+
+def notebook_dtw(a, b):
+    n, m = len(a), len(b)
+    D = np.full((n + 1, m + 1), np.inf)
+    D[0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            D[i, j] = (a[i - 1] - b[j - 1]) ** 2 + min(D[i - 1, j], D[i, j - 1], D[i - 1, j - 1])
+    return np.sqrt(D[n, m])
+
+
+def notebook_average_dtw(real, synth):
+    dtw_distances = []
+    for real_seq, synth_seq in zip(real, synth):
+        dist = 0
+        for i in range(real.shape[2]):
+            dist += notebook_dtw(real_seq[:, i], synth_seq[:, i])
+        dtw_distances.append(dist / real.shape[2])
+    return np.mean(dtw_distances)
+
+
+def notebook_predictive(real, synth, window=5):
+    mse = []
+    for data in (real, synth):
+        X, Y = [], []
+        for seq in data:
+            for t in range(window, data.shape[1]):
+                X.append(seq[t - window:t].flatten())
+                Y.append(seq[t])
+        X, Y = np.array(X), np.array(Y)
+        X = np.hstack([X, np.ones((len(X), 1))])
+        coef = np.linalg.lstsq(X, Y, rcond=None)[0]
+        mse.append(np.mean((X @ coef - Y) ** 2))
+    return abs(mse[0] - mse[1])
+
+
+def notebook_acf(real, synth, lag=1):
+    def avg_autocorr(data):
+        autocorrs = []
+        for f in range(data.shape[2]):
+            for seq in data[:, :, f]:
+                autocorrs.append(np.corrcoef(seq[:-lag], seq[lag:])[0, 1])
+        return np.nanmean(autocorrs)
+    return abs(avg_autocorr(real) - avg_autocorr(synth))
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--windows", type=int, default=400)
+    parser.add_argument("--notebook-windows", type=int, default=10)
+    parser.add_argument("--seq-len", type=int, default=120)
+    parser.add_argument("--window", type=int, default=12, help="Sakoe-Chiba radius")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    path = build_from_runs(args.root, "/tmp/bench_eval/runs.npy")
+    ds = WindowDataset.load(path, args.seq_len, stride=args.seq_len)
+    real = np.asarray(ds.windows[ds.starts[:args.windows]], dtype=np.float64)
+    rng = np.random.default_rng(0)
+    synth = np.roll(real, 3, axis=1) + rng.normal(0, 0.05, real.shape)
+    n, nb = len(real), min(args.notebook_windows, len(real))
+    print(f"{n} window pairs of {args.seq_len} x {real.shape[2]}; notebook baseline on {nb}")
+
+    print(f"{'metric':>28} {'seconds':>9} {'ms/window':>10}")
+    rows = [("notebook DTW (full)", nb, timed(notebook_average_dtw, real[:nb], synth[:nb])),
+            ("batched DTW (full)", n, timed(paired_dtw, real, synth, None)),
+            (f"batched DTW (band {args.window})", n, timed(paired_dtw, real, synth, args.window)),
+            (f"batched DTW (band, pool)", n, timed(paired_dtw, real, synth, args.window, args.workers or 4, 256)),
+            ("nearest DTW (LB_Keogh)", n, timed(nearest_dtw, synth, real, args.window)),
+            ("notebook predictive", n, timed(notebook_predictive, real, synth)),
+            ("predictive (views)", n, timed(predictive_score, real, synth)),
+            ("notebook lag-1 ACF", n, timed(notebook_acf, real, synth)),
+            ("FFT ACF (lags 1..10)", n, timed(acf_difference, real, synth, 10))]
+    for name, count, (_, seconds) in rows:
+        print(f"{name:>28} {seconds:>9.3f} {seconds / count * 1000:>10.2f}")
+    _, frac = rows[4][2][0]
+    print(f"nearest DTW computed exact DTW for {frac:.1%} of the {n * n} pairs")
+
+    report, seconds = timed(evaluate, real, synth, window=args.window, subsamples=20, subsample_size=100,
+                            workers=args.workers)
+    print(f"evaluate(subsamples=20, size=100): {seconds:.2f}s")
+    for key, value in report.items():
+        print(f"{key:>28}: {value['mean']:.4f} [{value['lo']:.4f}, {value['hi']:.4f}]")
+
+
+if __name__ == "__main__":
+    main()
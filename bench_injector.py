@@ -0,0 +1,189 @@
+"""rows/sec of anomaly_injector.AnomalyInjector vs. the notebook's EnhancedAnomalyInjector.
+
+    python bench_injector.py --run databases/data_csv/cd230926 --notebook-rows 20000
+
+Both inject into the same resampled run (resampler.resample_run). The notebook
+version edits a pandas DataFrame cell by cell, so it only gets the first
+--notebook-rows rows; the vectorized version runs on the whole run and on a
+--repeat times tiled copy to show how it scales. The last section times
+inject_runs over every run folder.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from anomaly_injector import AnomalyInjector, inject_runs
+from resampler import resample_run
+
+
+class NotebookAnomalyInjector:
+    """笔记本 "Creating an Anomaly Injection Function..." 中的 EnhancedAnomalyInjector，原样保留作基准。"""
+
+    def __init__(self, cooling_group, temp_group, maxigauge_group, physical_constraints=None, points_per_hour=120,
+                 min_spacing=10):
+        self.cooling_group = cooling_group
+        self.temp_group = temp_group
+        self.maxigauge_group = maxigauge_group
+        self.constraints = physical_constraints or {}
+        self.points_per_hour = points_per_hour
+        self.min_spacing = min_spacing
+
+    def inject_anomalies(self, df, min_anomalies_per_hour=1, max_anomalies_per_hour=5, min_duration=1,
+                         max_duration=15, random_seed=None):
+        if random_seed is not None:
+            np.random.seed(random_seed)
+
+        df_anomalous = df.copy()
+        anomaly_indicator = np.zeros(len(df))
+        total_points = len(df)
+        n_hours = int(np.ceil(total_points / self.points_per_hour))
+        anomalies_per_hour = np.random.randint(min_anomalies_per_hour, max_anomalies_per_hour + 1, size=n_hours)
+        anomaly_types = ['shift', 'spike', 'noise', 'freeze', 'drift', 'compound']
+        anomaly_probs = [0.25, 0.25, 0.2, 0.1, 0.1, 0.1]
+
+        current_point = 0
+        for hour_idx in range(n_hours):
+            hour_start = current_point
+            hour_end = min(current_point + self.points_per_hour, total_points)
+            n_anomalies = anomalies_per_hour[hour_idx]
+            candidates = np.arange(hour_start, hour_end - max_duration)
+
+            valid_positions = []
+            while len(valid_positions) < n_anomalies and len(candidates) > 0:
+                candidate = np.random.choice(candidates)
+                if all(abs(candidate - pos) >= self.min_spacing for pos in valid_positions):
+                    valid_positions.append(candidate)
+                    candidates = candidates[np.abs(candidates - candidate) >= self.min_spacing]
+                else:
+                    candidates = np.setdiff1d(candidates, [candidate])
+
+            for pos in valid_positions:
+                duration = np.random.randint(min_duration, max_duration + 1)
+                end_pos = min(pos + duration, hour_end)
+                anomaly_type = np.random.choice(anomaly_types, p=anomaly_probs)
+                for t in range(pos, end_pos):
+                    if anomaly_type == 'shift':
+                        self._apply_shift(df_anomalous, t)
+                    elif anomaly_type == 'spike':
+                        self._apply_spike(df_anomalous, t)
+                    elif anomaly_type == 'noise':
+                        self._apply_noise(df_anomalous, t)
+                    elif anomaly_type == 'freeze':
+                        self._apply_freeze(df_anomalous, t)
+                    elif anomaly_type == 'drift':
+                        self._apply_drift(df_anomalous, t)
+                    elif anomaly_type == 'compound':
+                        self._apply_spike(df_anomalous, t)
+                        self._apply_drift(df_anomalous, t)
+                    self._validate_constraints(df_anomalous, t)
+                    anomaly_indicator[t] = 1
+
+            current_point = hour_end
+
+        return df_anomalous, anomaly_indicator
+
+    def _apply_shift(self, df, idx):
+        group = np.random.choice(['cooling', 'temp', 'maxigauge', 'single'])
+        if group == 'cooling':
+            shift = np.random.uniform(-5, 5)
+            for ch in self.cooling_group:
+                df.at[idx, ch] += shift
+        elif group == 'temp':
+            shift = np.random.uniform(-10, 10)
+            for ch in self.temp_group:
+                df.at[idx, ch] += shift
+        elif group == 'maxigauge':
+            shift = np.random.uniform(-100, 100)
+            for ch in self.maxigauge_group:
+                df.at[idx, ch] += shift
+        else:
+            ch = np.random.choice(df.columns)
+            if ch in self.cooling_group:
+                df.at[idx, ch] += np.random.uniform(-5, 5)
+            elif ch in self.temp_group:
+                df.at[idx, ch] += np.random.uniform(-10, 10)
+            else:
+                df.at[idx, ch] += np.random.uniform(-100, 100)
+
+    def _apply_spike(self, df, idx):
+        ch = np.random.choice(df.columns)
+        factor = np.random.choice([-1, 1])
+        if ch in self.cooling_group or ch in self.temp_group:
+            df.at[idx, ch] *= factor * np.random.uniform(2, 5)
+        else:
+            df.at[idx, ch] *= factor * np.random.uniform(2, 10)
+
+    def _apply_noise(self, df, idx):
+        ch = np.random.choice(df.columns)
+        if ch in self.cooling_group:
+            df.at[idx, ch] += np.random.normal(0, 2)
+        elif ch in self.temp_group:
+            df.at[idx, ch] += np.random.normal(0, 40)
+        else:
+            df.at[idx, ch] += np.random.normal(0, 150)
+
+    def _apply_freeze(self, df, idx):
+        ch = np.random.choice(df.columns)
+        if idx > 0:
+            df.at[idx, ch] = df.at[idx - 1, ch]
+
+    def _apply_drift(self, df, idx):
+        ch = np.random.choice(df.columns)
+        direction = np.random.choice([-1, 1])
+        if ch in self.cooling_group:
+            df.at[idx, ch] += direction * np.random.uniform(0.1, 0.5)
+        elif ch in self.temp_group:
+            df.at[idx, ch] += direction * np.random.uniform(1, 5)
+        else:
+            df.at[idx, ch] += direction * np.random.uniform(10, 50)
+
+    def _validate_constraints(self, df, idx):
+        for ch in df.columns:
+            if ch in self.constraints:
+                val = df.at[idx, ch]
+                df.at[idx, ch] = np.clip(val, self.constraints[ch]['min'], self.constraints[ch]['max'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--run", default="databases/data_csv/cd230926")
+    parser.add_argument("--notebook-rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=40, help="tile the run this many times for the scaling row")
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = resample_run(args.run).reset_index(drop=True).astype(np.float64)
+    columns = list(frame.columns)
+    injector = AnomalyInjector(columns)
+    limits = {c: {"min": lo, "max": hi} for c, lo, hi in zip(columns, injector.lo, injector.hi)}
+    notebook = NotebookAnomalyInjector([c for c in columns if c.startswith("cooling")],
+                                       [c for c in columns if c.startswith("temperature")],
+                                       [c for c in columns if c.startswith("maxigauge")], limits)
+
+    print(f"{'version':>22} {'rows':>10} {'channels':>9} {'seconds':>9} {'rows/s':>12} {'anomalous':>10}")
+    sub = frame.iloc[:args.notebook_rows].reset_index(drop=True)
+    start = time.perf_counter()
+    _, labels = notebook.inject_anomalies(sub, random_seed=args.seed)
+    seconds = time.perf_counter() - start
+    print(f"{'notebook':>22} {len(sub):>10} {len(columns):>9} {seconds:>9.3f} {len(sub) / seconds:>12.0f} "
+          f"{labels.mean():>10.1%}")
+
+    X = frame.to_numpy(np.float64)
+    for name, data in (("vectorized", X[:args.notebook_rows]), ("vectorized, full run", X),
+                       (f"vectorized, x{args.repeat}", np.tile(X, (args.repeat, 1)))):
+        start = time.perf_counter()
+        _, labels = injector.inject(data, seed=args.seed)
+        seconds = time.perf_counter() - start
+        print(f"{name:>22} {len(data):>10} {len(columns):>9} {seconds:>9.3f} {len(data) / seconds:>12.0f} "
+              f"{(labels > 0).mean():>10.1%}")
+
+    start = time.perf_counter()
+    results = inject_runs(args.root, out_dir="/tmp/anomaly_injected_bench", seed=args.seed)
+    print(f"inject_runs: {len(results)} runs, {sum(r['rows'] for r in results)} rows "
+          f"(resample + inject + save) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
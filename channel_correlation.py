@@ -0,0 +1,357 @@
+"""跨通道滚动相关性：滑动窗口与指数加权的协方差 / 相关矩阵，检测强相关通道对的“解耦”。
+
+    python channel_correlation.py runs                      # 所有 cd* run，事件写 databases/processed_data/correlation/
+    python channel_correlation.py runs --window 120 --halflife 2880 --snapshot-every 2880
+    python channel_correlation.py tail databases/live       # 跟踪持续追加的 CSV（stream_pipeline + AnomalySink）
+
+    from channel_correlation import CorrelationMonitor
+    monitor = CorrelationMonitor(columns)
+    result = monitor.process(X, times)                      # X: (k, 通道)，可以一次一行，也可以整段
+    monitor.snapshot()                                      # 当前的 rolling / ew 相关矩阵（DataFrame）
+
+两套状态，每个样本的更新都是 O(通道²)，与窗口长度无关：
+    rolling  最近 window 个样本的精确协方差。一段样本的 Σx、Σxxᵀ 用累加和一次求出
+             （加入新样本、减去离开窗口的样本），每 window 个样本用窗口内数据重算一次，消除累积误差；
+             窗口内为常数的通道按连续相同值的个数判断，相关系数为 NaN
+    ew       半衰期 halflife 个样本的指数加权均值 / 协方差，递推式是常系数一阶滤波，整段用 lfilter 计算
+缺失值沿用该通道上一个值（同 anomaly_detector.AnomalySink），数值先减去每个通道第一次出现的值以减小抵消误差。
+
+解耦：基准是每个通道对平时的窗口内相关 ρ_typical（ρ_rolling 的指数加权平均，同一 halflife）。
+不直接用 ρ_ew：各通道的慢漂移让长期相关接近 ±1，而 window 内主要是噪声，两者不可比，几乎一直告警。
+|ρ_typical| >= min_rho 的通道对，如果 sign(ρ_typical) * ρ_rolling < |ρ_typical| - drop 连续 persist 个样本，
+则产生告警，并记录一条事件（通道对、开始 / 结束时间、开始时的 ρ_typical、ρ_ew 与 ρ_rolling）。
+结果字典含 alert 数组，可以直接接 anomaly_detector.SchedulerAlertBridge。
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from resampler import resample_run, run_folders
+
+CHUNK = 2048  # 一次向量化处理的最大样本数，中间数组为 CHUNK * 通道² 个元素
+OUT_DIR = "databases/processed_data/correlation"
+
+
+def _correlation(cov):
+    """(..., C, C) 协方差 -> 相关系数；方差为 0 的通道为 NaN。"""
+    sd = np.sqrt(np.maximum(np.diagonal(cov, axis1=-2, axis2=-1), 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rho = cov / (sd[..., :, None] * sd[..., None, :])
+    rho[(sd[..., :, None] == 0) | (sd[..., None, :] == 0)] = np.nan  # 协方差的舍入误差除以 0 会得到 ±inf
+    return np.clip(rho, -1.0, 1.0, out=rho)
+
+
+class RollingCovariance:
+    """最近 window 个样本的协方差（总体协方差，除以样本数）。
+
+    s1、s2 是减去 shift（最近一个样本）之后的 Σx、Σxxᵀ：方差很小、均值不为 0 的通道直接累加时，
+    s2/n - mean² 相减会丢掉大部分有效数字。累加的舍入误差与累加过的数值大小成正比，所以每 window 个样本
+    重算一次（均摊仍是每个样本 O(通道²)），已经离开窗口的大数值（如抽真空开始时的压力）不会影响之后的窗口。
+    窗口内为常数的通道由末尾连续相同值的个数 same 精确判断，方差置为 0（相关系数为 NaN），不受舍入误差影响。
+    """
+
+    def __init__(self, dim, window):
+        self.window = window
+        self.hist = np.zeros((window, dim))  # 最近 window 行，按时间顺序
+        self.n = 0
+        self.shift = np.zeros(dim)
+        self.s1 = np.zeros(dim)
+        self.s2 = np.zeros((dim, dim))
+        self.same = np.zeros(dim, dtype=np.int64)  # 每个通道末尾连续相同值的样本数
+
+    def update(self, X):
+        """X: (k, C)，无缺失值。返回每个样本之后的 (计数 (k,), 协方差 (k, C, C))。"""
+        parts = [self._update(X[i:i + self.window]) for i in range(0, len(X), self.window)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def _update(self, X):
+        k, w = len(X), self.window
+        full = np.concatenate((self.hist[w - self.n:], X)) - self.shift
+        count = self.n + np.arange(1, k + 1)
+        leave = count - w - 1  # 第 t 个样本加入时离开窗口的行在 full 中的位置
+        out = full[np.maximum(leave, 0)] * (leave >= 0)[:, None]
+        new = full[self.n:]
+        s1 = self.s1 + np.cumsum(new - out, axis=0)
+        s2 = self.s2 + np.cumsum(new[:, :, None] * new[:, None, :] - out[:, :, None] * out[:, None, :], axis=0)
+        n = np.minimum(count, w)
+
+        # 连续相同值的个数，做法同 CorrelationMonitor 的 run
+        t = np.arange(k)[:, None]
+        prev = np.concatenate((self.hist[-1:] if self.n else X[:1] + 1, X[:-1]))
+        last_change = np.maximum.accumulate(np.where(X != prev, t, -1), axis=0)
+        same = np.where(last_change < 0, self.same + t + 1, t - last_change + 1)
+        cov = self.covariance(n, s1, s2, same >= n[:, None])
+
+        self.n = min(self.n + k, w)
+        self.same = same[-1]
+        self.hist = np.concatenate((self.hist, X))[-w:]
+        self.shift = self.hist[-1].copy()
+        recent = self.hist[w - self.n:] - self.shift
+        self.s1, self.s2 = recent.sum(axis=0), recent.T @ recent  # 每段重算，误差不累积
+        return n, cov
+
+    @staticmethod
+    def covariance(n, s1, s2, constant):
+        """由计数与 Σx、Σxxᵀ 求协方差（可带前导维度）；constant 为 True 的通道方差置为 0。"""
+        n = np.asarray(n, dtype=np.float64)[..., None]
+        mean = s1 / n
+        cov = s2 / n[..., None] - mean[..., :, None] * mean[..., None, :]
+        diag = np.arange(cov.shape[-1])
+        cov[..., diag, diag] = np.where(constant, 0.0, cov[..., diag, diag])
+        return cov
+
+
+class EWCovariance:
+    """指数加权均值 / 协方差：m_t = (1-a) m_{t-1} + a x_t，S_t = (1-a) (S_{t-1} + a d dᵀ)，d = x_t - m_{t-1}。"""
+
+    def __init__(self, dim, halflife):
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.mean = None
+        self.cov = np.zeros((dim, dim))
+        self.count = 0
+
+    def update(self, X):
+        """X: (k, C)，无缺失值。返回每个样本之后的协方差 (k, C, C)。"""
+        a, k, dim = self.alpha, len(X), X.shape[1]
+        if self.mean is None:
+            self.mean = X[0].copy()
+        mean = lfilter([a], [1, a - 1], X, axis=0, zi=((1 - a) * self.mean)[None])[0]
+        d = X - np.concatenate((self.mean[None], mean[:-1]))
+        outer = (d[:, :, None] * d[:, None, :]).reshape(k, -1)
+        cov = lfilter([a * (1 - a)], [1, a - 1], outer, axis=0, zi=((1 - a) * self.cov).reshape(1, -1))[0]
+        cov = cov.reshape(k, dim, dim)
+        self.mean, self.cov = mean[-1], cov[-1]
+        self.count += k
+        return cov
+
+
+class CorrelationMonitor:
+    """rolling（短窗口）与 ew（长期）相关矩阵，以及平时强相关的通道对的解耦告警。
+
+    snapshot_every: 每隔多少个样本保存一次两个相关矩阵到 self.snapshots；
+    process(..., snapshot_at=时间数组) 则在指定时刻（不晚于该时刻的最后一个样本）保存。
+    """
+
+    def __init__(self, columns, window=120, halflife=2880, min_rho=0.8, drop=0.5, persist=10, warmup=None,
+                 snapshot_every=None):
+        self.columns = list(columns)
+        dim = len(self.columns)
+        self.rolling = RollingCovariance(dim, window)
+        self.ew = EWCovariance(dim, halflife)
+        self.min_rho, self.drop, self.persist = min_rho, drop, persist
+        self.warmup = warmup if warmup is not None else halflife
+        self.snapshot_every = snapshot_every
+        self.pairs = np.triu_indices(dim, k=1)
+        self.offset = np.full(dim, np.nan)  # 每个通道第一次出现的值
+        self.last = np.full(dim, np.nan)
+        npairs = len(self.pairs[0])
+        self.typical_num = np.zeros(npairs)  # 窗口内 ρ 的指数加权和 / 有效权重和，缺失（NaN）不计入
+        self.typical_den = np.zeros(npairs)
+        self.run = np.zeros(npairs, dtype=np.int64)  # 每对连续不满足条件的样本数
+        self.run_start = np.full(npairs, None, dtype=object)  # 当前这段连续不满足的第一个样本的时间
+        self.open = {}  # 通道对下标 -> 正在进行的事件
+        self.events = []
+        self.snapshots = []  # (时间, rolling 相关矩阵, ew 相关矩阵)
+        self.count = 0
+        self.listeners = []  # 每次 process 后以结果字典调用
+
+    def _fill(self, X):
+        """沿用上一个值填补缺失，再减去每个通道的首个值；从未出现过的通道为 0。"""
+        X = np.array(X, dtype=np.float64)
+        prev = np.concatenate((self.last[None], X))
+        idx = np.where(np.isnan(prev), 0, np.arange(len(prev))[:, None])
+        np.maximum.accumulate(idx, axis=0, out=idx)
+        X = prev[idx, np.arange(X.shape[1])][1:]
+        self.last = X[-1].copy()
+        first = np.isnan(self.offset) & ~np.isnan(self.last)
+        if first.any():
+            seen = ~np.isnan(X[:, first])
+            self.offset[first] = X[seen.argmax(axis=0), np.flatnonzero(first)]
+        return np.nan_to_num(X - self.offset, nan=0.0)
+
+    def process(self, X, times=None, snapshot_at=None):
+        """X: (k, C)，列顺序同 self.columns。返回 broken（不满足条件的强相关对数）、coupling 与 alert 数组。"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        times = np.arange(self.count, self.count + len(X)) if times is None else np.asarray(times)
+        parts = [self._process(X[i:i + CHUNK], times[i:i + CHUNK], snapshot_at) for i in range(0, len(X), CHUNK)]
+        result = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]} if parts else {}
+        result["time"] = times
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    def _process(self, X, times, snapshot_at):
+        k = len(X)
+        X = self._fill(X)
+        n, rolling_cov = self.rolling.update(X)
+        ew_cov = self.ew.update(X)
+        rolling, ew = _correlation(rolling_cov), _correlation(ew_cov)
+        i, j = self.pairs
+        fast = rolling[:, i, j]
+        full = (n >= self.rolling.window)[:, None] & ~np.isnan(fast)
+        a = self.ew.alpha
+        num = lfilter([a], [1, a - 1], np.where(full, fast, 0.0), axis=0, zi=(1 - a) * self.typical_num[None])[0]
+        den = lfilter([a], [1, a - 1], full.astype(np.float64), axis=0, zi=(1 - a) * self.typical_den[None])[0]
+        self.typical_num, self.typical_den = num[-1], den[-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ref = num / den  # 该通道对平时的窗口内相关（指数加权平均）
+        counts = self.count + np.arange(1, k + 1)
+        ready = ((counts >= self.warmup) & (n >= self.rolling.window))[:, None]
+        with np.errstate(invalid="ignore"):
+            coupled = ready & (np.abs(ref) >= self.min_rho)
+            coupling = np.sign(ref) * fast - np.abs(ref)  # 窗口内相关比平时弱了多少（负数）
+            broken = coupled & (coupling < -self.drop)  # 窗口内通道为常数（rolling 为 NaN）不判断
+
+        # 连续长度：run_t = t - 最近一次不满足的位置，前一段的长度接着累加
+        t = np.arange(k)[:, None]
+        last_ok = np.maximum.accumulate(np.where(broken, -1, t), axis=0)
+        run = np.where(last_ok < 0, self.run + t + 1, t - last_ok)
+        active = run >= self.persist
+        self._events(active, run, times, ref, ew[:, i, j], fast)
+        self.run = run[-1].copy()
+        began = (self.run > 0) & (self.run <= k)  # 这一段内开始的连续段；更早开始的沿用之前的时间
+        self.run_start[began] = list(times[k - self.run[began]])
+
+        self._snapshots(times, counts, rolling, ew, snapshot_at)
+        self.count += k
+        with np.errstate(invalid="ignore"):
+            worst = np.where(coupled, coupling, np.inf).min(axis=1)
+        return {"broken": broken.sum(axis=1), "coupling": np.where(np.isfinite(worst), worst, np.nan),
+                "alert": active.any(axis=1)}
+
+    def _events(self, active, run, times, ref, ew, fast):
+        was = np.zeros(active.shape[1], dtype=bool)
+        was[list(self.open)] = True
+        change = np.diff(np.vstack((was, active)).astype(np.int8), axis=0)
+        for t, p in zip(*np.nonzero(change)):  # 状态变化很少，逐个处理
+            if change[t, p] > 0:
+                begin = t - run[t, p] + 1  # 连续段可能开始于之前的批次，开始时间与分批方式无关
+                self.open[p] = {"a": self.columns[self.pairs[0][p]], "b": self.columns[self.pairs[1][p]],
+                                "start": times[begin] if begin >= 0 else self.run_start[p], "end": None,
+                                "rho_typical": float(ref[t, p]), "rho_ew": float(ew[t, p]),
+                                "rho_rolling": float(fast[t, p])}
+            else:
+                event = self.open.pop(p)
+                event["end"] = times[t]
+                self.events.append(event)
+
+    def _snapshots(self, times, counts, rolling, ew, snapshot_at):
+        rows = []
+        if self.snapshot_every:
+            rows += np.flatnonzero(counts % self.snapshot_every == 0).tolist()
+        if snapshot_at is not None and len(times):
+            at = np.asarray(snapshot_at)
+            at = at[(at >= times[0]) & (at <= times[-1])]
+            rows += (np.searchsorted(times, at, side="right") - 1).tolist()
+        for r in sorted(set(rows)):
+            self.snapshots.append((times[r], rolling[r], ew[r]))
+
+    def snapshot(self):
+        """当前状态的 {"rolling": DataFrame, "ew": DataFrame}。"""
+        k = len(self.columns)
+        rolling = RollingCovariance.covariance(max(self.rolling.n, 1), self.rolling.s1, self.rolling.s2,
+                                               self.rolling.same >= self.rolling.n)
+        return {name: pd.DataFrame(_correlation(cov) if self.rolling.n else np.full((k, k), np.nan),
+                                   index=self.columns, columns=self.columns)
+                for name, cov in (("rolling", rolling), ("ew", self.ew.cov))}
+
+    def process_frame(self, frame, snapshot_at=None):
+        """frame: index 为时间、列为通道名（如 resample_run 的输出）。"""
+        X = frame.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        result = self.process(X, frame.index.to_numpy(), snapshot_at)
+        return pd.DataFrame({key: value for key, value in result.items() if key != "time"}, index=frame.index)
+
+    def events_frame(self, include_open=True):
+        events = self.events + (list(self.open.values()) if include_open else [])
+        return pd.DataFrame(events, columns=["a", "b", "start", "end", "rho_typical", "rho_ew", "rho_rolling"])
+
+
+def _run_job(run_dir, out_dir, kwargs):
+    start = time.perf_counter()
+    frame = resample_run(run_dir)
+    monitor = CorrelationMonitor(frame.columns, **kwargs)
+    result = monitor.process_frame(frame)
+    seconds = time.perf_counter() - start
+    events = monitor.events_frame()
+    events.insert(0, "run", Path(run_dir).name)
+    if out_dir is not None:
+        out = Path(out_dir)
+        events.to_csv(out / f"{Path(run_dir).name}_events.csv", index=False)
+        if monitor.snapshots:
+            np.savez_compressed(out / f"{Path(run_dir).name}_snapshots.npz",
+                                time=np.array([s[0] for s in monitor.snapshots]),
+                                rolling=np.stack([s[1] for s in monitor.snapshots]),
+                                ew=np.stack([s[2] for s in monitor.snapshots]), columns=np.array(monitor.columns))
+    return {"run": Path(run_dir).name, "samples": len(frame), "alert": float(result["alert"].mean()),
+            "events": events, "seconds": seconds}
+
+
+def monitor_runs(root="databases/data_csv", pattern="cd*", out_dir=OUT_DIR, workers=None, **kwargs):
+    """每个 run 重采样后从头跑一个 CorrelationMonitor（进程池），返回每个 run 的摘要与事件表。"""
+    folders = run_folders(root, pattern)
+    if out_dir is not None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count(), len(folders)) or 1
+    if workers == 1:
+        return [_run_job(f, out_dir, kwargs) for f in folders]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_run_job, folders, [out_dir] * len(folders), [kwargs] * len(folders)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("runs", "tail"))
+    parser.add_argument("path", nargs="?", default="databases/data_csv",
+                        help="runs: folder of cd* runs; tail: folder with live CSVs")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--window", type=int, default=120, help="rolling window in samples")
+    parser.add_argument("--halflife", type=float, default=2880, help="EW half-life in samples")
+    parser.add_argument("--min-rho", type=float, default=0.8)
+    parser.add_argument("--drop", type=float, default=0.5)
+    parser.add_argument("--persist", type=int, default=10)
+    parser.add_argument("--snapshot-every", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    kwargs = dict(window=args.window, halflife=args.halflife, min_rho=args.min_rho, drop=args.drop,
+                  persist=args.persist, snapshot_every=args.snapshot_every)
+
+    if args.command == "tail":
+        from anomaly_detector import AnomalySink, STATS_PATH, load_channel_stats
+        from stream_pipeline import tail_dir
+
+        monitor = CorrelationMonitor(load_channel_stats(STATS_PATH).index, **kwargs)
+        printed = set()
+
+        def report(result):
+            for event in list(monitor.open.values()) + monitor.events[-len(monitor.open) - 10:]:
+                state = (id(event), event["end"] is None)
+                if state not in printed:
+                    printed.add(state)
+                    print(f"{event['start']} {event['a']} ~ {event['b']}: rho_ew {event['rho_ew']:.2f}, "
+                          f"rolling {event['rho_rolling']:.2f}" + (f", ended {event['end']}" if event["end"] else ""))
+
+        monitor.listeners.append(report)
+        asyncio.run(tail_dir(args.path, [AnomalySink(monitor)]))
+        return
+
+    start = time.perf_counter()
+    results = monitor_runs(args.path, out_dir=args.out, workers=args.workers, **kwargs)
+    print(f"{'run':>10} {'samples':>8} {'alert':>7} {'events':>7} {'seconds':>8} {'samples/s':>10}")
+    for r in results:
+        print(f"{r['run']:>10} {r['samples']:>8} {r['alert']:>7.1%} {len(r['events']):>7} {r['seconds']:>8.2f} "
+              f"{r['samples'] / r['seconds']:>10.0f}")
+    events = pd.concat([r["events"] for r in results], ignore_index=True)
+    if len(events):
+        print(events.groupby(["a", "b"]).size().sort_values(ascending=False).head(10).to_string())
+    print(f"done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""传感器 CSV 统一读取入口（cooling / maxigauge / temperature）。
+
+    from data_loader import load_sensor_csv
+    df = load_sensor_csv("databases/data_csv/cd230831/cooling.csv")
+    df, stats = load_sensor_csv(path, report=True)   # stats: rows, seconds, peak_mb
+
+返回列 datetime (datetime64[ns]), channel (int16), value (float32)，按文件原顺序。
+cooling.csv 的 (channel, io) 被合并为一个通道编码：
+    (0, 0) -> 0, (0, 1) -> 1, (1, 0) -> 10, 其余 -> 11
+装有 pyarrow 时用 pyarrow 引擎读取，否则用 pandas C 引擎并按 DATETIME_FORMAT 解析时间。
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+CSV_DTYPES = {"channel": "int16", "io": "int8", "value": "float32"}
+
+
+def remap_cooling_channel(channel, io):
+    """(channel, io) -> 通道编码，整列数组运算。"""
+    channel = np.asarray(channel)
+    io = np.asarray(io)
+    code = np.full(channel.shape, 11, dtype=np.int16)
+    ch0 = channel == 0
+    code[ch0 & (io == 0)] = 0
+    code[ch0 & (io == 1)] = 1
+    code[(channel == 1) & (io == 0)] = 10
+    return code
+
+
+def parse_datetime(values):
+    """先按固定格式解析（快速路径），格式不符时退回 ISO8601 通用解析。"""
+    try:
+        return pd.to_datetime(values, format=DATETIME_FORMAT)
+    except ValueError:
+        return pd.to_datetime(values, format="ISO8601")
+
+
+def _read_csv(path, **kwargs):
+    # pyarrow 引擎多线程解析，并直接把时间列解析成 timestamp（不产生 Python 字符串）；未安装时用 C 引擎
+    if _HAS_PYARROW:
+        return pd.read_csv(path, engine="pyarrow", **kwargs)
+    return pd.read_csv(path, **kwargs)
+
+
+def _load(path):
+    columns, dtypes = csv_columns(path)
+    df = _read_csv(path, usecols=columns, dtype=dtypes)
+    return normalize_frame(df)
+
+
+def csv_columns(path):
+    """文件中需要读取的列及其紧凑 dtype。"""
+    header = pd.read_csv(path, nrows=0).columns
+    columns = [col for col in ("channel", "io", "value", "datetime") if col in header]
+    return columns, {col: CSV_DTYPES[col] for col in columns if col in CSV_DTYPES}
+
+
+def normalize_frame(df):
+    """原始列 -> (datetime, channel, value)：合并 cooling 的 (channel, io)，解析时间。"""
+    channel = df["channel"].to_numpy()
+    if "io" in df.columns:
+        channel = remap_cooling_channel(channel, df["io"].to_numpy())
+    stamps = df["datetime"]
+    if not pd.api.types.is_datetime64_dtype(stamps):
+        stamps = parse_datetime(stamps)
+    return pd.DataFrame({
+        "datetime": np.asarray(stamps, dtype="datetime64[ns]"),
+        "channel": channel,
+        "value": df["value"].to_numpy(),
+    })
+
+
+def load_sensor_csv(path, report=False):
+    if not report:
+        return _load(path)
+    # tracemalloc 统计 Python 与 NumPy/pandas 数组的分配峰值（pyarrow 内部缓冲区不计入）
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    df = _load(path)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    if not started:
+        tracemalloc.stop()
+    return df, {"rows": len(df), "seconds": seconds, "peak_mb": peak / 2 ** 20}
+
+
+def load_sensor_csv_legacy(path):
+    """data_imterpolate.py 原来的读取方式（逐行 apply），仅用于对比。"""
+    df = pd.read_csv(path)
+    df["datetime"] = pd.to_datetime(df["datetime"], format=DATETIME_FORMAT)
+    if "io" in df.columns:
+        df["channel"] = df.apply(lambda row: 0 if (row["channel"] == 0 and row["io"] == 0) else
+                                 1 if (row["channel"] == 0 and row["io"] == 1) else
+                                 10 if (row["channel"] == 1 and row["io"] == 0) else
+                                 11, axis=1)
+    return df[["datetime", "channel", "value"]]
+
+
+if __name__ == "__main__":
+    # python data_loader.py databases/data_csv/*/cooling.csv
+    paths = sys.argv[1:] or ["databases/data_csv/cd230831/cooling.csv"]
+    print(f"{'file':<45} {'rows':>7} {'legacy s':>9} {'legacy MB':>10} {'load s':>8} {'load MB':>8}")
+    for path in paths:
+        tracemalloc.start()
+        start = time.perf_counter()
+        old = load_sensor_csv_legacy(path)
+        old_seconds, old_peak = time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        df, stats = load_sensor_csv(path, report=True)
+        assert (old["channel"].to_numpy() == df["channel"].to_numpy()).all()
+        assert (old["datetime"].to_numpy() == df["datetime"].to_numpy()).all()
+        assert np.allclose(old["value"].to_numpy(), df["value"].to_numpy(), rtol=1e-6)
+        print(f"{path:<45} {stats['rows']:>7} {old_seconds:>9.3f} {old_peak:>10.1f} "
+              f"{stats['seconds']:>8.3f} {stats['peak_mb']:>8.1f}")
@@ -1,47 +1,19 @@
 import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pandas as pd
 
-def data_vis(df):
-    df['datetime'] = pd.to_datetime(df['datetime'])  # transform the time format
-    df = df.sort_values("datetime")  # rank according to the time series
+from plotting import FIG_WIDTH, DPI, plot_channels
 
-    # load all the sensor channels
-    channels = df['channel'].unique()
 
-    # set the font size
-    plt.rcParams.update({'font.size': 5})  
+def data_vis(df, method="minmax", points=None, path=None):
+    """Plot every channel of a (datetime, channel, value) frame in its own subplot.
 
-    # set the figure size
-    fig, axes = plt.subplots(nrows=len(channels), ncols=1, figsize=(6, len(channels) * 1.5), sharex=True)
-
-    if len(channels) == 1:
-        axes = [axes]
-
-    # Traverse each channel, drawing the separate subgraph
-    for i, channel in enumerate(channels):
-        sub_df = df[df['channel'] == channel]  # select the data for a specific channel
-        axes[i].plot(sub_df['datetime'], sub_df['value'], label=f"Channel {channel}", color='b')
-
-        # set time format
-        axes[i].xaxis.set_major_locator(mdates.HourLocator(interval=12)) # every 12hs
-        axes[i].xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))  # time format
-
-        # Get all scales for the current X-axis
-        tick_labels = [label.get_text() for label in axes[i].get_xticklabels()]
-    
-        # Keep only part of the label, 1 out of every 4 labels
-        for j, label in enumerate(axes[i].get_xticklabels()):
-            if j % 4 != 0: 
-                label.set_visible(False)
-
-        axes[i].set_ylabel("Value")
-        axes[i].set_title(f"Time Series for Channel {channel}")
-        axes[i].legend()
-        axes[i].grid(True)
-
-    # Format the X-axis
-    plt.xlabel("Time")
-    plt.xticks(rotation=15)  # Rotate the X-axis scale to prevent overlap
-    plt.tight_layout()
-    plt.show()
+    Channels are grouped in one pass and downsampled to about one point per pixel
+    (see plotting.py). With path the figure is saved instead of shown.
+    """
+    # one subplot per channel, same layout as before
+    fig = plt.figure(figsize=(FIG_WIDTH, max(df['channel'].nunique(), 1) * 1.5), dpi=DPI)
+    plot_channels(df, method=method, points=points, fig=fig)
+    if path is not None:
+        fig.savefig(path)
+        plt.close(fig)
+    else:
+        plt.show()
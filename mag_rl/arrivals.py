@@ -0,0 +1,129 @@
+"""到达过程：开放系统中持续提交的 DAG 作业流，供 open_env.OpenSchedulingEnv 使用。
+
+    arrivals = PoissonArrivals(rate=0.2, num_tasks=(4, 12), seed=0)
+    arrivals = MMPPArrivals(rates=(0.05, 0.6), mean_sojourn=(300, 40), seed=0)   # 平稳期 / 突发期交替
+    arrivals = TraceArrivals("jobs.jsonl")                                          # 回放提交记录
+    for time, tasks, edges in arrivals:                                             # 按时间顺序、无限（或到 limit 为止）
+        ...
+
+到达时刻是连续时间，交给环境时向上取整到整数时间单位（同一单位内可以到达多个作业）。
+每次 iter() 从当前随机状态继续产生新的序列；要让不同调度策略看到同一个作业流，用相同的 seed 构造，
+或在每次迭代前调用 seed()。
+
+轨迹文件：
+    .jsonl  每行 {"time": 12.5, "tasks": [...], "edges": [[0, 1], ...]}（scheduler_service 的 submit 格式），
+            或 {"time": 12.5, "num_tasks": 8}（任务图由 simulator 生成）
+    .csv    time 列，可选 num_tasks 列
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from task_simulator import TaskSimulator
+
+BLOCK = 1024  # 一次生成的到达间隔数
+
+
+class ArrivalProcess:
+    """num_tasks: 每个作业的任务数，整数或 (最少, 最多)。limit: 最多产生的作业数（None = 无限）。"""
+
+    def __init__(self, num_tasks=(4, 12), simulator=None, seed=None, limit=None, **simulator_kwargs):
+        self.num_tasks = num_tasks
+        self.simulator = simulator or TaskSimulator(seed=seed, **simulator_kwargs)
+        self.limit = limit
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        # 到达时刻与任务图用两条独立的随机流
+        times, graphs = np.random.SeedSequence(seed).spawn(2)
+        self.rng = np.random.default_rng(times)
+        self.simulator.seed(graphs)
+
+    def _times(self):
+        raise NotImplementedError
+
+    def _size(self):
+        if isinstance(self.num_tasks, int):
+            return self.num_tasks
+        lo, hi = self.num_tasks
+        return int(self.rng.integers(lo, hi + 1))
+
+    def __iter__(self):
+        for k, t in enumerate(self._times()):
+            if self.limit is not None and k >= self.limit:
+                return
+            tasks, edges = self.simulator.generate_dag(self._size())
+            yield math.ceil(t), tasks, edges
+
+
+class PoissonArrivals(ArrivalProcess):
+    """rate: 每个时间单位平均到达的作业数。"""
+
+    def __init__(self, rate, **kwargs):
+        self.rate = rate
+        super(PoissonArrivals, self).__init__(**kwargs)
+
+    def _times(self):
+        now = 0.0
+        while True:
+            times = now + np.cumsum(self.rng.exponential(1 / self.rate, size=BLOCK))
+            yield from times.tolist()
+            now = times[-1]
+
+
+class MMPPArrivals(ArrivalProcess):
+    """马尔可夫调制泊松过程：在状态 i 停留 Exp(mean_sojourn[i]) 个时间单位，期间按 rates[i] 泊松到达，
+    然后等概率跳到另一个状态。两个状态时就是平稳期 / 突发期交替。"""
+
+    def __init__(self, rates=(0.05, 0.6), mean_sojourn=(300, 40), **kwargs):
+        if len(rates) != len(mean_sojourn) or len(rates) < 2:
+            raise ValueError("rates and mean_sojourn need one entry per state (at least 2)")
+        self.rates = tuple(rates)
+        self.mean_sojourn = tuple(mean_sojourn)
+        super(MMPPArrivals, self).__init__(**kwargs)
+
+    @property
+    def mean_rate(self):
+        """长期平均到达率（各状态停留时间加权）。"""
+        return float(np.dot(self.rates, self.mean_sojourn) / np.sum(self.mean_sojourn))
+
+    def _times(self):
+        now, state, k = 0.0, 0, len(self.rates)
+        while True:
+            span = self.rng.exponential(self.mean_sojourn[state])
+            # 一段停留内的到达数服从泊松分布，到达时刻在段内均匀分布
+            n = self.rng.poisson(self.rates[state] * span)
+            yield from (now + np.sort(self.rng.uniform(0, span, size=n))).tolist()
+            now += span
+            state = (state + int(self.rng.integers(1, k))) % k
+
+
+class TraceArrivals(ArrivalProcess):
+    """回放轨迹文件，按 time 排序。没有给出任务图的作业由 simulator 按 num_tasks 生成。"""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        if str(path).endswith(".csv"):
+            frame = pd.read_csv(path)
+            self.jobs = [{key: value for key, value in row.items() if pd.notna(value)}
+                         for row in frame.to_dict("records")]
+        else:
+            with open(path) as f:
+                self.jobs = [json.loads(line) for line in f if line.strip()]
+        self.jobs.sort(key=lambda job: job["time"])
+        super(TraceArrivals, self).__init__(**kwargs)
+
+    def _times(self):
+        return (job["time"] for job in self.jobs)
+
+    def __iter__(self):
+        for k, job in enumerate(self.jobs):
+            if self.limit is not None and k >= self.limit:
+                return
+            if "tasks" in job:
+                tasks, edges = job["tasks"], [tuple(e) for e in job.get("edges", [])]
+            else:
+                tasks, edges = self.simulator.generate_dag(int(job.get("num_tasks", self._size())))
+            yield math.ceil(job["time"]), tasks, edges
@@ -0,0 +1,200 @@
+"""B 个独立调度 episode 同步推进的批量环境（stable-baselines3 VecEnv）。
+
+所有 episode 的状态保存在 (B, tasks) / (B, slots) 的二维数组中，一次 step(actions)
+向量化地推进全部 episode，结束的 episode 自动换一张新的 DAG 重置。
+奖励与观测的计算规则与 SingleAgentSchedulingEnv 完全一致。
+
+    env = BatchSchedulingEnv(num_envs=64)
+    model = PPO("MlpPolicy", env, n_steps=128)
+"""
+import random
+
+import numpy as np
+import stable_baselines3
+from stable_baselines3.common.vec_env import VecEnv
+
+# VecEnv 的空间类型要与所装 stable-baselines3 一致：2.x 基于 gymnasium，1.x 基于 gym
+if int(stable_baselines3.__version__.split(".")[0]) >= 2:
+    from gymnasium import spaces
+else:
+    from gym import spaces
+
+from single_scheduling_env import WAITING, RUNNING, DONE, TYPE_RESOURCES, TASK_FEATURES
+from task_simulator import TaskSimulator
+
+
+class BatchSchedulingEnv(VecEnv):
+    def __init__(self, num_envs, simulator=None, resource_pool=None):
+        self.simulator = simulator or TaskSimulator()
+        self.resource_pool = resource_pool or {"CPU": 2, "GPU": 2, "QPU": 1}
+        self.num_tasks = self.simulator.num_tasks
+        self.rtypes = list(self.resource_pool)
+        self.slot_type = np.repeat(np.arange(len(self.rtypes)), list(self.resource_pool.values()))
+        self.num_slots = len(self.slot_type)
+        self._slot_onehot = np.eye(len(self.rtypes), dtype=np.int64)[self.slot_type]  # (S, R)
+
+        B, N, S, R = num_envs, self.num_tasks, self.num_slots, len(self.rtypes)
+        self._rows = np.arange(B)
+
+        # 每个 episode 的静态属性，换 DAG 时按行重写
+        self.priority = np.zeros((B, N), dtype=np.int64)
+        self.duration = np.zeros((B, N), dtype=np.int64)
+        self.wait_penalty = np.zeros((B, N), dtype=np.float64)
+        self.parents = np.zeros((B, N, N), dtype=bool)  # parents[b, child, parent]
+        self.needs = np.zeros((B, N, R), dtype=bool)
+
+        # 动态状态
+        self.status = np.zeros((B, N), dtype=np.int8)
+        self.remaining = np.zeros((B, N), dtype=np.int64)
+        self.slots = np.zeros((B, S), dtype=np.int64)
+        self.time = np.zeros(B, dtype=np.int64)
+        self.num_done = np.zeros(B, dtype=np.int64)
+
+        # 观测缓冲区，布局与 SingleAgentSchedulingEnv._get_obs 相同
+        obs_dim = 1 + TASK_FEATURES * N + S
+        self._obs = np.zeros((B, obs_dim), dtype=np.float32)
+        self._obs_tasks = self._obs[:, 1:1 + TASK_FEATURES * N].reshape(B, N, TASK_FEATURES)
+        self._obs_slots = self._obs[:, 1 + TASK_FEATURES * N:]
+        # 等待惩罚缓冲区：第 0 列放当前 reward，其余列为各任务惩罚（非等待任务为 0）
+        self._penalty_buf = np.zeros((B, N + 1), dtype=np.float64)
+
+        self._actions = None
+        self.render_mode = None
+        observation_space = spaces.Box(low=0, high=100, shape=(obs_dim,), dtype=np.float32)
+        action_space = spaces.Discrete(N)
+        super(BatchSchedulingEnv, self).__init__(num_envs, observation_space, action_space)
+
+    def _load_dag(self, b):
+        tasks, edges = self.simulator.generate_dag()
+        self.priority[b] = [t["priority"] for t in tasks]
+        self.duration[b] = [t["duration"] for t in tasks]
+        self.wait_penalty[b] = 0.05 * self.priority[b]
+        self.parents[b] = False
+        for parent, child in edges:
+            self.parents[b, child, parent] = True
+        self.needs[b] = False
+        for i, task in enumerate(tasks):
+            for rtype in TYPE_RESOURCES.get(task["type"], ()):
+                self.needs[b, i, self.rtypes.index(rtype)] = True
+
+        self.status[b] = WAITING
+        self.remaining[b] = 0
+        self.slots[b] = 0
+        self.time[b] = 0
+        self.num_done[b] = 0
+        self._obs_tasks[b, :, 2] = self.priority[b]
+        self._obs_tasks[b, :, 3] = self.duration[b]
+        self._obs_tasks[b, :, 4] = self.parents[b].sum(axis=1)
+
+    def _update_obs(self):
+        self._obs[:, 0] = self.time
+        self._obs_tasks[:, :, 0] = self.status
+        self._obs_tasks[:, :, 1] = self.remaining
+        self._obs_slots[:] = self.slots
+
+    def reset(self):
+        for b in range(self.num_envs):
+            self._load_dag(b)
+        self._update_obs()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        rows, a = self._rows, self._actions
+        reward = np.zeros(self.num_envs, dtype=np.float64)
+
+        # 合法性：任务在等待且所有前置任务已完成
+        blocked = (self.parents[rows, a] & (self.status != DONE)).any(axis=1)
+        valid = (self.status[rows, a] == WAITING) & ~blocked
+
+        # 每种所需资源取第一个空闲槽位
+        need = self.needs[rows, a]
+        free = self.slots == 0
+        allocated = valid & need.any(axis=1)
+        chosen = []
+        for r in range(len(self.rtypes)):
+            candidates = free & (self.slot_type == r)
+            first = candidates.argmax(axis=1)
+            allocated &= candidates[rows, first] | ~need[:, r]
+            chosen.append(first)
+
+        dur = self.duration[rows, a]
+        for r, first in enumerate(chosen):
+            take = allocated & need[:, r]
+            self.slots[take, first[take]] = dur[take]
+        self.status[allocated, a[allocated]] = RUNNING
+        self.remaining[allocated, a[allocated]] = dur[allocated]
+
+        reward[~valid] -= 3  # 惩罚非法动作
+        reward[allocated] += 2 * self.priority[allocated, a[allocated]]
+        reward[valid & ~allocated] -= 1  # 没有分配成功但任务合法
+
+        # 时间前进一步
+        self.time += 1
+        np.subtract(self.slots, 1, out=self.slots, where=self.slots > 0)
+        running = self.status == RUNNING
+        self.remaining -= running
+        finished = running & (self.remaining <= 0)
+        self.status[finished] = DONE
+        num_finished = finished.sum(axis=1)
+        self.num_done += num_finished
+        reward += 10 * num_finished  # 完成奖励
+
+        # 等待惩罚：沿任务维逐项相减，浮点结果与单环境逐任务 reward -= ... 一致
+        self._penalty_buf[:, 0] = reward
+        np.multiply(self.wait_penalty, self.status == WAITING, out=self._penalty_buf[:, 1:])
+        reward = np.subtract.accumulate(self._penalty_buf, axis=1)[:, -1]
+
+        dones = self.num_done == self.num_tasks
+        reward[dones] += 20
+
+        self._update_obs()
+        infos = [{} for _ in range(self.num_envs)]
+        for b in np.flatnonzero(dones):
+            infos[b]["terminal_observation"] = self._obs[b].copy()
+            self._load_dag(b)
+        if dones.any():
+            self._update_obs()
+
+        return self._obs.copy(), reward.astype(np.float32), dones, infos
+
+    def action_masks(self):
+        """(B, tasks) 的动作掩码，规则与 SingleAgentSchedulingEnv.action_masks 相同。"""
+        blocked = (self.parents & (self.status != DONE)[:, None, :]).any(axis=2)
+        ready = (self.status == WAITING) & ~blocked
+        has_free = ((self.slots == 0) @ self._slot_onehot) > 0  # (B, R)
+        type_ok = (~self.needs | has_free[:, None, :]).all(axis=2) & self.needs.any(axis=2)
+        mask = ready & type_ok
+        stuck = ~mask.any(axis=1)
+        mask[stuck] = ready[stuck]
+        mask[~mask.any(axis=1)] = True
+        return mask
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        # 传入的 simulator 不一定有 seed 方法（旧版 TaskSimulator 直接用全局 random 模块），此时设定全局随机数
+        if hasattr(self.simulator, "seed"):
+            self.simulator.seed(seed)
+        else:
+            random.seed(seed)
+        return [seed] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        if method_name == "action_masks":
+            # MaskablePPO 通过 env_method 逐个环境取掩码
+            return [result[i] for i in self._get_indices(indices)]
+        return [result] * len(self._get_indices(indices))
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
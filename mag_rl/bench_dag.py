@@ -0,0 +1,68 @@
+"""DAGs/sec benchmark: DagGenerator vs. the original double-loop TaskSimulator.generate_dag.
+
+Usage: python bench_dag.py [--tasks 6 100 1000] [--large 10000] [--seconds 1.0]
+"""
+import argparse
+import random
+import time
+
+from dag_generator import DagGenerator, TOPOLOGIES
+
+
+def legacy_generate_dag(num_tasks, quantum_ratio=0.3, hybrid_ratio=0.2, max_duration=5):
+    """原来的 TaskSimulator.generate_dag（逐任务、逐对 random.random()）。"""
+    tasks = []
+    for i in range(num_tasks):
+        task_type = random.choices(["classical", "quantum", "hybrid"],
+                                   weights=[1.0 - quantum_ratio - hybrid_ratio, quantum_ratio, hybrid_ratio])[0]
+        if task_type == "quantum":
+            need = ["QPU"]
+        elif task_type == "classical":
+            need = ["CPU"] if random.random() < 0.5 else ["GPU"]
+        else:
+            need = ["QPU", "CPU" if random.random() < 0.5 else "GPU"]
+        tasks.append({"id": f"T{i}", "type": task_type, "need": need,
+                      "duration": random.randint(1, max_duration), "priority": random.randint(1, 3)})
+    edges = []
+    for i in range(num_tasks):
+        for j in range(i + 1, num_tasks):
+            if random.random() < 0.3:
+                edges.append((i, j))
+    return tasks, edges
+
+
+def rate(fn, seconds):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        count += fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[6, 100, 1000])
+    parser.add_argument("--large", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print("random topology, edge_prob=0.3")
+    print(f"{'tasks':>7} {'legacy DAGs/s':>14} {'generate_many DAGs/s':>21}")
+    for n in args.tasks:
+        gen = DagGenerator(num_tasks=n, seed=0)
+        batch = max(1, args.batch * 6 // n)
+        old = rate(lambda: legacy_generate_dag(n) and 1, args.seconds)
+        new = rate(lambda: len(gen.generate_many(batch)["task_ptr"]) - 1, args.seconds)
+        print(f"{n:>7} {old:>14.1f} {new:>21.1f}")
+
+    n = args.large
+    print(f"\n{n} tasks per DAG (random uses edge_prob=2.5/n)")
+    print(f"{'topology':>16} {'DAGs/s':>9} {'edges/DAG':>10}")
+    for topology in TOPOLOGIES:
+        gen = DagGenerator(num_tasks=n, topology=topology, edge_prob=2.5 / n, seed=0)
+        edges = len(gen.generate()["edges"])
+        print(f"{topology:>16} {rate(lambda: len(gen.generate_many(8)['task_ptr']) - 1, args.seconds):>9.1f} {edges:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Steps/sec benchmark: NumPy SingleAgentSchedulingEnv vs. the original list-based version,
+plus the aggregate throughput of BatchSchedulingEnv.
+
+Usage: python bench_env.py [--steps 20000] [--tasks 6 20 100] [--batch 1 16 256]
+
+Every run first replays the same random action sequence through both envs and
+checks that observations, rewards and done flags match exactly.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from batch_env import BatchSchedulingEnv
+from single_scheduling_env import SingleAgentSchedulingEnv
+from task_simulator import TaskSimulator
+
+RESOURCE_POOL = {"CPU": 2, "GPU": 2, "QPU": 1}
+
+
+class LegacySchedulingEnv:
+    """原始的纯 Python 实现，仅用于对照（逻辑保持不变）。"""
+
+    def __init__(self, tasks, edges, resource_pool):
+        self.tasks = tasks
+        self.edges = edges
+        self.resource_pool = resource_pool
+        self.dependency_map = {i: [] for i in range(len(tasks))}
+        for parent, child in edges:
+            self.dependency_map[child].append(parent)
+        self.reset()
+
+    def reset(self):
+        self.resource_status = {rtype: [0] * count for rtype, count in self.resource_pool.items()}
+        self.task_status = ["waiting"] * len(self.tasks)
+        self.task_remaining_time = [0] * len(self.tasks)
+        self.time = 0
+        self.resource_log = []
+        return self._get_obs()
+
+    def _dependencies_satisfied(self, task_id):
+        return all(self.task_status[parent] == "done" for parent in self.dependency_map.get(task_id, []))
+
+    def _get_obs(self):
+        obs = [self.time]
+        for i in range(len(self.tasks)):
+            obs.extend([
+                0 if self.task_status[i] == "waiting" else 1 if self.task_status[i] == "running" else 2,
+                self.task_remaining_time[i],
+                self.tasks[i]["priority"],
+                self.tasks[i]["duration"],
+                len(self.dependency_map.get(i, []))
+            ])
+        flat_resources = [val for res in self.resource_status.values() for val in res]
+        obs.extend(flat_resources)
+        return np.array(obs, dtype=np.float32)
+
+    def _log_resource_usage(self):
+        self.resource_log.append({
+            "time": self.time,
+            "CPU": sum(self.resource_status.get("CPU", [])),
+            "GPU": sum(self.resource_status.get("GPU", [])),
+            "QPU": sum(self.resource_status.get("QPU", []))
+        })
+
+    def _take(self, rtype):
+        return next((i for i, val in enumerate(self.resource_status[rtype]) if val == 0), None)
+
+    def step(self, action):
+        reward = 0
+        done = False
+        valid = self.task_status[action] == "waiting" and self._dependencies_satisfied(action)
+        if not valid:
+            reward -= 3
+        else:
+            task = self.tasks[action]
+            needed = {"quantum": ["QPU"], "classical": ["CPU"], "hybrid": ["QPU", "GPU"]}.get(task["type"], [])
+            free = [self._take(r) for r in needed]
+            if needed and all(i is not None for i in free):
+                for r, i in zip(needed, free):
+                    self.resource_status[r][i] = task["duration"]
+                self.task_status[action] = "running"
+                self.task_remaining_time[action] = task["duration"]
+                reward += task["priority"] * 2
+            else:
+                reward -= 1
+
+        self.time += 1
+        for rtype in self.resource_status:
+            for i in range(len(self.resource_status[rtype])):
+                self.resource_status[rtype][i] = max(0, self.resource_status[rtype][i] - 1)
+        for i, status in enumerate(self.task_status):
+            if status == "running":
+                self.task_remaining_time[i] -= 1
+                if self.task_remaining_time[i] <= 0:
+                    self.task_status[i] = "done"
+                    reward += 10
+        for i, status in enumerate(self.task_status):
+            if status == "waiting":
+                reward -= 0.05 * self.tasks[i]["priority"]
+        if all(status == "done" for status in self.task_status):
+            reward += 20
+            done = True
+        self._log_resource_usage()
+        return self._get_obs(), reward, done, {}
+
+
+def make_actions(num_tasks, steps, seed):
+    rng = random.Random(seed)
+    return [rng.randrange(num_tasks) for _ in range(steps)]
+
+
+def check_parity(tasks, edges, actions):
+    new = SingleAgentSchedulingEnv(tasks, edges, RESOURCE_POOL)
+    old = LegacySchedulingEnv(tasks, edges, RESOURCE_POOL)
+    assert np.array_equal(new.reset(), old.reset())
+    for a in actions:
+        o1, r1, d1, _ = new.step(a)
+        o2, r2, d2, _ = old.step(a)
+        assert np.array_equal(o1, o2) and r1 == r2 and d1 == d2, (a, r1, r2)
+        if d1:
+            new.reset()
+            old.reset()
+    assert new.resource_log == old.resource_log
+
+
+class ReplaySimulator:
+    """按顺序返回事先生成好的 DAG，保证批量环境与单环境使用同一批任务图。"""
+
+    def __init__(self, dags):
+        self.num_tasks = len(dags[0][0])
+        self.dags = list(dags)
+
+    def generate_dag(self):
+        return self.dags.pop(0)
+
+
+def check_batch_parity(num_tasks, batch, steps, seed):
+    rng = random.Random(seed)
+    sim = TaskSimulator(num_tasks=num_tasks, seed=seed)
+    dags = [sim.generate_dag() for _ in range(batch)]
+    singles = [SingleAgentSchedulingEnv(t, e, RESOURCE_POOL) for t, e in dags]
+    # 额外的 DAG 供自动重置使用
+    env = BatchSchedulingEnv(batch, simulator=ReplaySimulator(dags + [sim.generate_dag() for _ in range(steps)]))
+    obs = env.reset()
+    for b, single in enumerate(singles):
+        assert np.array_equal(obs[b], single.reset())
+    live = np.ones(batch, dtype=bool)
+    for _ in range(steps):
+        actions = [rng.randrange(num_tasks) for _ in range(batch)]
+        obs, rewards, dones, infos = env.step(np.array(actions))
+        for b in np.flatnonzero(live):
+            o, r, d, _ = singles[b].step(actions[b])
+            assert np.float32(r) == rewards[b] and d == dones[b]
+            assert np.array_equal(o, infos[b]["terminal_observation"] if d else obs[b])
+            live[b] = not d
+
+
+def run_batch(num_tasks, batch, steps, seed):
+    rng = np.random.default_rng(seed)
+    env = BatchSchedulingEnv(batch, simulator=TaskSimulator(num_tasks=num_tasks, seed=seed))
+    env.reset()
+    actions = rng.integers(num_tasks, size=(steps, batch))
+    start = time.perf_counter()
+    for a in actions:
+        env.step(a)
+    return steps * batch / (time.perf_counter() - start)
+
+
+def run(env, actions):
+    env.reset()
+    start = time.perf_counter()
+    for a in actions:
+        _, _, done, _ = env.step(a)
+        if done:
+            env.reset()
+    return len(actions) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[6, 20, 100])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>6} {'legacy steps/s':>15} {'numpy steps/s':>15} {'speedup':>8}")
+    for n in args.tasks:
+        tasks, edges = TaskSimulator(num_tasks=n, seed=args.seed).generate_dag()
+        actions = make_actions(n, args.steps, args.seed)
+        check_parity(tasks, edges, actions)
+        old = run(LegacySchedulingEnv(tasks, edges, RESOURCE_POOL), actions)
+        new = run(SingleAgentSchedulingEnv(tasks, edges, RESOURCE_POOL), actions)
+        print(f"{n:>6} {old:>15.0f} {new:>15.0f} {new / old:>7.2f}x")
+
+    print(f"\n{'tasks':>6} {'batch':>6} {'env steps/s':>15}")
+    for n in args.tasks:
+        check_batch_parity(n, 8, 500, args.seed)
+        for batch in args.batch:
+            steps = max(args.steps // batch, 50)
+            print(f"{n:>6} {batch:>6} {run_batch(n, batch, steps, args.seed):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Sustained throughput of the heuristic schedulers in the open-system env.
+
+    python bench_open.py --process poisson --rate 0.2 --horizon 20000
+    python bench_open.py --process mmpp --rates 0.05 0.6 --sojourn 300 40 --cluster cluster.json
+    python bench_open.py --process trace --trace jobs.jsonl
+
+Every scheduler sees the same job stream (the arrival process is reseeded
+before each run). Rank-based schedulers precompute their order in reset(),
+so they are reset again whenever new jobs have been admitted. Metrics are the
+last --window time units at the end of the run: task / job throughput against
+the offered load, task queueing delay and job response time percentiles, and
+per-resource utilization. The last column is simulation speed.
+"""
+import argparse
+import time
+
+from arrivals import MMPPArrivals, PoissonArrivals, TraceArrivals
+from cluster import Cluster
+from open_env import OpenSchedulingEnv
+from schedulers import SCHEDULERS
+
+RESOURCE_POOL = {"CPU": 4, "GPU": 2, "QPU": 2}
+
+
+def run(scheduler, env, seed=0):
+    env.seed(seed)
+    env.reset()
+    scheduler.reset(env)
+    seen, done, steps = env.num_jobs, False, 0
+    start = time.perf_counter()
+    while not done:
+        if env.num_jobs != seen:
+            scheduler.reset(env)
+            seen = env.num_jobs
+        _, _, done, _ = env.step(scheduler.act(env))
+        steps += 1
+    row = env.metrics.snapshot(env.time)
+    row["steps/s"] = steps / (time.perf_counter() - start)
+    return row
+
+
+def make_arrivals(args):
+    kwargs = dict(num_tasks=tuple(args.num_tasks), topology=args.topology)
+    if args.process == "poisson":
+        return PoissonArrivals(args.rate, **kwargs)
+    if args.process == "mmpp":
+        return MMPPArrivals(args.rates, args.sojourn, **kwargs)
+    return TraceArrivals(args.trace, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--process", choices=["poisson", "mmpp", "trace"], default="poisson")
+    parser.add_argument("--rate", type=float, default=0.15, help="jobs per time unit (poisson)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.05, 0.4], help="per-state rates (mmpp)")
+    parser.add_argument("--sojourn", type=float, nargs="+", default=[300, 40], help="mean time per state (mmpp)")
+    parser.add_argument("--trace", help=".jsonl / .csv arrival trace")
+    parser.add_argument("--num-tasks", type=int, nargs=2, default=[3, 10])
+    parser.add_argument("--topology", default="random")
+    parser.add_argument("--cluster", help="Cluster JSON; default is a 4 CPU / 2 GPU / 2 QPU pool")
+    parser.add_argument("--capacity", type=int, default=128)
+    parser.add_argument("--backlog", type=int, default=100)
+    parser.add_argument("--horizon", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--schedulers", nargs="+", default=list(SCHEDULERS))
+    parser.add_argument("--no-event-driven", action="store_true")
+    args = parser.parse_args()
+    if args.process == "trace" and not args.trace:
+        parser.error("--process trace needs --trace")
+
+    pool = Cluster.load(args.cluster) if args.cluster else RESOURCE_POOL
+    env = OpenSchedulingEnv(make_arrivals(args), pool, capacity=args.capacity, horizon=args.horizon,
+                            event_driven=not args.no_event_driven, max_backlog=args.backlog, window=args.window)
+    rtypes = env.cluster.rtypes
+
+    print(f"{'scheduler':<14} {'offered':>8} {'thruput':>8} {'delay p50':>9} {'p95':>6} {'p99':>6} "
+          f"{'resp p50':>9} {'p95':>7} {'p99':>7} " + " ".join(f"{'util ' + r:>8}" for r in rtypes) +
+          f" {'rejected':>8} {'steps/s':>8}")
+    for name in args.schedulers:
+        sched = SCHEDULERS[name](seed=args.seed) if name == "random" else SCHEDULERS[name]()
+        row = run(sched, env, args.seed)
+        print(f"{name:<14} {row['arrival_rate']:>8.3f} {row['throughput']:>8.3f} {row['delay_p50']:>9.1f} "
+              f"{row['delay_p95']:>6.1f} {row['delay_p99']:>6.1f} {row['response_p50']:>9.1f} "
+              f"{row['response_p95']:>7.1f} {row['response_p99']:>7.1f} " +
+              " ".join(f"{row['util_' + r]:>8.3f}" for r in rtypes) +
+              f" {row['rejected']:>8} {row['steps/s']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Heuristic schedulers (and optionally trained SB3 models) on the same seeded DAGs.
+
+Usage:
+    python bench_schedulers.py --dags 2000 --tasks 6
+    python bench_schedulers.py --dags 1000 --tasks 6 --model maskable_ppo_scheduler --algo maskable_ppo
+    python bench_schedulers.py --dags 200 --tasks 50 --model gnn_ppo --max-tasks 64 --event-driven
+    python bench_schedulers.py --dags 1000 --tasks 20 --availability ../databases/simulated_TimeGAN_output.csv
+
+Per scheduler it reports the mean makespan, mean task wait (start time minus the
+time the task became ready), resource utilization, the share of episodes that
+finished within the step limit, and decisions/sec of the policy alone (time
+spent inside act()). Utilization is busy slot-time / (slots * makespan), where
+busy slot-time is what the episode actually occupied (env.busy_slot_time): run
+times after instance speed scaling, plus the partial runs of tasks aborted by a
+slot going offline.
+
+With --availability, QPU outages derived from a sensor signal (resource_health)
+are applied; each DAG starts at a random point of the signal, the same one for
+every scheduler. "requeued" is the mean number of tasks per episode aborted on
+a slot that went offline.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from obs_encoder import GraphObsEncoder
+from resource_health import load_availability
+from schedulers import SCHEDULERS, ModelScheduler, RandomScheduler
+from single_agent_env import RESOURCE_POOL
+from single_scheduling_env import SingleAgentSchedulingEnv
+from task_simulator import TaskSimulator
+
+
+def run_episode(env, scheduler, max_steps):
+    env.reset()
+    scheduler.reset(env)
+    decide = 0.0
+    done, steps = False, 0
+    while not done and steps < max_steps:
+        start = time.perf_counter()
+        action = scheduler.act(env)
+        decide += time.perf_counter() - start
+        _, _, done, _ = env.step(action)
+        steps += 1
+
+    started = env.start_time >= 0
+    return {
+        "done": done,
+        "makespan": env.time,
+        "wait": float((env.start_time[started] - env.ready_time[started]).mean()) if started.any() else 0.0,
+        "steps": steps,
+        "decide": decide,
+        "requeued": env.requeued,
+        "busy": env.busy_slot_time,
+    }
+
+
+def benchmark(schedulers, dags, resource_pool=None, event_driven=False, availability=None, seed=0):
+    """schedulers: {name: Scheduler}，dags: [(tasks, edges)]。所有策略在同一批 DAG 上运行。"""
+    resource_pool = resource_pool or RESOURCE_POOL
+    stats = {name: {"done": 0, "makespan": [], "wait": [], "util": [], "steps": 0, "decide": 0.0, "requeued": 0}
+             for name in schedulers}
+    rng = np.random.default_rng(seed)
+    for tasks, edges in dags:
+        episode_availability = None
+        if availability is not None and availability.horizon:
+            episode_availability = availability.shifted(int(rng.integers(availability.horizon)))
+        env = SingleAgentSchedulingEnv(tasks, edges, resource_pool, event_driven=event_driven,
+                                       availability=episode_availability)
+        max_steps = 2 * int(env.duration.sum()) + 10 * env.num_tasks
+        for name, scheduler in schedulers.items():
+            result = run_episode(env, scheduler, max_steps)
+            s = stats[name]
+            s["steps"] += result["steps"]
+            s["decide"] += result["decide"]
+            s["requeued"] += result["requeued"]
+            if result["done"]:
+                s["done"] += 1
+                s["makespan"].append(result["makespan"])
+                s["wait"].append(result["wait"])
+                s["util"].append(result["busy"] / (env.num_slots * result["makespan"]))
+
+    rows = []
+    for name, s in stats.items():
+        rows.append({
+            "scheduler": name,
+            "finished": s["done"] / len(dags),
+            "makespan": np.mean(s["makespan"]) if s["makespan"] else float("nan"),
+            "wait": np.mean(s["wait"]) if s["wait"] else float("nan"),
+            "utilization": np.mean(s["util"]) if s["util"] else float("nan"),
+            "decisions/s": s["steps"] / s["decide"] if s["decide"] else float("inf"),
+            "requeued": s["requeued"] / len(dags),
+        })
+    return rows
+
+
+def load_model(path, algo):
+    if algo == "maskable_ppo":
+        from sb3_contrib import MaskablePPO
+        return MaskablePPO.load(path)
+    from stable_baselines3 import PPO
+    return PPO.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dags", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=6)
+    parser.add_argument("--topology", default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--event-driven", action="store_true")
+    parser.add_argument("--model", nargs="*", default=[], help="saved SB3 model paths")
+    parser.add_argument("--algo", default="ppo", choices=("ppo", "maskable_ppo"))
+    parser.add_argument("--max-tasks", type=int, default=None,
+                        help="models trained with GraphObsEncoder(max_tasks)")
+    parser.add_argument("--max-edges", type=int, default=None,
+                        help="encoder edge capacity the models were trained with (default: SingleAgentEnv's)")
+    parser.add_argument("--availability", default=None, help="sensor CSV for QPU outages (resource_health)")
+    parser.add_argument("--threshold", type=float, default=4.0)
+    parser.add_argument("--recovery", type=int, default=10)
+    args = parser.parse_args()
+
+    simulator = TaskSimulator(num_tasks=args.tasks, seed=args.seed, topology=args.topology)
+    dags = [simulator.generate_dag() for _ in range(args.dags)]
+
+    schedulers = {name: cls() for name, cls in SCHEDULERS.items() if cls is not RandomScheduler}
+    schedulers["random"] = RandomScheduler(seed=args.seed)
+    for path in args.model:
+        encoder = None
+        if args.max_tasks:
+            max_edges = args.max_edges or simulator.generator.edge_bound(args.max_tasks)  # 按 --topology 的上界
+            encoder = GraphObsEncoder(args.max_tasks, max_edges, num_slots=sum(RESOURCE_POOL.values()))
+        schedulers[path] = ModelScheduler(load_model(path, args.algo), encoder, name=path)
+
+    availability = None
+    if args.availability:
+        availability = load_availability(args.availability, threshold=args.threshold, recovery=args.recovery)
+
+    mode = "event-driven" if args.event_driven else "tick"
+    print(f"{args.dags} DAGs x {args.tasks} tasks ({args.topology}, {mode})")
+    if availability is not None:
+        print(f"QPU offline {availability.offline_fraction():.1%} of {args.availability}")
+    print(f"{'scheduler':>16} {'finished':>9} {'makespan':>9} {'wait':>7} {'util':>6} {'requeued':>9} {'decisions/s':>12}")
+    for row in benchmark(schedulers, dags, event_driven=args.event_driven, availability=availability, seed=args.seed):
+        print(f"{row['scheduler']:>16} {row['finished']:>9.1%} {row['makespan']:>9.2f} {row['wait']:>7.2f} "
+              f"{row['utilization']:>6.1%} {row['requeued']:>9.2f} {row['decisions/s']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
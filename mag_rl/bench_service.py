@@ -0,0 +1,148 @@
+"""Load test for scheduler_service.py: bursts of concurrent jobs over one local socket each.
+
+    python bench_service.py --jobs 200 --concurrency 50
+    python bench_service.py --jobs 200 --model maskable_ppo_scheduler --algo maskable_ppo
+
+Starts the service in-process on an ephemeral TCP port, then runs --concurrency
+clients. Each client submits TaskSimulator DAGs and replays completions in
+logical time (a task placed at t finishes at t + duration, one time unit =
+--time-scale seconds of wall clock). All jobs share the service's --pool, so a
+job may have nothing running until another job frees slots; its placements then
+arrive as pushed event lines. Prints jobs/sec and the service's decision latency
+percentiles.
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import time
+from collections import defaultdict, deque
+
+from scheduler_service import SchedulingService, load_model, parse_pool
+from schedulers import SCHEDULERS
+from task_simulator import TaskSimulator
+
+
+class Connection:
+    """请求按顺序应答；带 "event" 的行是服务推送的放置结果，按作业放入各自的队列。"""
+
+    def __init__(self, reader, writer):
+        self.writer = writer
+        self.replies = deque()
+        self.pushed = defaultdict(asyncio.Queue)
+        self._reader = asyncio.ensure_future(self._read(reader))
+
+    async def _read(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "event" in message:
+                self.pushed[message["job"]].put_nowait(message)
+            else:
+                self.replies.popleft().set_result(message)
+
+    async def request(self, message):
+        future = asyncio.get_running_loop().create_future()
+        self.replies.append(future)
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+        reply = await future
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self):
+        self._reader.cancel()
+        self.writer.close()
+
+
+async def run_job(conn, tasks, edges, time_scale):
+    reply = await conn.request({"op": "submit", "tasks": tasks, "edges": edges})
+    job, now, events = reply["job"], 0, []
+    pushed = conn.pushed[job]
+
+    def add(placements):
+        for p in placements:
+            heapq.heappush(events, (now + tasks[p["task"]]["duration"], p["task"]))
+
+    add(reply["placements"])
+    done = reply["done"]
+    while not done:
+        while not pushed.empty():
+            add(pushed.get_nowait()["placements"])
+        if not events:  # 没有运行中的任务：等其他作业释放槽位后推送过来的放置结果
+            add((await pushed.get())["placements"])
+            continue
+        finish, task = heapq.heappop(events)
+        if time_scale:
+            await asyncio.sleep((finish - now) * time_scale)
+        now = finish
+        reply = await conn.request({"op": "complete", "job": job, "task": task, "time": now})
+        add(reply["placements"])
+        done = reply["done"]
+    del conn.pushed[job]
+    return now
+
+
+async def client(port, dags, time_scale, makespans):
+    conn = Connection(*await asyncio.open_connection("127.0.0.1", port))
+    for tasks, edges in dags:
+        makespans.append(await run_job(conn, tasks, edges, time_scale))
+    conn.close()
+
+
+async def main_async(args):
+    model = load_model(args.model, args.algo) if args.model else None
+    service = SchedulingService(model, maskable=args.algo == "maskable_ppo", heuristic=args.policy,
+                                max_tasks=args.max_tasks, resource_pool=parse_pool(args.pool),
+                                max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    await service.start()
+    server = await asyncio.start_server(service.serve_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    simulator = TaskSimulator(num_tasks=args.tasks, seed=args.seed)
+    dags = [simulator.generate_dag() for _ in range(args.jobs)]
+    makespans = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, dags[i::args.concurrency], args.time_scale, makespans)
+                           for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    metrics = service.metrics()
+    server.close()
+    await server.wait_closed()
+    await service.stop()
+
+    d = metrics["decision_latency"]
+    r = metrics["request_latency"]
+    print(f"{args.jobs} jobs x {args.tasks} tasks, {args.concurrency} concurrent clients, "
+          f"policy {args.model or args.policy}, pool {' '.join(args.pool)}")
+    print(f"  {args.jobs / elapsed:.1f} jobs/s, {d['count'] / elapsed:.0f} decisions/s, "
+          f"mean makespan {sum(makespans) / len(makespans):.2f}")
+    print(f"  decision latency p50 {d['p50_ms']:.3f} ms, p99 {d['p99_ms']:.3f} ms")
+    print(f"  request latency  p50 {r['p50_ms']:.3f} ms, p99 {r['p99_ms']:.3f} ms")
+    if metrics["mean_batch_size"] is not None:
+        print(f"  mean batch size {metrics['mean_batch_size']:.1f}, fallbacks {metrics['fallbacks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--time-scale", type=float, default=0.0, help="wall seconds per logical time unit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--algo", default="ppo", choices=("ppo", "maskable_ppo"))
+    parser.add_argument("--policy", default="heft", choices=tuple(SCHEDULERS))
+    parser.add_argument("--max-tasks", type=int, default=None)
+    parser.add_argument("--pool", nargs="+", default=["CPU=64", "GPU=32", "QPU=16"], help="shared pool as TYPE=COUNT")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
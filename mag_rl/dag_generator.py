@@ -0,0 +1,241 @@
+"""NumPy 任务图生成器：可复现的随机流、多种拓扑、批量生成紧凑数组。
+
+    gen = DagGenerator(num_tasks=10000, topology="layered", seed=42)
+    dag = gen.generate()           # 单个 DAG 的数组字典
+    batch = gen.generate_many(1000)  # 扁平数组 + task_ptr / edge_ptr 偏移
+    tasks, edges = to_task_list(dag)  # 转换成 SingleAgentSchedulingEnv 使用的格式
+
+拓扑：
+    random           每对 i < j 以 edge_prob 概率连边（TaskSimulator 原有的分布）
+    layered          分层 DAG，每个任务从上一层随机选 1..max_parents 个前置任务
+    fan              fork-join：单个任务扇出到 2..max_width 个并行任务，再扇入到下一个单任务
+    series_parallel  若干阶段串联，每个阶段是 1..max_width 条并行任务链（链长 1..max_chain）
+所有拓扑中边都满足 parent < child，编号顺序即一个拓扑序。
+"""
+import numpy as np
+
+TASK_TYPES = ("classical", "quantum", "hybrid")
+CLASSICAL, QUANTUM, HYBRID = 0, 1, 2
+
+# need 位掩码
+CPU, GPU, QPU = 1, 2, 4
+TOPOLOGIES = ("random", "layered", "fan", "series_parallel")
+
+# generate_many 一次性抽取的 (DAG, 边) 随机数上限
+_BATCH_PAIR_LIMIT = 4_000_000
+
+
+class DagGenerator:
+    def __init__(self, num_tasks=6, quantum_ratio=0.3, hybrid_ratio=0.2, max_duration=5,
+                 topology="random", edge_prob=0.3, max_parents=3, num_layers=None,
+                 max_width=4, max_chain=3, seed=None):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology: {topology}")
+        self.num_tasks = num_tasks
+        self.quantum_ratio = quantum_ratio
+        self.hybrid_ratio = hybrid_ratio
+        self.max_duration = max_duration
+        self.topology = topology
+        self.edge_prob = edge_prob
+        self.max_parents = max_parents
+        self.num_layers = num_layers
+        self.max_width = max_width
+        self.max_chain = max_chain
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    # ---- 任务属性 ----
+    def _task_attrs(self, n):
+        rng = self.rng
+        u = rng.random(n)
+        classical_ratio = 1.0 - self.quantum_ratio - self.hybrid_ratio
+        task_type = (u >= classical_ratio).astype(np.int8)
+        task_type += u >= classical_ratio + self.quantum_ratio
+        classical_part = np.where(rng.random(n) < 0.5, CPU, GPU).astype(np.uint8)
+        need = np.where(task_type == QUANTUM, QPU, classical_part).astype(np.uint8)
+        need[task_type == HYBRID] |= QPU
+        return {
+            "type": task_type,
+            "need": need,
+            "duration": rng.integers(1, self.max_duration + 1, size=n, dtype=np.int16),
+            "priority": rng.integers(1, 4, size=n, dtype=np.int8),
+        }
+
+    # ---- 拓扑 ----
+    def _random_edges(self, n):
+        num_pairs = n * (n - 1) // 2
+        if num_pairs == 0:
+            return np.empty((0, 2), dtype=np.int32)
+        if self.edge_prob >= 0.02:
+            pair = np.flatnonzero(self.rng.random(num_pairs) < self.edge_prob)
+        else:
+            # 稀疏图：先抽边数，再均匀抽取不重复的边编号，避免 O(n^2) 的随机数
+            m = self.rng.binomial(num_pairs, self.edge_prob)
+            pair = np.empty(0, dtype=np.int64)
+            while len(pair) < m:
+                more = self.rng.integers(0, num_pairs, size=m - len(pair))
+                pair = _sorted_unique(np.concatenate((pair, more)))
+        return _decode_pairs(n, pair)
+
+    def _random_edges_many(self, n, count):
+        # 小图：一次性为所有 DAG 抽取全部 (i, j) 对，省掉逐个 DAG 的调用开销
+        num_pairs = n * (n - 1) // 2
+        dag, pair = np.nonzero(self.rng.random((count, num_pairs)) < self.edge_prob)
+        edge_ptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dag, minlength=count), out=edge_ptr[1:])
+        return _decode_pairs(n, pair), edge_ptr
+
+    def _layered_edges(self, n):
+        rng = self.rng
+        num_layers = min(self.num_layers or max(2, int(np.sqrt(n))), n)
+        if num_layers < 2:
+            return np.empty((0, 2), dtype=np.int32)
+        cuts = np.sort(rng.choice(np.arange(1, n), size=num_layers - 1, replace=False))
+        starts = np.concatenate(([0], cuts))
+        sizes = np.diff(np.concatenate((starts, [n])))
+
+        layer = np.repeat(np.arange(num_layers), sizes)
+        child = np.arange(starts[1], n)
+        prev = layer[child] - 1
+        k = rng.integers(1, self.max_parents + 1, size=child.size)
+        k = np.minimum(k, sizes[prev])
+        child = np.repeat(child, k)
+        prev = np.repeat(prev, k)
+        parent = starts[prev] + (rng.random(child.size) * sizes[prev]).astype(np.int64)
+        # 去掉重复抽到的同一条边
+        code = _sorted_unique(parent * n + child)
+        return np.stack([code // n, code % n], axis=1).astype(np.int32)
+
+    def _stage_edges(self, n, widths, chain_len):
+        """阶段串联：相邻阶段之间全连接（前一阶段每条链的末尾 -> 后一阶段每条链的开头）。"""
+        ends = np.cumsum(chain_len)
+        starts = ends - chain_len
+        # 链内部的边
+        is_start = np.zeros(n, dtype=bool)
+        is_start[starts] = True
+        inner = np.flatnonzero(~is_start)
+        chain_edges = np.stack([inner - 1, inner], axis=1)
+
+        stage_first = np.concatenate(([0], np.cumsum(widths)[:-1]))
+        stage_of_chain = np.repeat(np.arange(len(widths)), widths)
+        has_next = stage_of_chain < len(widths) - 1
+        src_chain = np.flatnonzero(has_next)
+        fanout = widths[stage_of_chain[src_chain] + 1]
+        src = np.repeat(src_chain, fanout)
+        offset = np.arange(src.size) - np.repeat(np.cumsum(fanout) - fanout, fanout)
+        dst = stage_first[stage_of_chain[src] + 1] + offset
+        join_edges = np.stack([ends[src] - 1, starts[dst]], axis=1)
+        return np.concatenate([chain_edges, join_edges]).astype(np.int32)
+
+    def _fan_edges(self, n):
+        rng = self.rng
+        widths = np.ones(n, dtype=np.int64)
+        widths[1::2] = rng.integers(2, max(self.max_width, 2) + 1, size=widths[1::2].size)
+        widths = _truncate(widths, n)
+        return self._stage_edges(n, widths, np.ones(n, dtype=np.int64))
+
+    def _series_parallel_edges(self, n):
+        rng = self.rng
+        chain_len = _truncate(rng.integers(1, self.max_chain + 1, size=n), n)
+        widths = _truncate(rng.integers(1, self.max_width + 1, size=len(chain_len)), len(chain_len))
+        return self._stage_edges(n, widths, chain_len)
+
+    def _edges(self, n):
+        return getattr(self, f"_{self.topology}_edges")(n)
+
+    def edge_bound(self, n=None):
+        """n 个任务的 DAG 边数上界，用于固定容量的边缓冲区（obs_encoder.GraphObsEncoder）。
+
+        random 拓扑的边数服从二项分布，取均值加 6 倍标准差（完全图的 n(n-1)/2 过大）；其余拓扑为确定的上界。
+        """
+        n = self.num_tasks if n is None else n
+        if self.topology == "random":
+            pairs = n * (n - 1) // 2
+            p = self.edge_prob
+            return max(min(int(np.ceil(pairs * p + 6 * np.sqrt(pairs * p * (1 - p)))) + 1, pairs), 1)
+        if self.topology == "layered":
+            return max(self.max_parents * n, 1)
+        if self.topology == "fan":
+            return max(2 * n, 1)
+        return max((max(self.max_width, 1) + 1) * n, 1)
+
+    # ---- 对外接口 ----
+    def generate(self, num_tasks=None):
+        n = self.num_tasks if num_tasks is None else num_tasks
+        dag = self._task_attrs(n)
+        dag["edges"] = self._edges(n)
+        return dag
+
+    def generate_many(self, count):
+        """生成 count 个 DAG，任务属性与边分别拼接成扁平数组。
+
+        第 k 个 DAG 的任务为 [task_ptr[k], task_ptr[k + 1])，边为 [edge_ptr[k], edge_ptr[k + 1])，
+        边中的任务编号是 DAG 内的局部编号。
+        """
+        n = self.num_tasks
+        batch = self._task_attrs(n * count)
+        batch["task_ptr"] = np.arange(count + 1, dtype=np.int64) * n
+        if self.topology == "random" and count * n * (n - 1) // 2 <= _BATCH_PAIR_LIMIT:
+            batch["edges"], batch["edge_ptr"] = self._random_edges_many(n, count)
+            return batch
+
+        edges = [self._edges(n) for _ in range(count)]
+        batch["edges"] = np.concatenate(edges) if edges else np.empty((0, 2), dtype=np.int32)
+        batch["edge_ptr"] = np.concatenate(([0], np.cumsum([len(e) for e in edges]))).astype(np.int64)
+        return batch
+
+
+def split(batch):
+    """把 generate_many 的结果逐个切回单个 DAG 的数组字典。"""
+    task_ptr, edge_ptr = batch["task_ptr"], batch["edge_ptr"]
+    for k in range(len(task_ptr) - 1):
+        lo, hi = task_ptr[k], task_ptr[k + 1]
+        dag = {key: batch[key][lo:hi] for key in ("type", "need", "duration", "priority")}
+        dag["edges"] = batch["edges"][edge_ptr[k]:edge_ptr[k + 1]]
+        yield dag
+
+
+def to_task_list(dag):
+    """数组字典 -> (tasks, edges)，与 TaskSimulator.generate_dag 的返回格式相同。"""
+    tasks = []
+    for i, (t, need, duration, priority) in enumerate(zip(dag["type"].tolist(), dag["need"].tolist(),
+                                                          dag["duration"].tolist(), dag["priority"].tolist())):
+        classical = "CPU" if need & CPU else "GPU"
+        tasks.append({
+            "id": f"T{i}",
+            "type": TASK_TYPES[t],
+            "need": ["QPU"] if t == QUANTUM else [classical] if t == CLASSICAL else ["QPU", classical],
+            "duration": duration,
+            "priority": priority
+        })
+    edges = [tuple(e) for e in dag["edges"].tolist()]
+    return tasks, edges
+
+
+def _decode_pairs(n, pair):
+    """按行展开的上三角编号 -> (i, j) 边数组。"""
+    rows = np.arange(max(n - 1, 0), dtype=np.int64)
+    row_start = rows * (2 * n - rows - 1) // 2
+    i = np.searchsorted(row_start, pair, side="right") - 1
+    j = pair - row_start[i] + i + 1
+    return np.stack([i, j], axis=1).astype(np.int32)
+
+
+def _sorted_unique(values):
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def _truncate(sizes, total):
+    """取 sizes 的最短前缀使其和恰好为 total（最后一项截短）；total 为 0 时返回空数组。"""
+    if total <= 0:
+        return sizes[:0].copy()
+    cum = np.cumsum(sizes)
+    k = int(np.searchsorted(cum, total)) + 1
+    sizes = sizes[:k].copy()
+    sizes[-1] -= cum[k - 1] - total
+    return sizes
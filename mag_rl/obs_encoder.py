@@ -0,0 +1,101 @@
+"""固定容量、包含图结构的观测编码（不同规模的 DAG 共用一个策略网络）。
+
+观测是一个 Dict，所有数组按 max_tasks / max_edges 补零，并附带有效位掩码：
+    time        (1,)                 当前时间
+    tasks       (max_tasks, 10)      任务特征，列见 TASK_COLUMNS
+    task_mask   (max_tasks,)         1 = 真实任务
+    edge_index  (2, max_edges)       [parent, child] 边列表（稀疏邻接）
+    edge_mask   (max_edges,)         1 = 真实边
+    resources   (num_slots,)         各资源槽位剩余占用时间
+静态部分（优先级、时长、入度/出度、类型、边）在每个 episode 开始时写一次，
+之后每步只整列刷新 status / remaining / ready 三列和资源槽位。
+task_mask / edge_index / edge_mask 在 episode 内不变：reset 时新建、设为只读，encode 直接返回同一组数组，
+不再每步复制（max_edges 较大时这是观测中最大的部分）；上一个 episode 返回的数组不会被改写。
+
+max_edges 按所用 DAG 生成器的边数上界给出，如 TaskSimulator().generator.edge_bound(max_tasks)。
+"""
+import numpy as np
+from gym import spaces
+
+from single_scheduling_env import TASK_TYPES
+
+TASK_COLUMNS = ("status", "remaining", "ready", "priority", "duration", "num_parents", "num_children") + TASK_TYPES
+STATUS, REMAINING, READY, PRIORITY, DURATION, NUM_PARENTS, NUM_CHILDREN, TYPE_START = range(8)
+
+
+class GraphObsEncoder:
+    def __init__(self, max_tasks, max_edges, num_slots=5):
+        self.max_tasks = max_tasks
+        self.max_edges = max_edges
+        self.num_slots = num_slots
+        self.num_tasks = 0
+
+        # 每步变化、需要复制返回的部分
+        self._buf = {
+            "time": np.zeros(1, dtype=np.float32),
+            "tasks": np.zeros((max_tasks, len(TASK_COLUMNS)), dtype=np.float32),
+            "resources": np.zeros(num_slots, dtype=np.float32),
+        }
+        self._static = self._graph(0, np.zeros((2, 0), dtype=np.int64))
+        self.observation_space = spaces.Dict({
+            "time": spaces.Box(low=0, high=np.inf, shape=(1,), dtype=np.float32),
+            "tasks": spaces.Box(low=0, high=100, shape=(max_tasks, len(TASK_COLUMNS)), dtype=np.float32),
+            "task_mask": spaces.Box(low=0, high=1, shape=(max_tasks,), dtype=np.float32),
+            "edge_index": spaces.Box(low=0, high=max_tasks - 1, shape=(2, self.max_edges), dtype=np.int64),
+            "edge_mask": spaces.Box(low=0, high=1, shape=(self.max_edges,), dtype=np.float32),
+            "resources": spaces.Box(low=0, high=100, shape=(num_slots,), dtype=np.float32),
+        })
+
+    def reset(self, env):
+        """新 episode：写入静态特征和边，返回初始观测。"""
+        n, num_edges = env.num_tasks, len(env.child_idx)
+        if n > self.max_tasks:
+            raise ValueError(f"DAG has {n} tasks, encoder capacity is {self.max_tasks}")
+        if num_edges > self.max_edges:
+            raise ValueError(f"DAG has {num_edges} edges, encoder capacity is {self.max_edges}")
+        if env.num_slots != self.num_slots:
+            raise ValueError(f"Env has {env.num_slots} resource slots, encoder expects {self.num_slots}")
+
+        tasks = self._buf["tasks"]
+        tasks[:] = 0
+        tasks[:n, PRIORITY] = env.priority
+        tasks[:n, DURATION] = env.duration
+        tasks[:n, NUM_PARENTS] = env.in_degree
+        num_children = np.diff(env.child_ptr)
+        tasks[:n, NUM_CHILDREN] = num_children
+        known = env.task_type < len(TASK_TYPES)
+        tasks[np.flatnonzero(known), TYPE_START + env.task_type[known]] = 1
+
+        self._static = self._graph(n, np.stack([np.repeat(np.arange(n), num_children), env.child_idx]))
+        self.num_tasks = n
+        return self.encode(env)
+
+    def _graph(self, n, edges):
+        """新建一组只读的 task_mask / edge_index / edge_mask。"""
+        task_mask = np.zeros(self.max_tasks, dtype=np.float32)
+        task_mask[:n] = 1
+        edge_index = np.zeros((2, self.max_edges), dtype=np.int64)
+        edge_index[:, :edges.shape[1]] = edges
+        edge_mask = np.zeros(self.max_edges, dtype=np.float32)
+        edge_mask[:edges.shape[1]] = 1
+        static = {"task_mask": task_mask, "edge_index": edge_index, "edge_mask": edge_mask}
+        for value in static.values():
+            value.flags.writeable = False
+        return static
+
+    def encode(self, env):
+        n = self.num_tasks
+        tasks = self._buf["tasks"]
+        tasks[:n, STATUS] = env.status
+        tasks[:n, REMAINING] = env.remaining
+        tasks[:n, READY] = env.ready
+        self._buf["time"][0] = env.time
+        self._buf["resources"][:] = env.slots
+        obs = {key: value.copy() for key, value in self._buf.items()}
+        obs.update(self._static)
+        return obs
+
+    def action_masks(self, env):
+        mask = np.zeros(self.max_tasks, dtype=bool)
+        mask[:self.num_tasks] = env.action_masks()
+        return mask
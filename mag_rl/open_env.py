@@ -0,0 +1,255 @@
+"""开放系统调度环境：DAG 作业按到达过程（arrivals.py）持续提交，注入正在运行的环境。
+
+    arrivals = PoissonArrivals(rate=0.2, num_tasks=(4, 12), seed=0)
+    env = OpenSchedulingEnv(arrivals, cluster, capacity=512, horizon=20000, event_driven=True)
+    env.seed(0)                 # 重新设定到达流，reset 后从头开始
+    obs = env.reset()
+    ...
+    env.metrics.snapshot(env.time)   # 最近 window 个时间单位的吞吐、排队时延分位数、各资源利用率
+
+任务表是固定容量 capacity 的槽位（观测维度、动作空间不随运行时间增长）：作业到达时为每个任务分配一个
+空闲任务槽位，任务完成后槽位立即回收。空闲槽位的状态为 done、不在就绪集合中，对调度策略不可见。
+放不下的作业进入 FIFO 积压队列，积压满（max_backlog）或单个作业超过 capacity 时拒绝。
+资源日志（resource_log）在开放系统中会无限增长，这里不记录，由 WindowMetrics 按滑动窗口统计。
+"""
+from collections import deque
+
+import numpy as np
+
+from single_scheduling_env import DONE, NEVER, TASK_TYPES, TYPE_RESOURCES, WAITING, SingleAgentSchedulingEnv
+
+FREE_TASK = {"id": None, "type": "free", "duration": 1, "priority": 0}  # 空闲任务槽位的占位
+
+
+class WindowMetrics:
+    """最近 window 个时间单位内的吞吐、排队时延、作业响应时间与各资源利用率；累计计数不受窗口限制。
+
+    排队时延：任务进入就绪集合到开始运行（被中止重排的任务按最后一次计）。
+    响应时间：作业到达（含积压等待）到最后一个任务完成。
+    利用率：忙碌槽位时间 / (槽位数 × 窗口长度)，槽位数不扣除离线的槽位。
+    """
+
+    def __init__(self, window, rtypes, slots):
+        self.window = window
+        self.rtypes = list(rtypes)
+        self.slots = np.asarray(slots, dtype=np.float64)
+        self.tasks = deque()  # (完成时刻, 排队时延)
+        self.jobs = deque()  # (完成时刻, 响应时间)
+        self.arrivals = deque()  # (到达时刻, 任务数)
+        self.busy = deque()  # (起始时刻, 结束时刻, 各资源忙碌槽位数)；区间内忙碌槽位数不变
+        self.arrived = self.admitted = self.rejected = 0
+        self.completed_tasks = self.completed_jobs = 0
+
+    def _trim(self, now):
+        start = now - self.window
+        for queue in (self.tasks, self.jobs, self.arrivals):
+            while queue and queue[0][0] <= start:
+                queue.popleft()
+        while self.busy and self.busy[0][1] <= start:
+            self.busy.popleft()
+
+    def job_arrived(self, now, num_tasks):
+        self.arrived += 1
+        self.arrivals.append((now, num_tasks))
+        self._trim(now)
+
+    def task_done(self, now, delay):
+        self.completed_tasks += 1
+        self.tasks.append((now, delay))
+        self._trim(now)
+
+    def job_done(self, now, response):
+        self.completed_jobs += 1
+        self.jobs.append((now, response))
+        self._trim(now)
+
+    def add_busy(self, start, end, busy):
+        if end > start and any(busy):
+            self.busy.append((start, end, busy))
+            self._trim(end)
+
+    def snapshot(self, now):
+        self._trim(now)
+        lo = max(now - self.window, 0)
+        span = max(now - lo, 1)
+        row = {"time": now,
+               "throughput": len(self.tasks) / span,
+               "job_throughput": len(self.jobs) / span,
+               "arrival_rate": sum(n for _, n in self.arrivals) / span}
+        for name, queue in (("delay", self.tasks), ("response", self.jobs)):
+            values = np.fromiter((v for _, v in queue), dtype=np.float64, count=len(queue))
+            for q in (50, 95, 99):
+                row[f"{name}_p{q}"] = float(np.percentile(values, q)) if len(values) else float("nan")
+        busy = np.zeros(len(self.rtypes))
+        if self.busy:
+            start, end, counts = (np.array(col, dtype=np.float64) for col in zip(*self.busy))
+            busy = ((end - np.maximum(start, lo))[:, None] * counts).sum(axis=0)
+        for rtype, used, total in zip(self.rtypes, busy, self.slots):
+            row[f"util_{rtype}"] = float(used / (total * span)) if total else 0.0
+        row.update(arrived=self.arrived, admitted=self.admitted, rejected=self.rejected,
+                   completed_tasks=self.completed_tasks, completed_jobs=self.completed_jobs)
+        return row
+
+
+class OpenSchedulingEnv(SingleAgentSchedulingEnv):
+    """arrivals: 可迭代的 (到达时刻, tasks, edges)，时刻为非降序整数（arrivals.ArrivalProcess）。
+    capacity: 任务槽位数（同时在系统中的任务上限）。horizon: 运行到该时刻结束（None = 到达流耗尽且全部完成）。
+    report_every: 每隔多少时间单位把 metrics.snapshot 追加到 history（None = 不记录）。
+    """
+
+    def __init__(self, arrivals, resource_pool, capacity=256, horizon=None, event_driven=False, availability=None,
+                 max_backlog=100, window=1000, report_every=None):
+        # 基类构造时会调用 reset，开放系统的参数要先设置好
+        self.arrivals = arrivals
+        self.capacity = capacity
+        self.horizon = NEVER if horizon is None else horizon
+        self.max_backlog = max_backlog
+        self.window = window
+        self.report_every = report_every
+        super(OpenSchedulingEnv, self).__init__([dict(FREE_TASK) for _ in range(capacity)], [], resource_pool,
+                                                event_driven, availability)
+
+    def seed(self, seed=None):
+        """重新设定到达流的随机状态，下一次 reset 从头产生同样的作业序列。"""
+        if hasattr(self.arrivals, "seed"):
+            self.arrivals.seed(seed)
+        return [seed]
+
+    def reset(self):
+        # 所有任务槽位空闲：没有依赖边，状态为 done，不在就绪集合中
+        self._kids = [[] for _ in range(self.capacity)]
+        self._rebuild_children()
+        super(OpenSchedulingEnv, self).reset()
+        self.status[:] = DONE
+        self._obs_tasks[:, 0] = DONE
+        self._obs_tasks[:, 2:] = 0
+        self.ready[:] = False
+        self.ready_time[:] = -1
+        self.ready_count = [0] * len(self._groups)
+        self._group_index = {key: g for g, key in enumerate(self._groups)}
+
+        self.free_ids = list(range(self.capacity - 1, -1, -1))  # 空闲任务槽位栈，小编号先用
+        self.task_job = np.full(self.capacity, -1, dtype=np.int64)
+        self.jobs = {}  # 作业编号 -> [到达时刻, 未完成任务数]
+        self.backlog = deque()  # (到达时刻, tasks, edges)
+        self.num_jobs = 0  # 已接纳的作业数，调度策略可据此判断是否需要重新排序
+        self.metrics = WindowMetrics(self.window, self.cluster.rtypes, np.bincount(self.cluster.slot_rtype,
+                                                                                    minlength=len(self.cluster.rtypes)))
+        self.history = []
+        self._next_report = self.report_every or NEVER
+        self._arrivals = iter(self.arrivals)
+        self._next_arrival = next(self._arrivals, None)
+        self._arrive()
+        return self._get_obs()
+
+    @property
+    def live(self):
+        """系统中（等待或运行）的任务数。"""
+        return self.capacity - len(self.free_ids)
+
+    def _rebuild_children(self):
+        lengths = np.fromiter((len(k) for k in self._kids), dtype=np.int64, count=self.capacity)
+        self.child_ptr = np.zeros(self.capacity + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.child_ptr[1:])
+        self.child_idx = np.array([k for kids in self._kids for k in kids], dtype=np.int64)
+        self.in_degree = np.bincount(self.child_idx, minlength=self.capacity)
+
+    def _group_of(self, task):
+        key = self._need_key(task)
+        group = self._group_index.get(key)
+        if group is None:  # 新的需求组合
+            group = self._group_index[key] = len(self._groups)
+            self._groups.append(key)
+            self._group_alloc.append(self.cluster.need(key[0]))
+            self.ready_count.append(0)
+        return group
+
+    def _admit(self, arrived, tasks, edges):
+        """为作业分配任务槽位并加入就绪集合；槽位不够时返回 False。"""
+        if len(tasks) > len(self.free_ids):
+            return False
+        ids = [self.free_ids.pop() for _ in tasks]
+        job = self.num_jobs
+        self.num_jobs += 1
+        self.jobs[job] = [arrived, len(tasks)]
+
+        parents = [0] * len(tasks)
+        for parent, child in dict.fromkeys(map(tuple, edges)):  # 重复的边只算一次，同封闭环境的 np.unique
+            self._kids[ids[parent]].append(ids[child])
+            parents[child] += 1
+        for i, task, n in zip(ids, tasks, parents):
+            self.tasks[i] = task
+            self.priority[i] = task["priority"]
+            self.duration[i] = task["duration"]
+            self.run_time[i] = task["duration"]
+            self.wait_penalty[i] = 0.05 * task["priority"]
+            self.task_type[i] = TASK_TYPES.index(task["type"]) if task["type"] in TYPE_RESOURCES else len(TASK_TYPES)
+            self.task_need[i] = group = self._group_of(task)
+            self.task_job[i] = job
+            self.num_parents[i] = self.pending[i] = n
+            self.status[i] = WAITING
+            self.remaining[i] = 0
+            self.start_time[i] = -1
+            self._obs_tasks[i] = (WAITING, 0, task["priority"], task["duration"], n)
+            if n == 0:
+                self.ready[i] = True
+                self.ready_time[i] = self.time
+                self.ready_count[group] += 1
+        self._rebuild_children()
+        self._penalty_cache = {}
+        self.metrics.admitted += 1
+        return True
+
+    def _arrive(self):
+        """先按 FIFO 接纳积压的作业，再处理到达时刻不晚于当前时刻的新作业。"""
+        while self.backlog and self._admit(*self.backlog[0]):
+            self.backlog.popleft()
+        while self._next_arrival is not None and self._next_arrival[0] <= self.time:
+            arrived, tasks, edges = self._next_arrival
+            self._next_arrival = next(self._arrivals, None)
+            if not tasks:
+                continue
+            self.metrics.job_arrived(arrived, len(tasks))
+            if len(tasks) > self.capacity or len(self.backlog) >= self.max_backlog:
+                self.metrics.rejected += 1
+            elif self.backlog or not self._admit(arrived, tasks, edges):
+                self.backlog.append((arrived, tasks, edges))
+
+    def _complete(self, task_id):
+        super(OpenSchedulingEnv, self)._complete(task_id)
+        self.metrics.task_done(self.time, int(self.start_time[task_id] - self.ready_time[task_id]))
+        job = self.jobs[self.task_job[task_id]]
+        job[1] -= 1
+        if job[1] == 0:
+            del self.jobs[self.task_job[task_id]]
+            self.metrics.job_done(self.time, self.time - job[0])
+        # 回收任务槽位；子任务的计数已在基类中更新，边在下一次接纳作业时从邻接表中去掉
+        self._kids[task_id] = []
+        self.task_job[task_id] = -1
+        self._obs_tasks[task_id, 2:] = 0
+        self.free_ids.append(task_id)
+
+    def _tick(self, reward, dt=1):
+        # dt 不超过下一个任务完成时刻，区间内忙碌的槽位数不变
+        if self.running:
+            busy = np.bincount(self.cluster.slot_rtype[self.slots > 0], minlength=len(self.cluster.rtypes))
+            self.metrics.add_busy(self.time, self.time + dt, busy.tolist())
+        reward = super(OpenSchedulingEnv, self)._tick(reward, dt)
+        self._arrive()
+        if self.time >= self._next_report:
+            self.history.append(self.metrics.snapshot(self.time))
+            self._next_report += self.report_every
+        return reward
+
+    def _next_time(self):
+        """在基类事件之外，还要停在下一个作业到达和 horizon。"""
+        arrival = self._next_arrival[0] if self._next_arrival is not None else NEVER
+        return min(super(OpenSchedulingEnv, self)._next_time(), arrival, self.horizon)
+
+    def _finished(self):
+        if self.time >= self.horizon:
+            return True
+        return self._next_arrival is None and not self.backlog and not self.live
+
+    def _log_resource_usage(self):
+        pass
@@ -0,0 +1,104 @@
+"""资源健康信号：把传感器（或 TimeGAN 生成的）数据转成按时间排序的槽位上下线事件，供调度环境使用。
+
+    availability = load_availability("../databases/simulated_TimeGAN_output.csv", threshold=4, recovery=10)
+    env = SingleAgentSchedulingEnv(tasks, edges, RESOURCE_POOL, availability=availability)
+
+    python resource_health.py ../databases/simulated_TimeGAN_output.csv --threshold 4 --recovery 10
+
+信号的一个样本对应环境中 steps_per_sample 个时间单位。某个样本上任一通道的稳健 z 分数
+（相对整段数据的中位数 / MAD）超过 threshold 即视为退化；连续退化段加上 recovery 个样本的
+维护窗口内，对应资源（默认全部 QPU 槽位，同一台稀释制冷机）离线。也可以直接用
+anomaly_detector.StreamingAnomalyDetector 的 alert 列作为退化序列调用 from_degraded。
+
+环境只在构造时把事件表转换成槽位下标，运行时每步只比较一次"下一个事件时刻"。
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+class ResourceAvailability:
+    """槽位离线区间 outages: [(资源类型, 类型内槽位编号, 开始, 结束)]，区间为 [开始, 结束)。
+
+    events 为展开后的 (时刻, 资源类型, 槽位编号, 是否在线)，按时刻排序，同一时刻先下线后上线。
+    """
+
+    def __init__(self, outages, horizon=None):
+        self.outages = sorted((rtype, int(idx), int(start), int(end))
+                              for rtype, idx, start, end in outages if end > start)
+        events = []
+        for rtype, idx, start, end in self.outages:
+            events.append((start, rtype, idx, False))
+            events.append((end, rtype, idx, True))
+        self.events = sorted(events, key=lambda e: (e[0], e[3]))
+        self.horizon = horizon if horizon is not None else max((e for *_, e in self.outages), default=0)
+
+    def __len__(self):
+        return len(self.outages)
+
+    @classmethod
+    def from_degraded(cls, degraded, resource="QPU", slots=(0,), steps_per_sample=1, recovery=0, min_samples=1):
+        """degraded: 每个样本一个 bool。长度不少于 min_samples 的退化段及其后 recovery 个样本内 slots 离线。"""
+        degraded = np.asarray(degraded, dtype=bool)
+        edges = np.diff(np.concatenate(([0], degraded.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        keep = ends - starts >= min_samples
+        intervals = []
+        for start, end in zip(starts[keep].tolist(), (ends[keep] + recovery).tolist()):
+            if intervals and start <= intervals[-1][1]:  # 与上一段的维护窗口重叠则合并
+                intervals[-1][1] = max(intervals[-1][1], end)
+            else:
+                intervals.append([start, end])
+        outages = [(resource, idx, start * steps_per_sample, min(end, len(degraded)) * steps_per_sample)
+                   for start, end in intervals for idx in slots]
+        return cls(outages, horizon=len(degraded) * steps_per_sample)
+
+    def shifted(self, offset):
+        """从信号的 offset 时刻开始的视图（时刻减去 offset），用于每个 episode 取不同片段。"""
+        outages = [(rtype, idx, max(start - offset, 0), end - offset)
+                   for rtype, idx, start, end in self.outages if end > offset]
+        return ResourceAvailability(outages, horizon=max(self.horizon - offset, 0))
+
+    def offline_fraction(self, resource="QPU", idx=0):
+        if not self.horizon:
+            return 0.0
+        return sum(end - start for rtype, i, start, end in self.outages if rtype == resource and i == idx) / self.horizon
+
+
+def degraded_from_frame(frame, columns=None, threshold=4.0):
+    """任一通道的稳健 z 分数超过 threshold 的样本为 True；缺失值不算退化。"""
+    x = frame[list(columns) if columns is not None else frame.select_dtypes("number").columns].to_numpy(np.float64)
+    median = np.nanmedian(x, axis=0)
+    scale = 1.4826 * np.nanmedian(np.abs(x - median), axis=0)
+    scale[~(scale > 0)] = np.inf  # 常数通道不产生退化
+    with np.errstate(invalid="ignore"):
+        return (np.abs(x - median) / scale > threshold).any(axis=1)
+
+
+def load_availability(path, columns=None, threshold=4.0, resource="QPU", slots=(0,), steps_per_sample=1,
+                      recovery=10, min_samples=1):
+    """从宽表 CSV / Parquet（TimeGAN 或 synthetic_generator 的输出、resampler.resample_run 保存的结果）构建 ResourceAvailability。"""
+    frame = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+    degraded = degraded_from_frame(frame, columns, threshold)
+    return ResourceAvailability.from_degraded(degraded, resource, slots, steps_per_sample, recovery, min_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default="../databases/simulated_TimeGAN_output.csv")
+    parser.add_argument("--threshold", type=float, default=4.0)
+    parser.add_argument("--recovery", type=int, default=10, help="maintenance samples after each degraded stretch")
+    parser.add_argument("--min-samples", type=int, default=1)
+    parser.add_argument("--steps-per-sample", type=int, default=1)
+    args = parser.parse_args()
+    availability = load_availability(args.path, threshold=args.threshold, steps_per_sample=args.steps_per_sample,
+                                     recovery=args.recovery, min_samples=args.min_samples)
+    lengths = [end - start for *_, start, end in availability.outages]
+    print(f"{len(availability)} QPU outages over {availability.horizon} time units, "
+          f"offline {availability.offline_fraction():.1%}, "
+          f"median outage {np.median(lengths) if lengths else 0:.0f}, longest {max(lengths, default=0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Long-running asyncio scheduling service (the README's "Task Scheduling Module").
+
+    python scheduler_service.py --model maskable_ppo_scheduler --algo maskable_ppo --port 8765
+    python scheduler_service.py --policy heft --unix /tmp/scheduler.sock --pool CPU=8 GPU=4 QPU=2
+    python scheduler_service.py --policy heft --cluster cluster.json
+
+Protocol: one JSON object per line over TCP (or a unix socket), one JSON reply
+per request line.
+
+    {"op": "submit", "tasks": [...], "edges": [[0, 1], ...]}      -> {"job": 1, "placements": [...]}
+    {"op": "complete", "job": 1, "task": 0, "time": 3}            -> {"job": 1, "placements": [...], "done": false}
+    {"op": "metrics"}                                             -> decision latency p50/p99, batch sizes, ...
+    {"op": "hold", "resource": "QPU"}                             -> {"held": ["QPU"]}
+    {"op": "release", "resource": "QPU"}                          -> {"held": [], "placements": {"1": [...]}}
+
+tasks use the TaskSimulator.generate_dag format. Each submitted job keeps a live
+SingleAgentSchedulingEnv driven by start_task / finish_task / set_time instead
+of step(). All jobs allocate from one shared pool (--pool counts or a --cluster
+JSON), so a slot is never handed to two jobs at once. After every event the
+service keeps placing tasks while the job has a schedulable task. A held
+resource type (e.g. QPU during a cryostat anomaly alert) is not allocated to any
+job until it is released.
+A placement is {"task": i, "id": "T3", "resources": [["QPU", 0], ["GPU", 1]]}.
+
+When a completion or a release frees slots, the other waiting jobs are
+re-dispatched. Their new placements are pushed to the connection that submitted
+the job, as extra lines that are not replies to any request:
+
+    {"event": "placements", "job": 2, "placements": [...]}
+
+Policy calls from concurrent jobs are micro-batched: requests that arrive
+within --max-wait-ms of each other (up to --max-batch) share one forward pass.
+If the model picks a task that cannot start, the first schedulable task in
+mask order is placed instead and counted as a fallback. Dispatches of the same
+job are serialized by a per-job lock; the job is re-checked after every policy
+call, since other requests may change it (or the pool) while the call is pending.
+"""
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from cluster import Cluster, as_cluster
+from obs_encoder import GraphObsEncoder
+from schedulers import SCHEDULERS
+from single_agent_env import RESOURCE_POOL
+from single_scheduling_env import SingleAgentSchedulingEnv
+from task_simulator import TaskSimulator
+
+
+class LatencyStats:
+    def __init__(self, window=100000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count}
+        ms = np.array(self.samples) * 1000
+        p50, p99 = np.percentile(ms, [50, 99])
+        return {"count": self.count, "p50_ms": float(p50), "p99_ms": float(p99),
+                "mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+
+
+class PredictBatcher:
+    """把并发的 predict 请求合并成一次前向计算。"""
+
+    def __init__(self, model, maskable, max_batch=64, max_wait=0.001):
+        self.model = model
+        self.maskable = maskable
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=10000)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def predict(self, obs, mask):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((obs, mask, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batch_sizes.append(len(batch))
+            try:
+                actions = self._forward([item[0] for item in batch], np.stack([item[1] for item in batch]))
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, _, future), action in zip(batch, actions.tolist()):
+                if not future.cancelled():
+                    future.set_result(int(action))
+
+    def _forward(self, observations, masks):
+        if isinstance(observations[0], dict):
+            obs = {key: np.stack([o[key] for o in observations]) for key in observations[0]}
+        else:
+            obs = np.stack(observations)
+        if self.maskable:
+            actions, _ = self.model.predict(obs, deterministic=True, action_masks=masks)
+        else:
+            actions, _ = self.model.predict(obs, deterministic=True)
+        return np.asarray(actions).reshape(-1)
+
+
+class Job:
+    def __init__(self, job_id, tasks, edges, resource_pool, cluster, encoder=None, heuristic=None, listener=None):
+        self.id = job_id
+        self.env = SingleAgentSchedulingEnv(tasks, [tuple(e) for e in edges], resource_pool, cluster=cluster)
+        self.listener = listener  # 接收推送的放置结果（提交该作业的连接）
+        self.encoder = encoder
+        if encoder is not None:
+            encoder.reset(self.env)
+        self.heuristic = heuristic
+        if heuristic is not None:
+            heuristic.reset(self.env)
+        self.lock = asyncio.Lock()  # 同一作业的 dispatch 串行执行
+
+    def observe(self):
+        if self.encoder is not None:
+            return self.encoder.encode(self.env), self.encoder.action_masks(self.env)
+        return self.env._get_obs(), self.env.action_masks()
+
+    @property
+    def done(self):
+        return self.env.num_done == self.env.num_tasks
+
+
+class SchedulingService:
+    def __init__(self, model=None, maskable=False, heuristic="heft", max_tasks=None, max_edges=None,
+                 resource_pool=None, max_batch=64, max_wait=0.001):
+        self.resource_pool = resource_pool or RESOURCE_POOL
+        # 所有作业共用的槽位状态
+        self.cluster = copy.copy(as_cluster(self.resource_pool))
+        self.cluster.reset()
+        self.heuristic = heuristic
+        self.max_tasks = max_tasks
+        # 与训练时 SingleAgentEnv 的默认边容量一致
+        self.max_edges = max_edges or (TaskSimulator().generator.edge_bound(max_tasks) if max_tasks else None)
+        self.batcher = PredictBatcher(model, maskable, max_batch, max_wait) if model is not None else None
+        self.obs_dim = None
+        if model is not None and max_tasks is None:
+            self.obs_dim = model.observation_space.shape[0]
+        self.jobs = {}
+        self.held = set()
+        self._ids = itertools.count(1)
+        self.decision_latency = LatencyStats()
+        self.request_latency = LatencyStats()
+        self.fallbacks = 0
+
+    async def start(self):
+        if self.batcher is not None:
+            self.batcher.start()
+
+    async def stop(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    # ---- 请求处理 ----
+    async def handle(self, request, listener=None):
+        start = time.perf_counter()
+        op = request.get("op")
+        if op == "submit":
+            reply = await self.submit(request["tasks"], request.get("edges", []), listener)
+        elif op == "complete":
+            reply = await self.complete(request["job"], request["task"], request.get("time"))
+        elif op == "metrics":
+            reply = self.metrics()
+        elif op == "hold":
+            self.hold_resource(request["resource"])
+            reply = {"held": sorted(self.held)}
+        elif op == "release":
+            placements = await self.release_resource(request["resource"])
+            reply = {"held": sorted(self.held), "placements": placements}
+        else:
+            raise ValueError(f"Unknown op: {op}")
+        self.request_latency.add(time.perf_counter() - start)
+        return reply
+
+    async def submit(self, tasks, edges, listener=None):
+        job_id = next(self._ids)
+        if not tasks:  # 空作业直接完成，不建环境也不登记
+            return {"job": job_id, "placements": [], "done": True}
+        encoder = None
+        if self.batcher is not None and self.max_tasks is not None:
+            encoder = GraphObsEncoder(self.max_tasks, self.max_edges,
+                                      num_slots=self.cluster.num_slots)
+        heuristic = SCHEDULERS[self.heuristic]() if self.batcher is None else None
+        job = Job(job_id, tasks, edges, self.resource_pool, self.cluster, encoder, heuristic, listener)
+        if self.obs_dim is not None and len(job.env._get_obs()) != self.obs_dim:
+            raise ValueError(f"Model expects {self.obs_dim}-dim observations "
+                             f"({job.env.num_tasks} tasks give {len(job.env._get_obs())})")
+        for rtype in self.held:
+            job.env.hold_resource(rtype)
+        self.jobs[job_id] = job
+        placements = await self.dispatch(job)
+        if job.done:  # 没有任务的作业提交时就已完成，之后不会再有 complete 来删除它
+            del self.jobs[job_id]
+        return {"job": job_id, "placements": placements, "done": job.done}
+
+    async def complete(self, job_id, task_id, now=None):
+        job = self.jobs[job_id]
+        if now is not None:
+            job.env.set_time(now)
+        job.env.finish_task(task_id)
+        placements = await self.dispatch(job)
+        if job.done:
+            del self.jobs[job_id]
+        await self.redispatch(skip=job)
+        return {"job": job_id, "placements": placements, "done": job.done}
+
+    def hold_resource(self, rtype):
+        self.held.add(rtype)
+        for job in self.jobs.values():
+            job.env.hold_resource(rtype)
+
+    async def release_resource(self, rtype):
+        """解除暂停并重新调度所有任务，返回 {job: placements}（同时推送给各作业的提交方）。"""
+        self.held.discard(rtype)
+        for job in self.jobs.values():
+            job.env.release_resource(rtype)
+        return await self.redispatch()
+
+    async def redispatch(self, skip=None):
+        """槽位释放后按提交顺序重新调度其他作业，新的放置结果推送给作业的提交方，返回 {job: placements}。"""
+        placements = {}
+        for job in list(self.jobs.values()):
+            if job is skip or not job.env._has_schedulable():
+                continue
+            placed = await self.dispatch(job)
+            if placed:
+                placements[job.id] = placed
+                if job.listener is not None:
+                    job.listener({"event": "placements", "job": job.id, "placements": placed})
+        return placements
+
+    async def dispatch(self, job):
+        env = job.env
+        placements = []
+        async with job.lock:
+            while env._has_schedulable():
+                start = time.perf_counter()
+                if self.batcher is not None:
+                    obs, mask = job.observe()
+                    action = await self.batcher.predict(obs, mask)
+                    # 等待 predict 期间其他请求可能已经改变了作业或资源池
+                    if not env._has_schedulable():
+                        break
+                else:
+                    action = job.heuristic.act(env)
+                self.decision_latency.add(time.perf_counter() - start)
+
+                resources = env.start_task(action) if 0 <= action < env.num_tasks else None
+                if resources is None:
+                    action, resources = self._fallback(env)
+                    if resources is None:
+                        break
+                    self.fallbacks += 1
+                placements.append({"task": action, "id": env.tasks[action]["id"],
+                                   "resources": [list(r) for r in resources]})
+        return placements
+
+    @staticmethod
+    def _fallback(env):
+        """按掩码顺序放置第一个实际能分配的任务；都不能分配时返回 (None, None)。"""
+        for action in np.flatnonzero(env.action_masks()).tolist():
+            resources = env.start_task(action)
+            if resources is not None:
+                return action, resources
+        return None, None
+
+    def metrics(self):
+        batches = self.batcher.batch_sizes if self.batcher is not None else ()
+        return {
+            "decision_latency": self.decision_latency.summary(),
+            "request_latency": self.request_latency.summary(),
+            "mean_batch_size": float(np.mean(batches)) if batches else None,
+            "fallbacks": self.fallbacks,
+            "active_jobs": len(self.jobs),
+            "held": sorted(self.held),
+        }
+
+    # ---- 网络层：每行一个 JSON ----
+    async def serve_client(self, reader, writer):
+        def push(message):
+            writer.write(json.dumps(message).encode() + b"\n")
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.handle(json.loads(line), push)
+                except Exception as exc:  # 单个请求出错不影响连接和其他任务
+                    reply = {"error": f"{type(exc).__name__}: {exc}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        finally:
+            # 连接断开后不再向它推送
+            for job in self.jobs.values():
+                if job.listener is push:
+                    job.listener = None
+            writer.close()
+
+
+def parse_pool(items):
+    """["CPU=8", "GPU=4", "QPU=2"] -> {"CPU": 8, "GPU": 4, "QPU": 2}。"""
+    pool = {}
+    for item in items:
+        rtype, _, count = item.partition("=")
+        pool[rtype] = int(count)
+    return pool
+
+
+def load_model(path, algo):
+    if algo == "maskable_ppo":
+        from sb3_contrib import MaskablePPO
+        return MaskablePPO.load(path, device="cpu")
+    from stable_baselines3 import PPO
+    return PPO.load(path, device="cpu")
+
+
+async def serve(args):
+    model = load_model(args.model, args.algo) if args.model else None
+    pool = Cluster.load(args.cluster) if args.cluster else parse_pool(args.pool) if args.pool else None
+    service = SchedulingService(model, maskable=args.algo == "maskable_ppo", heuristic=args.policy,
+                                max_tasks=args.max_tasks, max_edges=args.max_edges, resource_pool=pool,
+                                max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    await service.start()
+    if args.unix:
+        server = await asyncio.start_unix_server(service.serve_client, path=args.unix)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.serve_client, args.host, args.port)
+        where = f"{args.host}:{args.port}"
+    print(f"scheduling service listening on {where} ({args.model or args.policy})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None, help="saved SB3 model; without it --policy is used")
+    parser.add_argument("--algo", default="ppo", choices=("ppo", "maskable_ppo"))
+    parser.add_argument("--policy", default="heft", choices=tuple(SCHEDULERS))
+    parser.add_argument("--max-tasks", type=int, default=None, help="model uses GraphObsEncoder(max_tasks)")
+    parser.add_argument("--max-edges", type=int, default=None, help="encoder edge capacity used in training")
+    parser.add_argument("--pool", nargs="+", default=None,
+                        help="shared resource pool as TYPE=COUNT (default CPU=2 GPU=2 QPU=1)")
+    parser.add_argument("--cluster", default=None, help="cluster.Cluster JSON config instead of --pool")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="listen on a unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""启发式基线调度策略，接口与 SB3 模型一致：每步给 SingleAgentSchedulingEnv 选一个动作。
+
+    sched = HeftScheduler()
+    sched.reset(env)            # 每个 episode 开始时预计算排序
+    action = sched.act(env)     # 在 env.action_masks() 允许的任务中选排序最高的
+
+排序类策略在 reset 时把所有任务按优先级键排好序，act 只需在掩码里找第一个可用任务，
+单步开销与 DAG 规模基本无关。资源是同构槽位、没有通信开销，因此 HEFT 的平均计算代价
+就是任务时长，upward rank 即从该任务到出口的最长路径（含自身时长）。
+"""
+import inspect
+
+import numpy as np
+
+
+def topological_order(env):
+    """Kahn 算法，基于 env 的 CSR 子任务邻接表。"""
+    pending = env.in_degree.copy()
+    order = np.flatnonzero(pending == 0).tolist()
+    child_ptr, child_idx = env.child_ptr.tolist(), env.child_idx.tolist()
+    for i in order:  # order 在遍历中增长
+        for k in child_idx[child_ptr[i]:child_ptr[i + 1]]:
+            pending[k] -= 1
+            if pending[k] == 0:
+                order.append(k)
+    if len(order) != env.num_tasks:
+        raise ValueError("Task graph contains a cycle")
+    return order
+
+
+def upward_rank(env, order=None):
+    """b-level：rank_u(i) = duration_i + max(rank_u(child))。"""
+    order = topological_order(env) if order is None else order
+    duration = env.duration.tolist()
+    child_ptr, child_idx = env.child_ptr.tolist(), env.child_idx.tolist()
+    rank = [0] * env.num_tasks
+    for i in reversed(order):
+        kids = child_idx[child_ptr[i]:child_ptr[i + 1]]
+        rank[i] = duration[i] + (max(rank[k] for k in kids) if kids else 0)
+    return np.array(rank, dtype=np.int64)
+
+
+def downward_rank(env, order=None):
+    """t-level：从入口到任务 i 开始前的最长路径长度。"""
+    order = topological_order(env) if order is None else order
+    duration = env.duration.tolist()
+    child_ptr, child_idx = env.child_ptr.tolist(), env.child_idx.tolist()
+    rank = [0] * env.num_tasks
+    for i in order:
+        finish = rank[i] + duration[i]
+        for k in child_idx[child_ptr[i]:child_ptr[i + 1]]:
+            if finish > rank[k]:
+                rank[k] = finish
+    return np.array(rank, dtype=np.int64)
+
+
+class Scheduler:
+    name = "base"
+
+    def reset(self, env):
+        pass
+
+    def act(self, env):
+        raise NotImplementedError
+
+
+class RankScheduler(Scheduler):
+    """按 _keys 给出的键降序排列（最后一个键为主键，同 np.lexsort），每步选第一个可用任务。"""
+
+    def _keys(self, env):
+        raise NotImplementedError
+
+    def reset(self, env):
+        self.order = np.lexsort([-np.asarray(k) for k in self._keys(env)])
+
+    def act(self, env):
+        mask = env.action_masks()
+        return int(self.order[mask[self.order]][0])
+
+
+class HeftScheduler(RankScheduler):
+    """HEFT 列表调度：upward rank 高者优先，同 rank 时高优先级者优先。"""
+    name = "heft"
+
+    def _keys(self, env):
+        return env.priority, upward_rank(env)
+
+
+class CriticalPathScheduler(RankScheduler):
+    """关键路径优先：经过任务的最长路径（t-level + b-level）长者优先，其次 b-level。"""
+    name = "critical_path"
+
+    def _keys(self, env):
+        order = topological_order(env)
+        bottom = upward_rank(env, order)
+        return bottom, downward_rank(env, order) + bottom
+
+
+class ShortestJobScheduler(Scheduler):
+    name = "sjf"
+
+    def reset(self, env):
+        # 时长升序，同时长时编号小者优先
+        self.order = np.argsort(env.duration, kind="stable")
+
+    def act(self, env):
+        mask = env.action_masks()
+        return int(self.order[mask[self.order]][0])
+
+
+class PriorityScheduler(RankScheduler):
+    """加权最短作业（WSPT）：priority / duration 高者优先，其次 priority。"""
+    name = "priority"
+
+    def _keys(self, env):
+        return env.priority, env.priority / env.duration
+
+
+class RandomScheduler(Scheduler):
+    name = "random"
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def act(self, env):
+        return int(self.rng.choice(np.flatnonzero(env.action_masks())))
+
+
+class ModelScheduler(Scheduler):
+    """包装训练好的 SB3 模型。encoder 为 GraphObsEncoder 时使用固定容量的 Dict 观测。"""
+
+    def __init__(self, model, encoder=None, name="model"):
+        self.model = model
+        self.encoder = encoder
+        self.name = name
+        # MaskablePPO.predict 接受 action_masks 参数
+        self.maskable = "action_masks" in inspect.signature(model.predict).parameters
+
+    def reset(self, env):
+        if self.encoder is not None:
+            self.encoder.reset(env)
+
+    def act(self, env):
+        if self.encoder is not None:
+            obs, mask = self.encoder.encode(env), self.encoder.action_masks(env)
+        else:
+            obs, mask = env._get_obs(), env.action_masks()
+        if self.maskable:
+            action, _ = self.model.predict(obs, deterministic=True, action_masks=mask)
+        else:
+            action, _ = self.model.predict(obs, deterministic=True)
+        return int(action)
+
+
+SCHEDULERS = {
+    cls.name: cls for cls in (HeftScheduler, CriticalPathScheduler, ShortestJobScheduler,
+                              PriorityScheduler, RandomScheduler)
+}
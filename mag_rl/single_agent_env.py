@@ -3,34 +3,93 @@ from gym import spaces
 import numpy as np
 from task_simulator import TaskSimulator
 from single_scheduling_env import SingleAgentSchedulingEnv
+from obs_encoder import GraphObsEncoder
+from cluster import as_cluster
+
+RESOURCE_POOL = {"CPU": 2, "GPU": 2, "QPU": 1}
+
 
 class SingleAgentEnv(gym.Env):
-    def __init__(self):
+    """每次 reset 随机生成一张新的 DAG。
+
+    max_tasks 为 None 时使用 SingleAgentSchedulingEnv 的扁平观测（长度随任务数变化）；
+    给定 max_tasks 时使用 GraphObsEncoder 的固定容量 Dict 观测，动作空间固定为 max_tasks，
+    每个 episode 的任务数在 [min_tasks, max_tasks] 中均匀抽取（min_tasks 默认等于 max_tasks），
+    边缓冲区 max_edges 默认取 DAG 生成器在 max_tasks 个任务时的边数上界。
+    给定 availability（resource_health.ResourceAvailability）时，每个 episode 从信号中随机位置开始。
+    resource_pool 可以是 cluster.Cluster（大规模异构集群，按任务 need 分配），默认 RESOURCE_POOL。
+    """
+
+    def __init__(self, event_driven=False, max_tasks=None, max_edges=None, min_tasks=None, seed=None,
+                 availability=None, resource_pool=None):
         super(SingleAgentEnv, self).__init__()
-        self.simulator = TaskSimulator()
-        self.tasks, self.edges = self.simulator.generate_dag()  # 生成任务及依赖边
+        self.simulator = TaskSimulator(seed=seed)
+        self.event_driven = event_driven
+        self.max_tasks = max_tasks
+        self.min_tasks = min_tasks or max_tasks
+        self.availability = availability
+        self.resource_pool = resource_pool or RESOURCE_POOL
+        self.encoder = None
+        if max_tasks is not None:
+            self.encoder = GraphObsEncoder(max_tasks, max_edges or self.simulator.generator.edge_bound(max_tasks),
+                                           num_slots=as_cluster(self.resource_pool).num_slots)
+
+        self.tasks, self.edges = self._generate_dag()  # 生成任务及依赖边
         self.env = SingleAgentSchedulingEnv(
             tasks=self.tasks,
             edges=self.edges,
-            resource_pool={"CPU": 2, "GPU": 2, "QPU": 1}
+            resource_pool=self.resource_pool,
+            event_driven=self.event_driven,
+            availability=self._episode_availability()
         )
 
-        obs_dim = len(self.env._get_obs())
-        self.observation_space = spaces.Box(low=0, high=100, shape=(obs_dim,), dtype=np.float32)
-        self.action_space = spaces.Discrete(len(self.tasks))  # 每个任务一个动作
+        if self.encoder is not None:
+            self.observation_space = self.encoder.observation_space
+            self.action_space = spaces.Discrete(max_tasks)
+        else:
+            obs_dim = len(self.env._get_obs())
+            self.observation_space = spaces.Box(low=0, high=100, shape=(obs_dim,), dtype=np.float32)
+            self.action_space = spaces.Discrete(len(self.tasks))  # 每个任务一个动作
+
+    def _generate_dag(self):
+        if self.encoder is None:
+            return self.simulator.generate_dag()
+        num_tasks = int(self.simulator.generator.rng.integers(self.min_tasks, self.max_tasks + 1))
+        return self.simulator.generate_dag(num_tasks)
+
+    def _episode_availability(self):
+        if self.availability is None or not self.availability.horizon:
+            return self.availability
+        return self.availability.shifted(int(self.simulator.generator.rng.integers(self.availability.horizon)))
+
+    def seed(self, seed=None):
+        self.simulator.seed(seed)
+        return [seed]
 
     def reset(self):
-        self.tasks, self.edges = self.simulator.generate_dag()
+        self.tasks, self.edges = self._generate_dag()
         self.env = SingleAgentSchedulingEnv(
             tasks=self.tasks,
             edges=self.edges,
-            resource_pool={"CPU": 2, "GPU": 2, "QPU": 1}
+            resource_pool=self.resource_pool,
+            event_driven=self.event_driven,
+            availability=self._episode_availability()
         )
-        return self.env.reset()
+        obs = self.env.reset()
+        if self.encoder is not None:
+            obs = self.encoder.reset(self.env)
+        return obs
 
     def step(self, action):
         obs, reward, done, info = self.env.step(int(action))  # 确保 action 是 int
+        if self.encoder is not None:
+            obs = self.encoder.encode(self.env)
         return obs, reward, done, info
 
+    def action_masks(self):
+        if self.encoder is not None:
+            return self.encoder.action_masks(self.env)
+        return self.env.action_masks()
+
     def render(self, mode="human"):
-        self.env.render()
\ No newline at end of file
+        self.env.render()
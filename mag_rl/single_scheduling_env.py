@@ -1,123 +1,428 @@
+import copy
+import heapq
+
 import gym
 import numpy as np
 
+from cluster import Cluster, as_cluster
+
+# 任务状态编码（与观测向量中的编码一致）
+WAITING, RUNNING, DONE = 0, 1, 2
+STATUS_NAMES = ("waiting", "running", "done")
+
+# 每种任务类型占用的资源
+TYPE_RESOURCES = {
+    "quantum": ("QPU",),
+    "classical": ("CPU",),
+    "hybrid": ("QPU", "GPU"),
+}
+TASK_TYPES = tuple(TYPE_RESOURCES)
+
+# 每个任务在观测中占用的特征数: status, remaining, priority, duration, num_parents
+TASK_FEATURES = 5
+
+NEVER = float("inf")  # 没有后续健康事件
+
+
 class SingleAgentSchedulingEnv(gym.Env):
-    def __init__(self, tasks, edges, resource_pool):
+    """resource_pool 为 {"CPU": 2, "GPU": 2, "QPU": 1} 字典时，任务按类型（TYPE_RESOURCES）占用资源；
+    为 cluster.Cluster 时，按每个任务的 need 列表在同一站点内成组分配（任务可用 "site" 指定站点），
+    运行时间按所分配实例的速度缩放。环境持有集群的副本，同一个 Cluster 可以传给多个环境。
+    给定 cluster（由 resource_pool 构造的 Cluster 实例）时不复制：多个环境从同一个集群分配槽位（如调度服务
+    中的并发作业），reset 不清空集群状态，由集群的持有者负责；slots / 观测中的槽位只反映本环境自己的任务。
+    """
+
+    def __init__(self, tasks, edges, resource_pool, event_driven=False, availability=None, cluster=None):
         super(SingleAgentSchedulingEnv, self).__init__()
 
         self.tasks = tasks
         self.edges = edges
         self.resource_pool = resource_pool
-        self.resource_status = {rtype: [0] * count for rtype, count in resource_pool.items()}
-        self.task_status = ["waiting"] * len(tasks)
-        self.task_remaining_time = [0] * len(tasks)
-        self.time = 0
-        self.resource_log = []
+        self.num_tasks = len(tasks)
+        # event_driven=True 时，决策后若没有可调度任务，直接跳到下一个任务完成时刻，
+        # 跳过的每个时间单位都照常计入等待惩罚
+        self.event_driven = event_driven
 
         self.dependency_map = {i: [] for i in range(len(tasks))}
         for parent, child in edges:
             self.dependency_map[child].append(parent)
 
+        # 静态任务属性（只在构造时计算一次）
+        self.priority = np.array([t["priority"] for t in tasks], dtype=np.int64)
+        self.duration = np.array([t["duration"] for t in tasks], dtype=np.int64)
+        self.num_parents = np.array([len(self.dependency_map[i]) for i in range(len(tasks))], dtype=np.int64)
+        self.wait_penalty = 0.05 * self.priority
+        # 任务类型编码；未知类型编码为 len(TASK_TYPES)
+        self.task_type = np.array([TASK_TYPES.index(t["type"]) if t["type"] in TYPE_RESOURCES else len(TASK_TYPES)
+                                   for t in tasks], dtype=np.int64)
+
+        self.share_cluster = cluster is not None
+        self.cluster = cluster if self.share_cluster else copy.copy(as_cluster(resource_pool))
+        keys = [self._need_key(t) for t in tasks]
+        # 需求相同（资源列表、站点）的任务为一组，就绪计数与可分配判断按组进行；不占资源的组永远无法调度
+        self._groups = list(dict.fromkeys(keys))
+        group_index = {key: g for g, key in enumerate(self._groups)}
+        self.task_need = np.array([group_index[key] for key in keys], dtype=np.int64)
+        self._group_alloc = [self.cluster.need(needed) for needed, _ in self._groups]
+
+        # 子任务邻接表（CSR）：child_idx[child_ptr[i]:child_ptr[i + 1]] 为任务 i 的子任务
+        pairs = np.unique(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=0)
+        self.child_ptr = np.zeros(self.num_tasks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=self.num_tasks), out=self.child_ptr[1:])
+        self.child_idx = pairs[:, 1].copy()
+        self.in_degree = np.bincount(pairs[:, 1], minlength=self.num_tasks)
+
+        # 所有资源槽位拼成一个数组，resource_slices 记录每种资源的区间
+        self.resource_slices = self.cluster.type_slices
+        self.num_slots = self.cluster.num_slots
+        self.held = set()  # 被外部（如异常检测告警）暂停分配的资源类型，reset 后保持
+        self.slot_rtype = [self.cluster.rtypes[r] for r in self.cluster.slot_rtype.tolist()]
+
+        # 资源健康事件（resource_health.ResourceAvailability），构造时转换成 (时刻, 全局槽位, 是否在线)
+        self.availability = availability
+        self._health_events = []
+        if availability is not None:
+            self._health_events = [(t, self.resource_slices[rtype].start + idx, online)
+                                   for t, rtype, idx, online in availability.events
+                                   if rtype in self.resource_slices
+                                   and idx < self.resource_slices[rtype].stop - self.resource_slices[rtype].start]
+        self._log_types = [(rtype, self.resource_slices.get(rtype)) for rtype in ("CPU", "GPU", "QPU")]
+        self._idle_usage = {rtype: 0 for rtype, _ in self._log_types}
+
+        # 动态状态
+        self.status = np.zeros(self.num_tasks, dtype=np.int8)
+        self.remaining = np.zeros(self.num_tasks, dtype=np.int64)
+        self.slots = np.zeros(self.num_slots, dtype=np.int64)
+        self.run_time = self.duration.copy()  # 按所分配实例速度缩放后的运行时间
+        # 任务进入就绪集合 / 开始运行的时刻（-1 = 尚未发生），用于统计等待时间
+        self.ready_time = np.full(self.num_tasks, -1, dtype=np.int64)
+        self.start_time = np.full(self.num_tasks, -1, dtype=np.int64)
+
+        # 预分配观测缓冲区：静态列只写一次，动态列只在状态变化处原地更新
+        self._obs = np.zeros(1 + TASK_FEATURES * self.num_tasks + self.num_slots, dtype=np.float32)
+        self._obs_tasks = self._obs[1:1 + TASK_FEATURES * self.num_tasks].reshape(self.num_tasks, TASK_FEATURES)
+        self._obs_slots = self._obs[1 + TASK_FEATURES * self.num_tasks:]
+        self._obs_tasks[:, 2] = self.priority
+        self._obs_tasks[:, 3] = self.duration
+        self._obs_tasks[:, 4] = self.num_parents
+
+        self.reset()
         obs_dim = len(self._get_obs())
         self.observation_space = gym.spaces.Box(low=0, high=100, shape=(obs_dim,), dtype=np.float32)
         self.action_space = gym.spaces.Discrete(len(tasks))
 
+    def _need_key(self, task):
+        """任务的需求分组键 (资源列表, 站点下标或 None)。"""
+        if isinstance(self.resource_pool, Cluster):
+            return (tuple(task.get("need") or TYPE_RESOURCES.get(task["type"], ())),
+                    self.cluster.sites.index(task["site"]) if task.get("site") in self.cluster.sites else None)
+        return TYPE_RESOURCES.get(task["type"], ()), None
+
     def reset(self):
-        self.resource_status = {rtype: [0] * count for rtype, count in self.resource_pool.items()}
-        self.task_status = ["waiting"] * len(self.tasks)
-        self.task_remaining_time = [0] * len(self.tasks)
+        self.status[:] = WAITING
+        self.remaining[:] = 0
+        self.slots[:] = 0
+        self.running = []  # 正在运行的任务 id，数量不超过槽位数
+        self.events = []  # (完成时刻, task_id) 小顶堆
+        # 就绪集合：等待中且前置任务全部完成；pending 为尚未完成的前置任务数
+        self.pending = self.in_degree.copy()
+        self.ready = self.pending == 0
+        self.ready_count = np.bincount(self.task_need[self.ready], minlength=len(self._groups)).tolist()
+        self.ready_time[:] = np.where(self.ready, 0, -1)
+        self.start_time[:] = -1
+        if not self.share_cluster:
+            self.cluster.reset()
+        self.online = self.cluster.online
+        self.num_done = 0
         self.time = 0
         self.resource_log = []
+        self.task_slots = {}  # 运行中任务占用的槽位下标
+        self._penalty_cache = {}
+        self._obs_tasks[:, 0] = WAITING
+        self._obs_tasks[:, 1] = 0
+        self.requeued = 0  # 因槽位离线被中止、重新排队的次数
+        self.busy_slot_time = 0  # 实际占用的槽位时间（含被中止后作废的运行），用于统计利用率
+        self._health_pos = 0
+        self._next_health = self._health_events[0][0] if self._health_events else NEVER
+        if self._next_health <= 0:
+            self._apply_health()
         return self._get_obs()
 
+    # ---- 兼容旧接口的只读视图 ----
+    @property
+    def task_status(self):
+        return [STATUS_NAMES[s] for s in self.status]
+
+    @property
+    def task_remaining_time(self):
+        return self.remaining.tolist()
+
+    @property
+    def resource_status(self):
+        return {rtype: self.slots[sl].tolist() for rtype, sl in self.resource_slices.items()}
+
     def _dependencies_satisfied(self, task_id):
-        return all(self.task_status[parent] == "done" for parent in self.dependency_map.get(task_id, []))
+        return self.pending[task_id] == 0
 
     def _get_obs(self):
-        obs = [self.time]
-        for i in range(len(self.tasks)):
-            obs.extend([
-                0 if self.task_status[i] == "waiting" else 1 if self.task_status[i] == "running" else 2,
-                self.task_remaining_time[i],
-                self.tasks[i]["priority"],
-                self.tasks[i]["duration"],
-                len(self.dependency_map.get(i, []))
-            ])
-        flat_resources = [val for res in self.resource_status.values() for val in res]
-        obs.extend(flat_resources)
-        return np.array(obs, dtype=np.float32)
+        self._obs[0] = self.time
+        self._obs_slots[:] = self.slots
+        return self._obs.copy()
+
+    def _set_status(self, task_id, status):
+        self.status[task_id] = status
+        self._obs_tasks[task_id, 0] = status
 
     def _log_resource_usage(self):
-        usage = {
-            "time": self.time,
-            "CPU": sum(self.resource_status.get("CPU", [])),
-            "GPU": sum(self.resource_status.get("GPU", [])),
-            "QPU": sum(self.resource_status.get("QPU", []))
-        }
+        usage = {"time": self.time}
+        if not self.running:
+            usage.update(self._idle_usage)
+        elif self.num_slots <= 64:
+            flat = self.slots.tolist()
+            for rtype, sl in self._log_types:
+                usage[rtype] = sum(flat[sl]) if sl is not None else 0
+        else:  # 大集群按区间求和，不整段转成列表
+            for rtype, sl in self._log_types:
+                usage[rtype] = int(self.slots[sl].sum()) if sl is not None else 0
         self.resource_log.append(usage)
 
+    def _allocate(self, action):
+        group = self.task_need[action]
+        needed, site = self._groups[group]
+        if not needed or not self.held.isdisjoint(needed):
+            return False
+
+        # 空闲槽位堆中取最快的实例，所有需求在同一站点一次分配，不满足时什么也不占用
+        slot_ids = self.cluster.allocate(self._group_alloc[group], site)
+        if slot_ids is None:
+            return False
+
+        run = self.cluster.run_time(self.duration[action], slot_ids)
+        self.slots[slot_ids] = run
+        self.task_slots[action] = slot_ids
+        self.ready[action] = False
+        self.ready_count[group] -= 1
+        self._set_status(action, RUNNING)
+        self.remaining[action] = run
+        self.run_time[action] = run
+        self.start_time[action] = self.time
+        self._obs_tasks[action, 1] = run
+        self.running.append(action)
+        heapq.heappush(self.events, (self.time + run, action))
+        self._penalty_cache = {}  # 等待集合变化，惩罚缓存失效
+        return True
+
+    def _waiting_penalty(self, reward):
+        # 等待集合只在分配时变化，按进入惩罚前的 reward 缓存结果；
+        # 逐项相减保证与逐任务 reward -= 0.05 * priority 的浮点结果一致
+        cached = self._penalty_cache.get(reward)
+        if cached is None:
+            waiting = self.wait_penalty[self.status == WAITING]
+            if len(waiting) > 64:  # 同 BatchSchedulingEnv：subtract.accumulate 也是按顺序逐项相减
+                cached = float(np.subtract.accumulate(np.concatenate(([reward], waiting)))[-1])
+            else:
+                cached = reward
+                for p in waiting.tolist():
+                    cached -= p
+            self._penalty_cache[reward] = cached
+        return cached
+
+    def _group_available(self, group):
+        needed, site = self._groups[group]
+        return bool(needed) and self.held.isdisjoint(needed) and self.cluster.can_allocate(self._group_alloc[group],
+                                                                                            site)
+
+    def _has_schedulable(self):
+        return any(count and self._group_available(g) for g, count in enumerate(self.ready_count))
+
+    def action_masks(self):
+        """可立即分配的就绪任务为 True（供 sb3-contrib MaskablePPO 使用）。
+
+        没有可分配任务时只能"等待"：优先放开就绪任务（-1），都不就绪时放开全部动作。
+        """
+        group_ok = np.array([self._group_available(g) for g in range(len(self._groups))], dtype=bool)
+        mask = self.ready & group_ok[self.task_need]
+        if not mask.any():
+            mask = self.ready.copy() if self.ready.any() else np.ones(self.num_tasks, dtype=bool)
+        return mask
+
+    def _complete(self, task_id):
+        self._set_status(task_id, DONE)
+        self.num_done += 1
+        slots = self.task_slots.pop(task_id)
+        self.busy_slot_time += (self.time - int(self.start_time[task_id])) * len(slots)
+        self.cluster.release(slots)
+        # 只更新子任务的计数，新就绪的任务加入就绪集合
+        kids = self.child_idx[self.child_ptr[task_id]:self.child_ptr[task_id + 1]]
+        if kids.size:
+            self.pending[kids] -= 1
+            for k in kids[self.pending[kids] == 0].tolist():
+                self.ready[k] = True
+                self.ready_time[k] = self.time
+                self.ready_count[self.task_need[k]] += 1
+
+    def _tick(self, reward, dt=1):
+        self.time += dt
+        if self.running:
+            reward = self._finish_running(reward, dt)
+        if self.time >= self._next_health:
+            self._apply_health()
+        # 等待集合在 dt 内不变（期间没有分配），惩罚按经过的时间缩放
+        if dt == 1:
+            return self._waiting_penalty(reward)
+        return reward + dt * self._waiting_penalty(0)
+
+    def _finished(self):
+        return self.num_done == self.num_tasks
+
+    def _next_time(self):
+        """下一个任务完成或槽位上下线的时刻。"""
+        return min(self.events[0][0] if self.events else NEVER, self._next_health)
+
+    def _skip_idle(self, reward):
+        # 跳到下一个任务完成或槽位上下线的时刻
+        while not self._finished() and not self._has_schedulable():
+            target = self._next_time()
+            if target == NEVER:
+                break
+            reward = self._tick(reward, target - self.time)
+        return reward
+
+    def _finish_running(self, reward, dt):
+        # 只有运行中的任务占用槽位，槽位统一减 dt（不低于 0）
+        if dt == 1:
+            np.subtract(self.slots, 1, out=self.slots, where=self.slots > 0)
+        else:
+            np.maximum(self.slots - dt, 0, out=self.slots)
+
+        while self.events and self.events[0][0] <= self.time:
+            heapq.heappop(self.events)
+
+        if len(self.running) > 32:  # 大集群上同时运行的任务多，整体向量化
+            running = np.array(self.running)
+            self.remaining[running] -= dt
+            left = self.remaining[running]
+            self._obs_tasks[running, 1] = left
+            for i in running[left <= 0].tolist():
+                self._complete(i)
+                reward += 10
+            self.running = running[left > 0].tolist()
+            return reward
+
+        still_running = []
+        for i in self.running:
+            left = self.remaining[i] - dt
+            self.remaining[i] = left
+            self._obs_tasks[i, 1] = left
+            if left <= 0:
+                self._complete(i)
+                reward += 10  # 完成奖励
+            else:
+                still_running.append(i)
+        self.running = still_running
+        return reward
+
+    def _apply_health(self):
+        """应用当前时刻及之前的槽位上下线事件。离线槽位上运行的任务被中止并重新排队，
+        由调度策略在下一次决策时改派到其他可用槽位（故障恢复）。"""
+        events = self._health_events
+        pos = self._health_pos
+        while pos < len(events) and events[pos][0] <= self.time:
+            _, slot, online = events[pos]
+            pos += 1
+            if not online and self.online[slot] and self.slots[slot] > 0:
+                for i in self.running:
+                    if slot in self.task_slots[i]:
+                        self._requeue(i)
+                        break
+            self.cluster.set_online(slot, online)
+        self._health_pos = pos
+        self._next_health = events[pos][0] if pos < len(events) else NEVER
+
+    def _requeue(self, task_id):
+        """中止运行中的任务：释放全部槽位，任务回到就绪集合，之后从头重新运行。"""
+        slots = self.task_slots.pop(task_id)
+        self.busy_slot_time += (self.time - int(self.start_time[task_id])) * len(slots)
+        self.slots[slots] = 0
+        self.cluster.release(slots)
+        self.running.remove(task_id)
+        self.events = [event for event in self.events if event[1] != task_id]
+        heapq.heapify(self.events)
+        self._set_status(task_id, WAITING)
+        self.remaining[task_id] = 0
+        self._obs_tasks[task_id, 1] = 0
+        self.ready[task_id] = True
+        self.ready_count[self.task_need[task_id]] += 1
+        self.ready_time[task_id] = self.time
+        self.start_time[task_id] = -1
+        self._penalty_cache = {}
+        self.requeued += 1
+
+    def hold_resource(self, rtype):
+        """暂停分配 rtype（运行中的任务不受影响），需要该资源的任务保持等待。"""
+        self.held.add(rtype)
+
+    def release_resource(self, rtype):
+        self.held.discard(rtype)
+
+    # ---- 外部驱动接口（调度服务）：任务的开始/完成由真实集群事件决定，不调用 step ----
+    def start_task(self, task_id):
+        """分配资源但不推进时间，返回占用的 [(资源类型, 类型内槽位编号)]；无法分配时返回 None。"""
+        if not (self.status[task_id] == WAITING and self.ready[task_id]) or not self._allocate(task_id):
+            return None
+        return [(rtype, slot - self.resource_slices[rtype].start)
+                for rtype, slot in zip(self._groups[self.task_need[task_id]][0], self.task_slots[task_id])]
+
+    def finish_task(self, task_id):
+        """集群报告任务完成：释放槽位并更新就绪集合。"""
+        if self.status[task_id] != RUNNING:
+            raise ValueError(f"Task {task_id} is not running")
+        self.slots[self.task_slots[task_id]] = 0
+        self.remaining[task_id] = 0
+        self._obs_tasks[task_id, 1] = 0
+        self.running.remove(task_id)
+        self.events = [event for event in self.events if event[1] != task_id]
+        heapq.heapify(self.events)
+        self._complete(task_id)
+
+    def set_time(self, now):
+        """把时钟拨到 now，按预计时长刷新运行中任务的剩余时间。
+
+        实际运行可能超过预计时长，未收到完成事件前剩余时间至少保留 1，槽位不会被当作空闲。
+        """
+        self.time = max(self.time, now)
+        if self.time >= self._next_health:
+            self._apply_health()
+        for i in self.running:
+            left = max(int(self.start_time[i] + self.run_time[i] - self.time), 1)
+            self.remaining[i] = left
+            self._obs_tasks[i, 1] = left
+            self.slots[self.task_slots[i]] = left
+
     def step(self, action):
         reward = 0
         info = {}
         done = False
 
-        valid = self.task_status[action] == "waiting" and self._dependencies_satisfied(action)
+        # 超出任务数的动作（固定容量的动作空间中的填充位）按非法动作处理
+        valid = action < self.num_tasks and self.status[action] == WAITING and self._dependencies_satisfied(action)
 
         if not valid:
             reward -= 3  # 惩罚非法动作
+        elif self._allocate(action):
+            reward += self.tasks[action]['priority'] * 2  # 引导高优先级任务被调度
         else:
-            task = self.tasks[action]
-            task_type = task['type']
-            allocated = False
-
-            if task_type == "quantum":
-                qpu_free = next((i for i, val in enumerate(self.resource_status["QPU"]) if val == 0), None)
-                if qpu_free is not None:
-                    self.resource_status["QPU"][qpu_free] = task['duration']
-                    self.task_status[action] = "running"
-                    self.task_remaining_time[action] = task['duration']
-                    allocated = True
-            elif task_type == "classical":
-                cpu_free = next((i for i, val in enumerate(self.resource_status["CPU"]) if val == 0), None)
-                if cpu_free is not None:
-                    self.resource_status["CPU"][cpu_free] = task['duration']
-                    self.task_status[action] = "running"
-                    self.task_remaining_time[action] = task['duration']
-                    allocated = True
-            elif task_type == "hybrid":
-                qpu_free = next((i for i, val in enumerate(self.resource_status["QPU"]) if val == 0), None)
-                gpu_free = next((i for i, val in enumerate(self.resource_status["GPU"]) if val == 0), None)
-                if qpu_free is not None and gpu_free is not None:
-                    self.resource_status["QPU"][qpu_free] = task['duration']
-                    self.resource_status["GPU"][gpu_free] = task['duration']
-                    self.task_status[action] = "running"
-                    self.task_remaining_time[action] = task['duration']
-                    allocated = True
-
-            if allocated:
-                reward += task['priority'] * 2  # 引导高优先级任务被调度
-            else:
-                reward -= 1  # 没有分配成功但任务合法
-
-        self.time += 1
-        for rtype in self.resource_status:
-            for i in range(len(self.resource_status[rtype])):
-                self.resource_status[rtype][i] = max(0, self.resource_status[rtype][i] - 1)
-
-        for i, status in enumerate(self.task_status):
-            if status == "running":
-                self.task_remaining_time[i] -= 1
-                if self.task_remaining_time[i] <= 0:
-                    self.task_status[i] = "done"
-                    reward += 10  # 完成奖励
+            reward -= 1  # 没有分配成功但任务合法
 
-        # 等待任务惩罚（降低等待时间快速增长带来的惩罚）
-        for i, status in enumerate(self.task_status):
-            if status == "waiting":
-                reward -= 0.05 * self.tasks[i]['priority']
+        # 时间前进一步，结算完成奖励与等待惩罚
+        start_time = self.time
+        reward = self._tick(reward)
+        if self.event_driven:
+            reward = self._skip_idle(reward)
+            info["elapsed"] = self.time - start_time
 
         # 任务全部完成
-        if all(status == "done" for status in self.task_status):
+        if self._finished():
             reward += 20
             done = True
 
@@ -125,4 +430,4 @@ class SingleAgentSchedulingEnv(gym.Env):
         return self._get_obs(), reward, done, info
 
     def render(self, mode="human"):
-        print(f"Time: {self.time}, Status: {self.task_status}, Resources: {self.resource_status}")
\ No newline at end of file
+        print(f"Time: {self.time}, Status: {self.task_status}, Resources: {self.resource_status}")
@@ -0,0 +1,97 @@
+"""MaskablePPO training on BatchSchedulingEnv, with an optional benchmark against plain PPO.
+
+    python train_masked.py --timesteps 200000 --save maskable_ppo_scheduler
+    python train_masked.py --compare --target 78
+
+--compare trains both PPO (unmasked, the ptest.py setup) and MaskablePPO on the
+same environment and reports the wall-clock time and the number of environment
+samples each one needs before the mean return of the last --window episodes
+reaches --target.
+"""
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecMonitor
+
+from batch_env import BatchSchedulingEnv
+
+
+class TargetRewardCallback(BaseCallback):
+    """记录最近若干个 episode 的平均回报，达到目标后停止训练。"""
+
+    def __init__(self, target, window=100):
+        super(TargetRewardCallback, self).__init__()
+        self.target = target
+        self.returns = deque(maxlen=window)
+        self.start = None
+        self.reached_at = None  # (样本数, 秒)
+
+    def _on_training_start(self):
+        self.start = time.perf_counter()
+
+    def _on_step(self):
+        for info in self.locals["infos"]:
+            if "episode" in info:
+                self.returns.append(info["episode"]["r"])
+        if (self.target is not None and len(self.returns) == self.returns.maxlen
+                and np.mean(self.returns) >= self.target):
+            self.reached_at = (self.num_timesteps, time.perf_counter() - self.start)
+            return False
+        return True
+
+    @property
+    def mean_return(self):
+        return float(np.mean(self.returns)) if self.returns else float("nan")
+
+
+def make_env(num_envs, seed):
+    env = BatchSchedulingEnv(num_envs)
+    env.seed(seed)
+    return VecMonitor(env)
+
+
+def train(algo, args, target=None):
+    env = make_env(args.num_envs, args.seed)
+    model = algo("MlpPolicy", env, verbose=0, learning_rate=1e-4, n_steps=args.n_steps, seed=args.seed)
+    callback = TargetRewardCallback(target, args.window)
+    start = time.perf_counter()
+    model.learn(total_timesteps=args.timesteps, callback=callback)
+    elapsed = time.perf_counter() - start
+    return model, callback, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timesteps", type=int, default=200000)
+    parser.add_argument("--num-envs", type=int, default=16)
+    parser.add_argument("--n-steps", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--target", type=float, default=None)
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--save", default=None)
+    args = parser.parse_args()
+
+    if not args.compare:
+        model, callback, elapsed = train(MaskablePPO, args, args.target)
+        print(f"MaskablePPO: {model.num_timesteps} samples in {elapsed:.1f}s, "
+              f"mean return (last {args.window}) = {callback.mean_return:.2f}")
+        if args.save:
+            model.save(args.save)
+        return
+
+    print(f"{'algo':>12} {'samples':>10} {'seconds':>9} {'mean return':>12} {'reached':>8}")
+    for name, algo in (("PPO", PPO), ("MaskablePPO", MaskablePPO)):
+        model, callback, elapsed = train(algo, args, args.target)
+        samples, seconds = callback.reached_at or (model.num_timesteps, elapsed)
+        print(f"{name:>12} {samples:>10} {seconds:>9.1f} {callback.mean_return:>12.2f} "
+              f"{'yes' if callback.reached_at else 'no':>8}")
+
+
+if __name__ == "__main__":
+    main()
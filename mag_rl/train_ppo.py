@@ -0,0 +1,252 @@
+"""Multi-process PPO training on SingleAgentEnv with asynchronous evaluation.
+
+    python train_ppo.py --timesteps 2000000 --num-envs 32 --out runs/ppo
+    python train_ppo.py --algo maskable_ppo --max-tasks 32 --min-tasks 6 --out runs/graph
+
+Rollouts come from --num-envs SubprocVecEnv workers, worker i seeded with
+seed + i. Every --eval-freq timesteps the current model is serialized in
+memory and handed off: a writer thread stores the checkpoint, and a spawned
+process pool (--eval-workers) loads it, runs --eval-episodes episodes on a
+fixed evaluation seed and saves the completion/wait plot of the first episode
+(Agg backend). Results are appended to <out>/metrics.csv by the same writer
+thread, so the training loop never waits on disk, evaluation or plotting.
+The evaluation of the final model is written with kind "final".
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import stable_baselines3
+import torch
+from sb3_contrib import MaskablePPO
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecMonitor
+
+from cluster import Cluster
+from single_agent_env import SingleAgentEnv
+from single_scheduling_env import WAITING
+
+ALGOS = {"ppo": PPO, "maskable_ppo": MaskablePPO}
+METRIC_FIELDS = ("kind", "timesteps", "seconds", "mean_reward", "std_reward", "mean_makespan", "finished")
+EVAL_SEED_OFFSET = 100000
+
+# stable-baselines3 2.x 只接受 gymnasium 环境；SingleAgentEnv 仍是旧 gym 接口（reset 只返回 obs、step 返回 4 元组）
+if int(stable_baselines3.__version__.split(".")[0]) >= 2:
+    import gymnasium
+
+    def _convert_space(space):
+        if isinstance(space, gymnasium.spaces.Space):
+            return space
+        if hasattr(space, "spaces"):
+            return gymnasium.spaces.Dict({key: _convert_space(sub) for key, sub in space.spaces.items()})
+        if hasattr(space, "n"):
+            return gymnasium.spaces.Discrete(int(space.n))
+        return gymnasium.spaces.Box(low=space.low, high=space.high, shape=space.shape, dtype=space.dtype)
+
+    class GymnasiumAdapter(gymnasium.Env):
+        def __init__(self, env):
+            self.env = env
+            self.observation_space = _convert_space(env.observation_space)
+            self.action_space = _convert_space(env.action_space)
+
+        def reset(self, seed=None, options=None):
+            if seed is not None:
+                self.env.seed(seed)
+            return self.env.reset(), {}
+
+        def step(self, action):
+            obs, reward, done, info = self.env.step(action)
+            return obs, reward, done, False, info
+
+        def action_masks(self):
+            return self.env.action_masks()
+else:
+    def GymnasiumAdapter(env):
+        return env
+
+
+def make_env(seed, env_kwargs):
+    def _init():
+        return GymnasiumAdapter(SingleAgentEnv(seed=seed, **env_kwargs))
+    return _init
+
+
+def plot_progress(time_steps, completed, waits, path):
+    fig, ax1 = plt.subplots(figsize=(10, 5))
+    ax1.plot(time_steps, completed, label='Completed Tasks', color='blue', marker='o')
+    ax1.set_xlabel("Time Step")
+    ax1.set_ylabel("Completed Tasks", color='blue')
+    ax1.tick_params(axis='y', labelcolor='blue')
+
+    ax2 = ax1.twinx()
+    ax2.plot(time_steps, waits, label='Avg Waiting Time', color='red', marker='x')
+    ax2.set_ylabel("Avg Waiting Time", color='red')
+    ax2.tick_params(axis='y', labelcolor='red')
+
+    plt.title("Task Completion and Average Waiting Time Over Time")
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def evaluate(algo, data, timesteps, episodes, seed, env_kwargs, plot_path, max_steps=100, kind="eval"):
+    """在评估进程中运行：从内存中的 checkpoint 加载模型，跑 episodes 个 episode。"""
+    torch.set_num_threads(1)
+    model = ALGOS[algo].load(io.BytesIO(data), device="cpu")
+    env = SingleAgentEnv(seed=seed, **env_kwargs)
+    rewards, makespans = [], []
+    time_steps, completed, waits = [], [], []
+    for episode in range(episodes):
+        obs = env.reset()
+        done, total, steps = False, 0.0, 0
+        while not done and steps < max_steps:
+            if algo == "maskable_ppo":
+                action, _ = model.predict(obs, deterministic=True, action_masks=env.action_masks())
+            else:
+                action, _ = model.predict(obs, deterministic=True)
+            obs, reward, done, _ = env.step(action)
+            total += reward
+            steps += 1
+            if episode == 0:
+                inner = env.env
+                # 当前已就绪但仍在等待的任务已等待的时间
+                waiting = (inner.status == WAITING) & inner.ready
+                time_steps.append(inner.time)
+                completed.append(inner.num_done)
+                waits.append(float((inner.time - inner.ready_time[waiting]).mean()) if waiting.any() else 0.0)
+        rewards.append(total)
+        if done:
+            makespans.append(env.env.time)
+
+    if plot_path is not None:
+        plot_progress(time_steps, completed, waits, plot_path)
+    return {
+        "kind": kind,
+        "timesteps": timesteps,
+        "mean_reward": float(np.mean(rewards)),
+        "std_reward": float(np.std(rewards)),
+        "mean_makespan": float(np.mean(makespans)) if makespans else float("nan"),
+        "finished": len(makespans) / episodes,
+    }
+
+
+class AsyncEvalCallback(BaseCallback):
+    """定期把模型快照交给写盘线程和评估进程池，训练循环本身不做任何阻塞 I/O。"""
+
+    def __init__(self, args, env_kwargs):
+        super(AsyncEvalCallback, self).__init__()
+        self.args = args
+        self.env_kwargs = env_kwargs
+        self.out = Path(args.out)
+        self.next_eval = args.eval_freq
+
+    def _on_training_start(self):
+        for sub in ("checkpoints", "plots"):
+            (self.out / sub).mkdir(parents=True, exist_ok=True)
+        self.start = time.perf_counter()
+        self.writer = ThreadPoolExecutor(max_workers=1)  # 单线程保证 metrics.csv 按提交顺序写入
+        self.pool = ProcessPoolExecutor(self.args.eval_workers, mp_context=multiprocessing.get_context("spawn"))
+        with open(self.out / "metrics.csv", "w", newline="") as f:
+            csv.writer(f).writerow(METRIC_FIELDS)
+
+    def _on_step(self):
+        if self.num_timesteps >= self.next_eval:
+            self.next_eval += self.args.eval_freq
+            self._snapshot()
+        return True
+
+    def _on_rollout_end(self):
+        returns = [info["r"] for info in self.model.ep_info_buffer]
+        if returns:
+            self._write_metrics({"kind": "train", "timesteps": self.num_timesteps,
+                                 "mean_reward": float(np.mean(returns)), "std_reward": float(np.std(returns))})
+
+    def _on_training_end(self):
+        # 最后一次定期评估之后还有一次参数更新，num_timesteps 却相同，用 kind 区分这一行
+        self._snapshot(name=f"{self.args.algo}_final", kind="final")
+        self.pool.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+    def _snapshot(self, name=None, kind="eval"):
+        # 序列化在训练线程里完成（得到一致的参数快照），写盘与评估都在后台
+        buffer = io.BytesIO()
+        self.model.save(buffer)
+        data = buffer.getvalue()
+        name = name or f"{self.args.algo}_{self.num_timesteps}"
+        self.writer.submit((self.out / "checkpoints" / f"{name}.zip").write_bytes, data)
+        future = self.pool.submit(evaluate, self.args.algo, data, self.num_timesteps, self.args.eval_episodes,
+                                  self.args.seed + EVAL_SEED_OFFSET, self.env_kwargs,
+                                  self.out / "plots" / f"{name}.png", kind=kind)
+        future.add_done_callback(self._on_eval_done)
+
+    def _on_eval_done(self, future):
+        try:
+            row = future.result()
+        except Exception as exc:  # 评估失败不影响训练
+            print(f"evaluation failed: {exc!r}")
+            return
+        self._write_metrics(row)
+        if self.args.verbose:
+            print(f"[{row['kind']} {row['timesteps']}] mean reward {row['mean_reward']:.2f} ± {row['std_reward']:.2f}, "
+                  f"makespan {row['mean_makespan']:.2f}, finished {row['finished']:.0%}")
+
+    def _write_metrics(self, row):
+        row = dict(row, seconds=round(time.perf_counter() - self.start, 3))
+        self.writer.submit(self._append_row, row)
+
+    def _append_row(self, row):
+        with open(self.out / "metrics.csv", "a", newline="") as f:
+            csv.DictWriter(f, METRIC_FIELDS).writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algo", default="ppo", choices=tuple(ALGOS))
+    parser.add_argument("--timesteps", type=int, default=1000000)
+    parser.add_argument("--num-envs", type=int, default=os.cpu_count())
+    parser.add_argument("--n-steps", type=int, default=128, help="rollout length per worker")
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--event-driven", action="store_true")
+    parser.add_argument("--max-tasks", type=int, default=None, help="use GraphObsEncoder observations")
+    parser.add_argument("--min-tasks", type=int, default=None)
+    parser.add_argument("--max-edges", type=int, default=None, help="edge capacity (default: generator edge bound)")
+    parser.add_argument("--cluster", default=None, help="cluster.Cluster JSON config instead of the 5-slot pool")
+    parser.add_argument("--eval-freq", type=int, default=50000)
+    parser.add_argument("--eval-episodes", type=int, default=100)
+    parser.add_argument("--eval-workers", type=int, default=2)
+    parser.add_argument("--out", default="runs/ppo")
+    parser.add_argument("--verbose", type=int, default=1)
+    args = parser.parse_args()
+
+    env_kwargs = {"event_driven": args.event_driven}
+    if args.max_tasks:
+        env_kwargs.update(max_tasks=args.max_tasks, min_tasks=args.min_tasks, max_edges=args.max_edges)
+    if args.cluster:
+        env_kwargs["resource_pool"] = Cluster.load(args.cluster)
+
+    # 每个 worker 使用不同的随机种子，保证各自生成不同的 DAG 序列
+    env = SubprocVecEnv([make_env(args.seed + i, env_kwargs) for i in range(args.num_envs)])
+    env = VecMonitor(env)
+    policy = "MultiInputPolicy" if args.max_tasks else "MlpPolicy"
+    model = ALGOS[args.algo](policy, env, verbose=0, learning_rate=args.learning_rate,
+                             n_steps=args.n_steps, seed=args.seed)
+
+    start = time.perf_counter()
+    model.learn(total_timesteps=args.timesteps, callback=AsyncEvalCallback(args, env_kwargs))
+    env.close()
+    print(f"{model.num_timesteps} timesteps in {time.perf_counter() - start:.1f}s, outputs in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Parquet 列式存储：传感器数据按 sensor / date 分区，查询时只读需要的通道和时间段。
+
+    python parquet_store.py ingest                          # databases/data_csv/cd* -> databases/parquet
+    python parquet_store.py bench                           # CSV 解析 vs. Parquet 查询耗时
+
+    from parquet_store import query
+    df = query(sensor="temperature", channels=[1, 2], start="2023-09-27", end="2023-09-28 12:00")
+
+目录结构（hive 分区）：
+    databases/parquet/sensor=cooling/date=2023-09-26/cd230926-cooling-0.parquet
+列：run (string，文件内字典编码), datetime (timestamp[ns]), channel (int16), value (float32)，
+文件内按 (channel, datetime) 排序并使用较小的 row group，使通道与时间过滤都能利用
+row group 统计信息跳过数据。查询通过 LocalFileSystem(use_mmap=True) 以内存映射方式读取。
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from data_loader import load_sensor_csv
+from resampler import SENSORS, run_folders
+
+STORE_ROOT = "databases/parquet"
+ROW_GROUP_SIZE = 16384
+PARTITIONING = ds.partitioning(pa.schema([("sensor", pa.string()), ("date", pa.string())]), flavor="hive")
+SCHEMA = pa.schema([
+    ("run", pa.string()),
+    ("datetime", pa.timestamp("ns")),
+    ("channel", pa.int16()),
+    ("value", pa.float32()),
+    ("sensor", pa.string()),
+    ("date", pa.string()),
+])
+
+
+def ingest_run(run_dir, out=STORE_ROOT, sensors=SENSORS):
+    """把一个 run 文件夹写入数据集；同一个 run 重复导入时先删除它之前写的文件。"""
+    run_dir, out = Path(run_dir), Path(out)
+    run = run_dir.name
+    for old in out.glob(f"sensor=*/date=*/{run}-*.parquet"):
+        old.unlink()
+
+    rows = 0
+    for sensor in sensors:
+        path = run_dir / f"{sensor}.csv"
+        if not path.exists():
+            continue
+        df = load_sensor_csv(path).sort_values(["channel", "datetime"], kind="stable")
+        stamps = df["datetime"].to_numpy()
+        table = pa.table({
+            "run": pa.array(np.full(len(df), run)),
+            "datetime": pa.array(stamps, pa.timestamp("ns")),
+            "channel": pa.array(df["channel"].to_numpy(), pa.int16()),
+            "value": pa.array(df["value"].to_numpy(), pa.float32()),
+            "sensor": pa.array(np.full(len(df), sensor)),
+            "date": pa.array(np.datetime_as_string(stamps, unit="D")),
+        }, schema=SCHEMA)
+        ds.write_dataset(table, out, format="parquet", partitioning=PARTITIONING,
+                         basename_template=f"{run}-{sensor}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore",
+                         min_rows_per_group=ROW_GROUP_SIZE, max_rows_per_group=ROW_GROUP_SIZE)
+        rows += len(df)
+    return rows
+
+
+def ingest_all(root="databases/data_csv", out=STORE_ROOT, pattern="cd*"):
+    return {run_dir.name: ingest_run(run_dir, out) for run_dir in run_folders(root, pattern)}
+
+
+def open_dataset(root=STORE_ROOT):
+    return ds.dataset(root, format="parquet", partitioning=PARTITIONING,
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def build_filter(sensor=None, channels=None, start=None, end=None, run=None):
+    """分区列（sensor, date）上的条件用于裁剪目录，其余条件下推到 row group 统计信息。"""
+    conditions = []
+    if sensor is not None:
+        sensors = [sensor] if isinstance(sensor, str) else list(sensor)
+        conditions.append(ds.field("sensor").isin(sensors))
+    if run is not None:
+        runs = [run] if isinstance(run, str) else list(run)
+        conditions.append(ds.field("run").isin(runs))
+    if channels is not None:
+        conditions.append(ds.field("channel").isin(pa.array(list(channels), pa.int16())))
+    if start is not None:
+        start = pd.Timestamp(start).as_unit("ns")  # 字符串解析出的单位可能是 us，Arrow 只接受与 schema 一致的 ns
+        conditions.append(ds.field("date") >= start.strftime("%Y-%m-%d"))
+        conditions.append(ds.field("datetime") >= pa.scalar(start.to_datetime64(), pa.timestamp("ns")))
+    if end is not None:
+        end = pd.Timestamp(end).as_unit("ns")  # 字符串解析出的单位可能是 us，Arrow 只接受与 schema 一致的 ns
+        conditions.append(ds.field("date") <= end.strftime("%Y-%m-%d"))
+        conditions.append(ds.field("datetime") < pa.scalar(end.to_datetime64(), pa.timestamp("ns")))
+    expr = None
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def query(sensor=None, channels=None, start=None, end=None, run=None,
+          columns=("datetime", "channel", "value"), root=STORE_ROOT, as_pandas=True):
+    """返回满足条件的行（时间区间为 [start, end)），按 datetime 排序。
+
+    默认列与 load_sensor_csv 的输出一致；as_pandas=False 时返回 pyarrow.Table。
+    """
+    table = open_dataset(root).to_table(columns=list(columns),
+                                        filter=build_filter(sensor, channels, start, end, run))
+    if "datetime" in table.column_names:
+        table = table.take(pc.sort_indices(table, [("datetime", "ascending")]))
+    if not as_pandas:
+        return table
+    return table.to_pandas()
+
+
+def bench(root="databases/data_csv", store=STORE_ROOT):
+    print(f"{'query':<48} {'rows':>7} {'csv s':>7} {'parquet s':>10}")
+    for run_dir in run_folders(root):
+        df = load_sensor_csv(run_dir / "temperature.csv")
+        mid = df["datetime"].min() + (df["datetime"].max() - df["datetime"].min()) / 2
+        start, end = mid.floor("D"), mid.floor("D") + pd.Timedelta(hours=6)
+        cases = {
+            f"{run_dir.name} temperature (all)": dict(sensor="temperature", run=run_dir.name),
+            f"{run_dir.name} temperature ch1, 6 h": dict(sensor="temperature", run=run_dir.name,
+                                                         channels=[1], start=start, end=end),
+        }
+        for name, kwargs in cases.items():
+            t = time.perf_counter()
+            full = load_sensor_csv(run_dir / "temperature.csv")
+            if "channels" in kwargs:
+                full = full[full["channel"].isin(kwargs["channels"])
+                            & (full["datetime"] >= start) & (full["datetime"] < end)]
+            csv_s = time.perf_counter() - t
+            t = time.perf_counter()
+            result = query(root=store, **kwargs)
+            parquet_s = time.perf_counter() - t
+            assert len(result) == len(full)
+            print(f"{name:<48} {len(result):>7} {csv_s:>7.3f} {parquet_s:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("ingest", "bench"))
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--out", default=STORE_ROOT)
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        start = time.perf_counter()
+        for run, rows in ingest_all(args.root, args.out, args.pattern).items():
+            print(f"{run}: {rows} rows")
+        size = sum(p.stat().st_size for p in Path(args.out).rglob("*.parquet"))
+        print(f"written to {args.out} ({size / 2 ** 20:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    else:
+        bench(args.root, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""传感器时序绘图：一次分组所有通道，按像素降采样后再交给 matplotlib。
+
+    python plotting.py                                   # 所有 run / 传感器 / 通道 -> Charts/sensors/*.png
+    python plotting.py --method lttb --points 1500 --workers 4
+    python plotting.py --method none                     # 不降采样，作为耗时对比
+
+    from plotting import plot_channels
+    fig = plot_channels(load_sensor_csv(path))           # 不经过 pyplot，不会阻塞
+    fig.savefig("maxigauge.png")
+
+降采样方法：
+    minmax  每个像素列保留第一个、最后一个、最小、最大值（M4），画出的折线与原始数据几乎一致，尖峰不会丢失
+    lttb    Largest-Triangle-Three-Buckets，保留视觉形状，点数固定为 points
+    none    原始数据
+批量模式在进程池中并行渲染，每张图的读取 / 降采样 / 绘制耗时写入 out_dir/render_times.csv。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from data_loader import load_sensor_csv
+from resampler import SENSORS, run_folders
+
+FIG_WIDTH = 6  # 英寸
+DPI = 200
+METHODS = ("minmax", "lttb", "none")
+
+
+def group_channels(df):
+    """按通道分组（一次排序），返回 {channel: (datetime64[ns] 数组, value 数组)}，组内按时间排序。"""
+    channel = df["channel"].to_numpy()
+    t = df["datetime"].to_numpy().astype("datetime64[ns]")
+    value = df["value"].to_numpy(dtype=np.float64)
+    order = np.lexsort((t, channel))
+    channel, t, value = channel[order], t[order], value[order]
+    bounds = np.flatnonzero(channel[1:] != channel[:-1]) + 1
+    return {int(c[0]): (ts, vs) for c, ts, vs in zip(np.split(channel, bounds), np.split(t, bounds),
+                                                       np.split(value, bounds)) if len(c)}
+
+
+def minmax_indices(x, y, bins):
+    """x 升序。把 x 的范围等分为 bins 列，每列保留首、尾、最小、最大值的下标（升序）。"""
+    n = len(x)
+    if n <= 4 * bins:
+        return np.arange(n)
+    col = np.minimum(((x - x[0]) * (bins / max(float(x[-1] - x[0]), 1.0))).astype(np.int64), bins - 1)
+    starts = np.flatnonzero(np.concatenate(([True], col[1:] != col[:-1])))
+    ends = np.append(starts[1:], n) - 1
+    # 列内最值用 reduceat 一次算出，再取每列第一个等于最值的位置
+    counts = np.diff(np.append(starts, n))
+    index = np.arange(n)
+    lo = np.minimum.reduceat(np.where(y == np.repeat(np.minimum.reduceat(y, starts), counts), index, n), starts)
+    hi = np.minimum.reduceat(np.where(y == np.repeat(np.maximum.reduceat(y, starts), counts), index, n), starts)
+    return np.unique(np.concatenate((starts, ends, lo, hi)))
+
+
+def lttb_indices(x, y, points):
+    """Largest-Triangle-Three-Buckets。下一个桶的均值用前缀和一次算出，循环里只剩每个桶的 argmax。"""
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    x = x - x[0]
+    edges = np.append(np.linspace(1, n - 1, points - 1).astype(np.int64), n)  # points-2 个内部桶 + 末点
+    cx, cy = np.concatenate(([0], np.cumsum(x))), np.concatenate(([0], np.cumsum(y)))
+    lo, hi = edges[1:-1], edges[2:]
+    next_x = (cx[hi] - cx[lo]) / (hi - lo)
+    next_y = (cy[hi] - cy[lo]) / (hi - lo)
+
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        s, e = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (next_y[i] - y[a]))
+        a = s + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(t, value, points, method="minmax"):
+    """返回降采样后的 (t, value)；缺失值先去掉。"""
+    ok = ~np.isnan(value)
+    if not ok.all():
+        t, value = t[ok], value[ok]
+    if method == "none" or not len(t):
+        return t, value
+    x = t.view(np.int64)
+    if method == "minmax":
+        keep = minmax_indices(x, value, max(points // 4, 1))
+    elif method == "lttb":
+        keep = lttb_indices(x, value, points)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    return t[keep], value[keep]
+
+
+def _new_figure(height):
+    fig = Figure(figsize=(FIG_WIDTH, height), dpi=DPI)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _format_time_axis(ax):
+    # 自动选择刻度间隔，不再逐个遍历刻度标签
+    locator = mdates.AutoDateLocator(maxticks=8)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.xaxis.get_offset_text().set_fontsize(5)
+
+
+def plot_channels(df, title=None, method="minmax", points=None, fig=None, channels=None):
+    """每个通道一个子图（共享时间轴）。fig 为 None 时新建不依赖 pyplot 的 Figure。"""
+    groups = group_channels(df)
+    if channels is not None:
+        groups = {c: groups[c] for c in channels if c in groups}
+    points = points or FIG_WIDTH * DPI
+    if fig is None:
+        fig = _new_figure(max(len(groups), 1) * 1.5)
+    axes = fig.subplots(nrows=max(len(groups), 1), ncols=1, sharex=True, squeeze=False)[:, 0]
+    for ax, (channel, (t, value)) in zip(axes, groups.items()):
+        t, value = downsample(t, value, points, method)
+        ax.plot(t, value, color="b", linewidth=0.6, label=f"Channel {channel}")
+        ax.set_ylabel("Value", fontsize=5)
+        ax.set_title(f"Time Series for Channel {channel}", fontsize=6)
+        ax.legend(fontsize=5)
+        ax.grid(True)
+        ax.tick_params(labelsize=5)
+    _format_time_axis(axes[-1])
+    axes[-1].set_xlabel("Time", fontsize=5)
+    if title:
+        fig.suptitle(title, fontsize=7)
+    fig.tight_layout()
+    return fig
+
+
+def _render_job(path, out_dir, method, points):
+    """一个传感器文件：读取一次，每个通道一张 PNG。返回每张图的耗时记录。"""
+    path = Path(path)
+    start = time.perf_counter()
+    df = load_sensor_csv(path)
+    load_s = time.perf_counter() - start
+    rows = []
+    for channel, (t, value) in group_channels(df).items():
+        start = time.perf_counter()
+        t_ds, v_ds = downsample(t, value, points, method)
+        downsample_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fig = _new_figure(1.5)
+        ax = fig.subplots()
+        ax.plot(t_ds, v_ds, color="b", linewidth=0.6)
+        _format_time_axis(ax)
+        ax.tick_params(labelsize=5)
+        ax.set_title(f"{path.parent.name} {path.stem} channel {channel}", fontsize=6)
+        ax.grid(True)
+        fig.subplots_adjust(left=0.1, right=0.98, bottom=0.18, top=0.86)  # 尺寸固定，不用 tight_layout
+        out = Path(out_dir) / f"{path.parent.name}_{path.stem}_ch{channel}.png"
+        fig.savefig(out)
+        render_s = time.perf_counter() - start
+        rows.append({"run": path.parent.name, "sensor": path.stem, "channel": channel, "raw_points": len(t),
+                     "drawn_points": len(t_ds), "load_s": load_s, "downsample_s": downsample_s,
+                     "render_s": render_s, "png": str(out)})
+    return rows
+
+
+def render_runs(root="databases/data_csv", out_dir="Charts/sensors", pattern="cd*", method="minmax",
+                points=None, workers=None, sensors=SENSORS):
+    """把每个 run 的每个传感器通道渲染成 PNG（无界面），返回耗时表并写入 out_dir/render_times.csv。"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [run / f"{s}.csv" for run in run_folders(root, pattern) for s in sensors if (run / f"{s}.csv").exists()]
+    points = points or FIG_WIDTH * DPI
+    workers = min(workers or os.cpu_count(), len(paths)) or 1
+    if workers == 1:
+        results = [_render_job(p, out_dir, method, points) for p in paths]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_render_job, paths, [out_dir] * len(paths), [method] * len(paths),
+                                    [points] * len(paths)))
+    times = pd.DataFrame([row for rows in results for row in rows])
+    times.to_csv(out_dir / "render_times.csv", index=False)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--out", default="Charts/sensors")
+    parser.add_argument("--method", default="minmax", choices=METHODS)
+    parser.add_argument("--points", type=int, default=None, help="points per channel, default = figure width in px")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    times = render_runs(args.root, args.out, args.pattern, args.method, args.points, args.workers)
+    wall = time.perf_counter() - start
+    print(f"{len(times)} PNGs in {args.out} ({args.method}), wall {wall:.2f}s")
+    print(f"raw points {times['raw_points'].sum()}, drawn {times['drawn_points'].sum()}")
+    print(f"per chart: downsample {times['downsample_s'].mean() * 1000:.1f} ms, "
+          f"render {times['render_s'].mean() * 1000:.1f} ms (max {times['render_s'].max() * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""把各传感器通道重采样到统一的时间网格（默认 30 秒），每个 run 文件夹输出一张对齐的多通道表。
+
+    from resampler import resample_run, resample_runs
+    frame = resample_run("databases/data_csv/cd230926")        # index=datetime, 列如 cooling_channel0
+    frames = resample_runs("databases/data_csv", workers=4)    # {"cd230831": frame, ...}
+
+    python resampler.py --freq 30s --max-gap 5min --out databases/processed_data/resampled
+
+插值：同一 run 内所有传感器共用一个网格（floor(最早时刻) .. ceil(最晚时刻)）。所有通道的
+时间轴首尾相接拼成一条单调的时间轴后只调用一次 np.interp；同一通道同一时刻的重复读数取均值
+（与 pivot_table 一致）。网格点两侧相邻样本的间隔超过 max_gap 时不做线性桥接，置为 NaN；
+通道首个样本之前/最后一个样本之后的网格点，距最近样本不超过 max_gap 时取该样本值，否则为 NaN。
+max_gap=None 时与原来 data_imterpolate.py 的行为相同（全部桥接，两端取端点值）。
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_sensor_csv
+
+SENSORS = ("cooling", "maxigauge", "temperature")
+DEFAULT_FREQ = "30s"
+DEFAULT_MAX_GAP = "5min"
+
+
+def make_grid(start, end, freq=DEFAULT_FREQ):
+    """向下/向上取整到 freq 的等间隔网格。"""
+    return pd.date_range(pd.Timestamp(start).floor(freq), pd.Timestamp(end).ceil(freq), freq=freq)
+
+
+def _channel_series(df):
+    """按 (channel, datetime) 排序并对重复时刻取均值，返回 channels, ptr, times(ns), values。"""
+    channel = df["channel"].to_numpy()
+    stamps = df["datetime"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    values = df["value"].to_numpy(dtype=np.float64)
+    order = np.lexsort((stamps, channel))
+    channel, stamps, values = channel[order], stamps[order], values[order]
+
+    first = np.ones(len(stamps), dtype=bool)
+    first[1:] = (channel[1:] != channel[:-1]) | (stamps[1:] != stamps[:-1])
+    starts = np.flatnonzero(first)
+    counts = np.diff(np.append(starts, len(stamps)))
+    values = np.add.reduceat(values, starts) / counts if len(starts) else values
+    channel, stamps = channel[starts], stamps[starts]
+
+    channels, ptr = np.unique(channel, return_index=True)
+    ptr = np.append(ptr, len(channel))
+    return channels, ptr, stamps, values
+
+
+def resample_channels(df, grid=None, freq=DEFAULT_FREQ, max_gap=DEFAULT_MAX_GAP, prefix=""):
+    """df: load_sensor_csv 的输出（datetime, channel, value）。返回 index=grid 的 float32 宽表。"""
+    if grid is None:
+        grid = make_grid(df["datetime"].min(), df["datetime"].max(), freq)
+    channels, ptr, stamps, values = _channel_series(df)
+    columns = [f"{prefix}channel{int(c)}" for c in channels]
+    num_channels, num_points = len(channels), len(grid)
+    if num_channels == 0:
+        return pd.DataFrame(index=grid.rename("datetime"), columns=columns, dtype=np.float32)
+
+    # 相对秒数（float64 精度足够到微秒）；第 c 个通道整体平移 c * span，使拼接后的时间轴严格递增
+    origin = min(int(stamps.min()), grid[0].value)
+    t = (stamps - origin) / 1e9
+    g = (grid.asi8 - origin) / 1e9
+    span = max(t.max(), g[-1]) + 1.0
+    sample_shift = np.repeat(np.arange(num_channels) * span, np.diff(ptr))
+    grid_shift = np.repeat(np.arange(num_channels) * span, num_points)
+    big_t = t + sample_shift
+    big_g = np.tile(g, num_channels) + grid_shift
+    out = np.interp(big_g, big_t, values)
+
+    # 每个通道两端按端点值外推（np.interp 在拼接轴上会插到相邻通道去）
+    lo = np.repeat(ptr[:-1], num_points)
+    hi = np.repeat(ptr[1:] - 1, num_points)
+    gg = np.tile(g, num_channels)
+    before, after = gg <= t[lo], gg >= t[hi]
+    out[before] = values[lo[before]]
+    out[after] = values[hi[after]]
+
+    if max_gap is not None:
+        limit = pd.Timedelta(max_gap).total_seconds()
+        nxt = np.clip(np.searchsorted(big_t, big_g, side="left"), lo, hi)
+        prev = np.clip(nxt - 1, lo, hi)
+        exact = t[nxt] == gg
+        bridged = t[nxt] - t[prev]
+        invalid = ~exact & (bridged > limit)
+        invalid[before] = (t[lo] - gg)[before] > limit
+        invalid[after] = (gg - t[hi])[after] > limit
+        out[invalid] = np.nan
+
+    frame = pd.DataFrame(out.reshape(num_channels, num_points).T.astype(np.float32),
+                         index=grid.rename("datetime"), columns=columns)
+    return frame
+
+
+def resample_run(run_dir, freq=DEFAULT_FREQ, max_gap=DEFAULT_MAX_GAP, sensors=SENSORS):
+    """一个 run 文件夹内所有传感器共用一个网格，返回按列拼接的对齐表。"""
+    run_dir = Path(run_dir)
+    data = {name: load_sensor_csv(run_dir / f"{name}.csv") for name in sensors
+            if (run_dir / f"{name}.csv").exists()}
+    if not data:
+        raise FileNotFoundError(f"No sensor CSV in {run_dir}")
+    grid = make_grid(min(df["datetime"].min() for df in data.values()),
+                     max(df["datetime"].max() for df in data.values()), freq)
+    return pd.concat([resample_channels(df, grid, freq, max_gap, prefix=f"{name}_") for name, df in data.items()],
+                     axis=1)
+
+
+def _resample_job(run_dir, freq, max_gap, out_dir, fmt):
+    frame = resample_run(run_dir, freq, max_gap)
+    if out_dir is None:
+        return frame
+    path = Path(out_dir) / f"{Path(run_dir).name}.{fmt}"
+    if fmt == "parquet":
+        frame.to_parquet(path)
+    else:
+        frame.to_csv(path)
+    return path
+
+
+def run_folders(root="databases/data_csv", pattern="cd*"):
+    return sorted(p for p in Path(root).glob(pattern) if p.is_dir())
+
+
+def resample_runs(root="databases/data_csv", pattern="cd*", freq=DEFAULT_FREQ, max_gap=DEFAULT_MAX_GAP,
+                  workers=None, out_dir=None, fmt="csv"):
+    """每个 run 文件夹交给一个工作进程。out_dir 为 None 时返回 {run: frame}，否则写文件并返回 {run: path}。"""
+    folders = run_folders(root, pattern)
+    if out_dir is not None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count(), len(folders)) or 1
+    if workers == 1:
+        results = [_resample_job(f, freq, max_gap, out_dir, fmt) for f in folders]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_resample_job, folders, [freq] * len(folders), [max_gap] * len(folders),
+                                    [out_dir] * len(folders), [fmt] * len(folders)))
+    return {f.name: result for f, result in zip(folders, results)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--freq", default=DEFAULT_FREQ)
+    parser.add_argument("--max-gap", default=DEFAULT_MAX_GAP, help="'none' bridges every gap")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="databases/processed_data/resampled")
+    parser.add_argument("--format", default="csv", choices=("csv", "parquet"))
+    args = parser.parse_args()
+
+    max_gap = None if args.max_gap.lower() == "none" else args.max_gap
+    for run, path in resample_runs(args.root, args.pattern, args.freq, max_gap, args.workers,
+                                   args.out, args.format).items():
+        print(f"{run}: {path}")
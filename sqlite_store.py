@@ -0,0 +1,254 @@
+"""SQLite 时序存储：原始读数 + 1 分钟 / 15 分钟 / 1 小时 rollup（min / max / mean）。
+
+    python sqlite_store.py load                               # databases/data_csv/cd* -> databases/sensors.db
+    python sqlite_store.py query --sensor temperature --channel 1 --start 2023-09-01 --end 2023-09-20 --resolution 1h
+    python sqlite_store.py bench
+
+    from sqlite_store import SensorDB
+    with SensorDB("databases/sensors.db") as db:
+        db.insert("temperature", df)                 # df: load_sensor_csv 的输出
+        hourly = db.query("temperature", channels=[1], start="2023-09-01", resolution="1h")
+
+表结构：
+    readings(sensor, channel, ts, value)           ts 为毫秒时间戳，(sensor, channel, ts) 唯一
+    rollup_60 / rollup_900 / rollup_3600(sensor, channel, bucket, count, sum, min, max)
+rollup 在每次 insert 时按批次聚合后 UPSERT 合并，count/sum 累加、min/max 取极值，
+因此可以分批、乱序写入。库中已有的读数不会重复写入，rollup 只合并新写入的行，
+重复 load 同一次运行不改变数据。查询时选择粒度不超过 resolution 的最粗 rollup，
+resolution 小于 1 分钟或未给出时读原始数据。
+"""
+import argparse
+import sqlite3
+import time
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_sensor_csv
+from resampler import SENSORS, run_folders
+
+DB_PATH = "databases/sensors.db"
+ROLLUPS = (60, 900, 3600)  # 秒，从细到粗
+BATCH_SIZE = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    sensor TEXT NOT NULL,
+    channel INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS readings_key ON readings (sensor, channel, ts);
+DROP INDEX IF EXISTS readings_sensor_channel_ts;
+"""
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_{seconds} (
+    sensor TEXT NOT NULL,
+    channel INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (sensor, channel, bucket)
+) WITHOUT ROWID;
+"""
+ROLLUP_UPSERT = """
+INSERT INTO rollup_{seconds} (sensor, channel, bucket, count, sum, min, max) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (sensor, channel, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    sum = sum + excluded.sum,
+    min = min(min, excluded.min),
+    max = max(max, excluded.max)
+"""
+
+
+def _to_ms(value):
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def _resolution_seconds(resolution):
+    if resolution is None:
+        return 0
+    if isinstance(resolution, (int, float)):
+        return resolution
+    return pd.Timedelta(resolution).total_seconds()
+
+
+class SensorDB:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        try:
+            self.conn.executescript(SCHEMA + "".join(ROLLUP_SCHEMA.format(seconds=s) for s in ROLLUPS))
+        except sqlite3.IntegrityError as exc:
+            raise ValueError(f"{path} already holds duplicate readings (loaded more than once by an older "
+                             f"version); rebuild it with `sqlite_store.py load`") from exc
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- 写入 ----
+    def insert(self, sensor, df, batch_size=BATCH_SIZE):
+        """写入 (datetime, channel, value) 数据，并增量更新所有 rollup。返回新写入的行数。
+
+        库中已有的 (channel, 时刻) 以及 df 内重复的读数（保留第一条）被跳过，不计入 rollup。
+        """
+        channel = df["channel"].to_numpy().astype(np.int64)
+        ts = df["datetime"].to_numpy().astype("datetime64[ms]").view(np.int64)
+        value = df["value"].to_numpy().astype(np.float64)
+        with self.conn:
+            new = self._new_rows(sensor, channel, ts)
+            channel, ts, value = channel[new], ts[new], value[new]
+            for lo in range(0, len(ts), batch_size):
+                hi = lo + batch_size
+                self.conn.executemany("INSERT OR IGNORE INTO readings VALUES (?, ?, ?, ?)",
+                                      zip(repeat(sensor), channel[lo:hi].tolist(), ts[lo:hi].tolist(),
+                                          value[lo:hi].tolist()))
+            for seconds in ROLLUPS:
+                self.conn.executemany(ROLLUP_UPSERT.format(seconds=seconds),
+                                      self._aggregate(sensor, channel, ts, value, seconds))
+        return len(ts)
+
+    def _new_rows(self, sensor, channel, ts):
+        """库中还没有的行的布尔掩码；(channel, ts) 编码成一个整数键后用 np.isin 比较。"""
+        if not len(ts):
+            return np.zeros(0, dtype=bool)
+        c0, t0 = int(channel.min()), int(ts.min())
+        span = int(channel.max()) - c0 + 1
+        key = (ts - t0) * span + (channel - c0)
+        new = np.zeros(len(key), dtype=bool)
+        new[np.unique(key, return_index=True)[1]] = True
+        existing = np.array(self.conn.execute(
+            "SELECT channel, ts FROM readings WHERE sensor = ? AND channel BETWEEN ? AND ? AND ts BETWEEN ? AND ?",
+            (sensor, c0, c0 + span - 1, t0, int(ts.max()))).fetchall(), dtype=np.int64).reshape(-1, 2)
+        if len(existing):
+            new &= ~np.isin(key, (existing[:, 1] - t0) * span + (existing[:, 0] - c0))
+        return new
+
+    @staticmethod
+    def _aggregate(sensor, channel, ts, value, seconds):
+        """按 (channel, bucket) 聚合一批数据（排序 + reduceat），bucket 为桶起点的毫秒时间戳。"""
+        bucket = ts // (seconds * 1000) * (seconds * 1000)
+        keep = ~np.isnan(value)
+        channel, bucket, value = channel[keep], bucket[keep], value[keep]
+        if not len(value):
+            return []
+        order = np.lexsort((bucket, channel))
+        channel, bucket, value = channel[order], bucket[order], value[order]
+        first = np.ones(len(value), dtype=bool)
+        first[1:] = (channel[1:] != channel[:-1]) | (bucket[1:] != bucket[:-1])
+        starts = np.flatnonzero(first)
+        count = np.diff(np.append(starts, len(value)))
+        return zip(repeat(sensor), channel[starts].tolist(), bucket[starts].tolist(), count.tolist(),
+                   np.add.reduceat(value, starts).tolist(), np.minimum.reduceat(value, starts).tolist(),
+                   np.maximum.reduceat(value, starts).tolist())
+
+    def load_csv(self, path, sensor=None):
+        return self.insert(sensor or Path(path).stem, load_sensor_csv(path))
+
+    def load_run(self, run_dir, sensors=SENSORS):
+        run_dir = Path(run_dir)
+        return sum(self.load_csv(run_dir / f"{s}.csv", s) for s in sensors if (run_dir / f"{s}.csv").exists())
+
+    # ---- 查询 ----
+    @staticmethod
+    def choose_table(resolution=None):
+        """粒度不超过 resolution 的最粗 rollup；都不满足时返回 (readings, 0)。"""
+        seconds = _resolution_seconds(resolution)
+        usable = [s for s in ROLLUPS if s <= seconds]
+        return (f"rollup_{usable[-1]}", usable[-1]) if usable else ("readings", 0)
+
+    def query(self, sensor, channels=None, start=None, end=None, resolution=None):
+        """时间区间 [start, end)。原始数据返回 datetime/channel/value，
+        rollup 返回 datetime（桶起点）/channel/mean/min/max/count。"""
+        table, seconds = self.choose_table(resolution)
+        time_col = "ts" if seconds == 0 else "bucket"
+        where, params = ["sensor = ?"], [sensor]
+        if channels is not None:
+            channels = list(channels)
+            where.append(f"channel IN ({', '.join('?' * len(channels))})")
+            params += [int(c) for c in channels]
+        if start is not None:
+            start_ms = _to_ms(start)
+            if seconds:
+                start_ms = start_ms // (seconds * 1000) * (seconds * 1000)  # 包含 start 所在的桶
+            where.append(f"{time_col} >= ?")
+            params.append(start_ms)
+        if end is not None:
+            where.append(f"{time_col} < ?")
+            params.append(_to_ms(end))
+
+        if seconds == 0:
+            sql = f"SELECT ts, channel, value FROM readings WHERE {' AND '.join(where)} ORDER BY ts, channel"
+            columns = ["datetime", "channel", "value"]
+        else:
+            sql = (f"SELECT bucket, channel, sum / count, min, max, count FROM {table} "
+                   f"WHERE {' AND '.join(where)} ORDER BY bucket, channel")
+            columns = ["datetime", "channel", "mean", "min", "max", "count"]
+        df = pd.DataFrame(self.conn.execute(sql, params).fetchall(), columns=columns)
+        df["datetime"] = pd.to_datetime(df["datetime"], unit="ms")
+        return df
+
+
+def bench(path):
+    """长时间窗口：原始数据上 GROUP BY 聚合 vs. 直接读 rollup。"""
+    with SensorDB(path) as db:
+        lo, hi = db.conn.execute("SELECT min(ts), max(ts) FROM readings WHERE sensor = 'temperature'").fetchone()
+        print(f"{'resolution':>10} {'table':>12} {'rows':>7} {'raw scan s':>11} {'rollup s':>9}")
+        for resolution in ("1min", "15min", "1h"):
+            seconds = int(pd.Timedelta(resolution).total_seconds())
+            t = time.perf_counter()
+            raw = db.conn.execute(
+                "SELECT ts / ? * ? AS b, channel, avg(value), min(value), max(value) FROM readings "
+                "WHERE sensor = 'temperature' AND ts >= ? AND ts < ? GROUP BY channel, b",
+                (seconds * 1000, seconds * 1000, lo, hi + 1)).fetchall()
+            raw_s = time.perf_counter() - t
+            t = time.perf_counter()
+            rolled = db.query("temperature", start=pd.Timestamp(lo, unit="ms"),
+                              end=pd.Timestamp(hi + 1, unit="ms"), resolution=resolution)
+            rollup_s = time.perf_counter() - t
+            assert len(raw) == len(rolled)
+            print(f"{resolution:>10} {db.choose_table(resolution)[0]:>12} {len(rolled):>7} {raw_s:>11.3f} {rollup_s:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("load", "query", "bench"))
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--root", default="databases/data_csv")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--sensor", default="temperature")
+    parser.add_argument("--channel", type=int, nargs="*", default=None)
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--resolution", default=None, help="e.g. 30s, 15min, 1h")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        start = time.perf_counter()
+        with SensorDB(args.db) as db:
+            for run_dir in run_folders(args.root, args.pattern):
+                print(f"{run_dir.name}: {db.load_run(run_dir)} rows")
+        print(f"loaded into {args.db} in {time.perf_counter() - start:.1f}s")
+    elif args.command == "query":
+        with SensorDB(args.db) as db:
+            print(f"reading from {db.choose_table(args.resolution)[0]}")
+            print(db.query(args.sensor, args.channel, args.start, args.end, args.resolution))
+    else:
+        bench(args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""流式传感器数据管道：分块回放 / 跟踪 CSV，逐块做通道合并、IQR 异常值过滤和平滑，输出到 sink。
+
+    python stream_pipeline.py replay --speed 0              # 不限速回放所有 run，作为吞吐基准
+    python stream_pipeline.py replay --speed 100 --db databases/sensors.db
+    python stream_pipeline.py tail databases/live           # 跟踪目录下持续追加的 CSV
+
+每个传感器一个 StreamProcessor，每个通道保存固定大小的滚动状态，内存与数据总量无关：
+    IQR 过滤   当前值与前 iqr_window 个原始值的四分位数比较，超出 [Q1 - k*IQR, Q3 + k*IQR] 记为 outlier
+    移动平均   最近 ma_window 个非 outlier 值的均值（列 smooth）
+    低通滤波   一阶 IIR  y[n] = y[n-1] + alpha * (x[n] - y[n-1])，只作用于非 outlier 值（列 lowpass）
+输出块的列：datetime, channel, value, outlier, smooth, lowpass（outlier 行的 smooth/lowpass 为 NaN）。
+
+sink 是任何带 write(sensor, frame) 方法的对象，例如 SQLiteSink 或异常检测器。
+"""
+import argparse
+import asyncio
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from data_loader import csv_columns, normalize_frame
+from resampler import SENSORS, run_folders
+
+CHUNK_SIZE = 5000
+
+
+class ChannelState:
+    __slots__ = ("window", "ma_tail", "zi")
+
+    def __init__(self):
+        self.window = np.empty(0)  # 最近 iqr_window 个原始值
+        self.ma_tail = np.empty(0)  # 最近 ma_window - 1 个非 outlier 值
+        self.zi = None  # 低通滤波器状态
+
+
+class StreamProcessor:
+    def __init__(self, iqr_window=120, iqr_k=1.5, min_periods=20, ma_window=10, alpha=0.2):
+        self.iqr_window = iqr_window
+        self.iqr_k = iqr_k
+        self.min_periods = min_periods
+        self.ma_window = ma_window
+        self.alpha = alpha
+        self.channels = {}
+
+    def process(self, chunk):
+        """chunk: (datetime, channel, value)。按通道分段处理后恢复原来的行顺序。"""
+        channel = chunk["channel"].to_numpy()
+        value = chunk["value"].to_numpy(dtype=np.float64)
+        order = np.argsort(channel, kind="stable")
+        bounds = np.flatnonzero(np.diff(channel[order])) + 1
+        outlier = np.zeros(len(value), dtype=bool)
+        smooth = np.full(len(value), np.nan)
+        lowpass = np.full(len(value), np.nan)
+        for rows in np.split(order, bounds):
+            if not len(rows):
+                continue
+            state = self.channels.setdefault(int(channel[rows[0]]), ChannelState())
+            outlier[rows], smooth[rows], lowpass[rows] = self._process_channel(state, value[rows])
+        return chunk.assign(outlier=outlier, smooth=smooth, lowpass=lowpass)
+
+    def _process_channel(self, state, x):
+        n = len(x)
+        # IQR：把上一块留下的窗口接在前面，用前 iqr_window 个值（不含当前值）的四分位数判断
+        history = pd.Series(np.concatenate((state.window, x)))
+        rolling = history.shift(1).rolling(self.iqr_window, min_periods=self.min_periods)
+        q1 = rolling.quantile(0.25).to_numpy()[-n:]
+        q3 = rolling.quantile(0.75).to_numpy()[-n:]
+        spread = self.iqr_k * (q3 - q1)
+        with np.errstate(invalid="ignore"):
+            outlier = (x < q1 - spread) | (x > q3 + spread)  # 窗口未满（NaN）时不判为 outlier
+        state.window = history.to_numpy()[-self.iqr_window:]
+
+        clean = x[~outlier]
+        smooth = np.full(n, np.nan)
+        lowpass = np.full(n, np.nan)
+        if len(clean):
+            values = np.concatenate((state.ma_tail, clean))
+            ma = pd.Series(values).rolling(self.ma_window, min_periods=1).mean().to_numpy()
+            smooth[~outlier] = ma[-len(clean):]
+            state.ma_tail = values[-(self.ma_window - 1):] if self.ma_window > 1 else values[:0]
+
+            if state.zi is None:
+                state.zi = np.array([(1 - self.alpha) * clean[0]])  # 从第一个值起步，避免从 0 爬升
+            lowpass[~outlier], state.zi = lfilter([self.alpha], [1, self.alpha - 1], clean, zi=state.zi)
+        return outlier, smooth, lowpass
+
+
+# ---- 数据源：异步迭代器，每次产出一个 (datetime, channel, value) 块 ----
+async def replay_source(path, chunksize=CHUNK_SIZE):
+    columns, dtypes = csv_columns(path)
+    with pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield normalize_frame(chunk)
+            await asyncio.sleep(0)  # 让出事件循环，各传感器流交替推进
+
+
+async def tail_source(path, poll_interval=1.0, chunksize=CHUNK_SIZE, from_start=False):
+    """跟踪持续追加的 CSV（类似 tail -f），只解析完整的行。"""
+    path = Path(path)
+    while not path.exists():
+        await asyncio.sleep(poll_interval)
+    columns, dtypes = csv_columns(path)
+    with open(path, "r", newline="") as f:
+        header = f.readline()
+        if not from_start:
+            f.seek(0, io.SEEK_END)
+        partial = ""
+        while True:
+            lines = f.readlines(chunksize * 64)
+            if not lines:
+                await asyncio.sleep(poll_interval)
+                continue
+            lines[0] = partial + lines[0]
+            partial = "" if lines[-1].endswith("\n") else lines.pop()
+            if lines:
+                chunk = pd.read_csv(io.StringIO(header + "".join(lines)), usecols=columns, dtype=dtypes)
+                yield normalize_frame(chunk)
+
+
+class ReplayClock:
+    """回放时钟：数据时刻 t 对应墙钟 start + (t - t0) / speed；speed 为 0 或 None 时不限速。"""
+
+    def __init__(self, t0, speed):
+        self.t0 = pd.Timestamp(t0)
+        self.speed = speed
+        self.start = time.perf_counter()
+
+    async def wait_until(self, t):
+        if not self.speed:
+            return
+        delay = (pd.Timestamp(t) - self.t0).total_seconds() / self.speed - (time.perf_counter() - self.start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# ---- sink ----
+class SQLiteSink:
+    """非 outlier 的原始值写入 SensorDB（rollup 随之增量更新）。"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def write(self, sensor, frame):
+        self.db.insert(sensor, frame[~frame["outlier"].to_numpy()])
+
+
+class StatsSink:
+    def __init__(self):
+        self.rows = 0
+        self.outliers = 0
+        self.first = None
+        self.last = None
+
+    def write(self, sensor, frame):
+        if not len(frame):
+            return
+        self.rows += len(frame)
+        self.outliers += int(frame["outlier"].sum())
+        lo, hi = frame["datetime"].min(), frame["datetime"].max()
+        self.first = lo if self.first is None else min(self.first, lo)
+        self.last = hi if self.last is None else max(self.last, hi)
+
+
+async def pump(sensor, source, processor, sinks, clock=None):
+    async for chunk in source:
+        if clock is not None and len(chunk):
+            await clock.wait_until(chunk["datetime"].iloc[-1])
+        frame = processor.process(chunk)
+        for sink in sinks:
+            sink.write(sensor, frame)
+
+
+async def replay_run(run_dir, sinks, speed=100.0, chunksize=CHUNK_SIZE, sensors=SENSORS, **processor_kwargs):
+    """按数据时间戳以 speed 倍速并发回放一个 run 的所有传感器。"""
+    run_dir = Path(run_dir)
+    paths = {s: run_dir / f"{s}.csv" for s in sensors if (run_dir / f"{s}.csv").exists()}
+    first = [pd.read_csv(p, usecols=["datetime"], nrows=1)["datetime"].iloc[0] for p in paths.values()]
+    clock = ReplayClock(min(pd.to_datetime(first)), speed)
+    await asyncio.gather(*(pump(s, replay_source(p, chunksize), StreamProcessor(**processor_kwargs), sinks, clock)
+                           for s, p in paths.items()))
+
+
+async def tail_dir(directory, sinks, poll_interval=1.0, sensors=SENSORS, **processor_kwargs):
+    directory = Path(directory)
+    await asyncio.gather(*(pump(s, tail_source(directory / f"{s}.csv", poll_interval),
+                                StreamProcessor(**processor_kwargs), sinks)
+                           for s in sensors))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("replay", "tail"))
+    parser.add_argument("path", nargs="?", default="databases/data_csv",
+                        help="replay: folder of cd* runs; tail: folder with live CSVs")
+    parser.add_argument("--speed", type=float, default=100.0, help="replay speed factor, 0 = unlimited")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", default=None, help="also write to a SensorDB file")
+    args = parser.parse_args()
+
+    stats = StatsSink()
+    sinks = [stats]
+    db = None
+    if args.db:
+        from sqlite_store import SensorDB
+        db = SensorDB(args.db)
+        sinks.append(SQLiteSink(db))
+
+    try:
+        if args.command == "tail":
+            asyncio.run(tail_dir(args.path, sinks))
+            return
+        print(f"{'run':>10} {'rows':>8} {'outliers':>9} {'seconds':>8} {'rows/s':>9} {'x real time':>12}")
+        for run_dir in run_folders(args.path):
+            stats.__init__()
+            start = time.perf_counter()
+            asyncio.run(replay_run(run_dir, sinks, args.speed, args.chunksize))
+            seconds = time.perf_counter() - start
+            span = (stats.last - stats.first).total_seconds()
+            print(f"{run_dir.name:>10} {stats.rows:>8} {stats.outliers:>9} {seconds:>8.2f} "
+                  f"{stats.rows / seconds:>9.0f} {span / seconds:>12.0f}")
+    finally:
+        if db is not None:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
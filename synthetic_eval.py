@@ -0,0 +1,365 @@
+"""合成时序质量评估：替代笔记本中 TimeSeriesEvaluator / HybridModelEvaluator 的逐序列循环。
+
+    python synthetic_eval.py databases/processed_data/windows/runs.npy databases/synthetic_data/hybrid.npy \\
+        --columns cooling_channel10 temperature_channel1 maxigauge_channel3 --seq-len 120 --window 12
+    python synthetic_eval.py real.npy synth.npy --subsamples 50 --subsample-size 200 --fail-above dtw=0.8 ks=0.2
+
+    from synthetic_eval import evaluate
+    report = evaluate(real, synth, window=12)              # real / synth: (N, T, F)，同一缩放空间
+
+指标（与笔记本同名的含义一致）：
+    dtw          成对 (real_i, synth_i) 的 DTW，逐特征计算后取平均（平方代价累加后开方，同 dtaidistance）
+    nn_dtw       每条合成序列到最近真实序列的 DTW（LB_Keogh 下界排序剪枝，只对可能更近的候选算精确 DTW）
+    ks           逐特征 KS 统计量的平均
+    acf_diff     每条序列 1..max_lag 阶自相关（FFT 批量计算）的平均值之差，取绝对值再平均
+    predictive   用前 window 步线性预测下一步，真实 / 合成两组 MSE 之差（最小二乘，不逐点循环）
+    discriminative  1 - 逻辑回归区分真实 / 合成的准确率（需要 scikit-learn，默认不算）
+
+DTW 用 Sakoe-Chiba 带宽 window（|i - j| <= window），按反对角线推进，每一步对所有序列对、带内所有
+单元同时计算。序列对按块分给进程池。subsamples > 0 时改为抽 subsamples 次、每次 subsample_size 对，
+各指标给出均值与百分位置信区间，抽样之间在进程池中并行。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.stats import ks_2samp
+
+METRICS = ("dtw", "nn_dtw", "ks", "acf_diff", "predictive", "discriminative")
+DEFAULT_METRICS = ("dtw", "ks", "acf_diff", "predictive")
+
+
+def dtw_batch(a, b, window=None, cutoff=None, groups=1):
+    """a: (P, n)，b: (P, m)。返回 P 对序列的 DTW 距离。
+
+    单元 (i, j) 只依赖反对角线 i + j - 1 与 i + j - 2，所以按反对角线循环 n + m - 1 次，
+    每次对所有序列对和带内单元一起做向量运算。缓冲区下标整体右移一位，下标 0 恒为 inf 作边界。
+
+    cutoff: 每组一个阈值（连续 groups 行为一组，组距离 = 组内 DTW 平均）。任何路径都经过相邻两条
+    反对角线之一，两条线上的最小值是最终距离的下界；组下界超过 cutoff 的提前放弃，结果记为 inf。
+    """
+    # 转置成 (时间, 序列对)：每条反对角线上的带内单元是连续的几行，向量运算沿序列对方向连续访问
+    a = np.ascontiguousarray(np.asarray(a, dtype=np.float64).T)
+    b = np.ascontiguousarray(np.asarray(b, dtype=np.float64)[:, ::-1].T)  # 反转后 j 递减变为下标递增
+    n, P = a.shape
+    m = b.shape[0]
+    w = max(n, m) if window is None else max(int(window), abs(n - m))
+    bufs = [np.full((n + 1, P), np.inf) for _ in range(3)]
+    written = [None] * 3
+    alive = np.arange(P // groups)
+    cutoff = None if cutoff is None else np.asarray(cutoff, dtype=np.float64)
+    for k in range(n + m - 1):
+        lo, hi = max(0, k - m + 1, (k - w + 1) // 2), min(n - 1, k, (k + w) // 2)
+        cur, prev1, prev2 = bufs[k % 3], bufs[(k - 1) % 3], bufs[(k - 2) % 3]
+        if written[k % 3] is not None:
+            cur[written[k % 3][0]:written[k % 3][1]] = np.inf  # 只清掉三步前写过的区段
+        cost = a[lo:hi + 1] - b[m - 1 - k + lo:m - k + hi]
+        cost *= cost
+        if k:
+            # 左 (i, j-1) 与上 (i-1, j) 在 k-1 上，对角 (i-1, j-1) 在 k-2 上
+            cost += np.minimum(np.minimum(prev1[lo + 1:hi + 2], prev1[lo:hi + 1]), prev2[lo:hi + 1])
+        cur[lo + 1:hi + 2] = cost
+        written[k % 3] = (lo + 1, hi + 2)
+        if cutoff is not None and k % 8 == 7 and len(alive):
+            start, stop = written[(k - 1) % 3]
+            bound = np.minimum(cost.min(axis=0), prev1[start:stop].min(axis=0))
+            keep = np.sqrt(bound).reshape(-1, groups).mean(axis=1) <= cutoff[alive]
+            if not keep.all():
+                cols = np.repeat(keep, groups)
+                a, b, alive = a[:, cols], b[:, cols], alive[keep]
+                bufs = [buf[:, cols] for buf in bufs]
+    out = np.full(P, np.inf)
+    out[(alive[:, None] * groups + np.arange(groups)).ravel()] = np.sqrt(bufs[(n + m - 2) % 3][n])
+    return out
+
+
+def _dtw_job(a, b, window):
+    return dtw_batch(a, b, window)
+
+
+def _features_as_rows(x):
+    """(N, T, F) -> (N * F, T)，每行一条单变量序列。"""
+    return np.ascontiguousarray(np.swapaxes(x, 1, 2)).reshape(-1, x.shape[1])
+
+
+def paired_dtw(real, synth, window=None, workers=1, chunk=2048):
+    """real_i 与 synth_i 逐特征 DTW 的平均，返回 (N,)。(序列, 特征) 行按 chunk 分块交给进程池。"""
+    N, _, F = real.shape
+    a, b = _features_as_rows(real), _features_as_rows(synth)
+    bounds = range(0, len(a), chunk)
+    if workers == 1 or len(a) <= chunk:
+        d = np.concatenate([dtw_batch(a[i:i + chunk], b[i:i + chunk], window) for i in bounds])
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            d = np.concatenate(list(pool.map(_dtw_job, [a[i:i + chunk] for i in bounds],
+                                             [b[i:i + chunk] for i in bounds], [window] * len(bounds))))
+    return d.reshape(N, F).mean(axis=1)
+
+
+def envelope(x, window):
+    """LB_Keogh 用的上下包络：(N, T, F) 沿时间轴 2 * window + 1 的滑动最大 / 最小值。"""
+    size = 2 * (x.shape[1] if window is None else int(window)) + 1
+    return maximum_filter1d(x, size, axis=1, mode="nearest"), minimum_filter1d(x, size, axis=1, mode="nearest")
+
+
+def lb_keogh(query, upper, lower):
+    """query: (Q, T, F)；upper / lower: (R, T, F)。返回 (Q, R)，每个元素不大于对应的逐特征 DTW 平均。"""
+    q = query[:, None]
+    excess = np.maximum(q - upper[None], 0) + np.maximum(lower[None] - q, 0)
+    return np.sqrt(np.einsum("qrtf,qrtf->qrf", excess, excess)).mean(axis=2)
+
+
+def _nn_job(query, reference, window, candidates):
+    """query 中每条序列到 reference 的最近 DTW 距离，以及实际计算精确 DTW 的对数。"""
+    upper, lower = (e.astype(np.float32) for e in envelope(reference, window))  # 下界用 float32 即可
+    Q, R, F = len(query), len(reference), query.shape[2]
+    step = max(1, (1 << 22) // reference[0].size // R)  # 下界按 query 分块，中间数组约 4M 个元素
+    q32 = query.astype(np.float32)  # 乘 (1 - 1e-5) 抵消 float32 舍入，保证仍是下界
+    lb = np.concatenate([lb_keogh(q32[i:i + step], upper, lower) for i in range(0, Q, step)]) * (1 - 1e-5)
+    order = np.argsort(lb, axis=1)
+    lb_sorted = np.take_along_axis(lb, order, axis=1)
+    best = np.full(Q, np.inf)
+    pos = np.zeros(Q, dtype=np.int64)
+    exact, take = 0, 1
+    q_rows = _features_as_rows(query).reshape(Q, F, -1)
+    r_rows = _features_as_rows(reference).reshape(R, F, -1)
+    while True:
+        # 每轮给每条仍可能改进的 query 取下一批 take 个候选（按下界升序，take 从 1 倍增到 candidates），
+        # 下界不小于当前最优的直接剪掉；精确 DTW 超过当前最优时提前放弃
+        active = np.flatnonzero((pos < R) & (lb_sorted[np.arange(Q), np.minimum(pos, R - 1)] < best))
+        if not len(active):
+            break
+        cols = pos[active, None] + np.arange(take)
+        valid = (cols < R)
+        cols = np.minimum(cols, R - 1)
+        valid &= lb_sorted[active[:, None], cols] < best[active, None]
+        qi, slot = np.nonzero(valid)
+        qi, ri = active[qi], order[active[qi], cols[qi, slot]]
+        d = dtw_batch(q_rows[qi].reshape(-1, q_rows.shape[2]), r_rows[ri].reshape(-1, r_rows.shape[2]),
+                      window, cutoff=best[qi], groups=F).reshape(-1, F).mean(axis=1)
+        np.minimum.at(best, qi, d)
+        exact += len(qi)
+        pos[active] += take
+        take = min(2 * take, candidates)
+    return best, exact
+
+
+def nearest_dtw(query, reference, window=None, workers=1, candidates=8):
+    """每条 query 到 reference 的最近逐特征平均 DTW，返回 (距离 (Q,), 精确 DTW 次数占 Q * R 的比例)。"""
+    Q = len(query)
+    if workers == 1 or Q < 2 * workers:
+        best, exact = _nn_job(query, reference, window, candidates)
+    else:
+        parts = np.array_split(np.arange(Q), workers)
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_nn_job, [query[p] for p in parts], [reference] * workers,
+                                    [window] * workers, [candidates] * workers))
+        best = np.concatenate([r[0] for r in results])
+        exact = sum(r[1] for r in results)
+    return best, exact / (Q * len(reference))
+
+
+def autocorrelation(x, max_lag):
+    """(N, T, F) 中每条序列每个特征的 0..max_lag 阶自相关，返回 (N, max_lag + 1, F)。零填充到 2T 后一次 rfft。"""
+    x = x - x.mean(axis=1, keepdims=True)
+    T = x.shape[1]
+    spec = np.fft.rfft(x, n=2 * T, axis=1)
+    acov = np.fft.irfft(spec * spec.conj(), n=2 * T, axis=1)[:, :max_lag + 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return acov / acov[:, :1]  # 常数序列得 NaN，求平均时忽略
+
+
+def acf_difference(real, synth, max_lag=10):
+    """返回 (平均绝对差, 真实平均自相关 (max_lag, F), 合成平均自相关 (max_lag, F))，不含 0 阶。"""
+    real_acf = np.nanmean(autocorrelation(real, max_lag)[:, 1:], axis=0)
+    synth_acf = np.nanmean(autocorrelation(synth, max_lag)[:, 1:], axis=0)
+    return float(np.nanmean(np.abs(real_acf - synth_acf))), real_acf, synth_acf
+
+
+def ks_statistics(real, synth):
+    """逐特征 KS 统计量（所有时间步展平），返回 (平均, 逐特征)。"""
+    stat = ks_2samp(real.reshape(-1, real.shape[2]), synth.reshape(-1, synth.shape[2]), axis=0).statistic
+    return float(np.mean(stat)), np.asarray(stat)
+
+
+def _lagged(x, window):
+    """(N, T, F) -> X: (N * (T - window), window * F), Y: (N * (T - window), F)，用视图代替逐点循环。"""
+    X = sliding_window_view(x, window, axis=1)[:, :-1]  # (N, T - window, F, window)
+    X = X.transpose(0, 1, 3, 2).reshape(-1, window * x.shape[2])  # 每行同笔记本 seq[t - window:t].flatten()
+    return X, x[:, window:].reshape(-1, x.shape[2])
+
+
+def predictive_score(real, synth, window=5, test_size=0.3, seed=42, ridge=1e-6):
+    """同笔记本：两组数据各自用前 window 步线性回归下一步，返回测试 MSE 之差的绝对值。
+
+    相邻时间步的特征几乎共线，纯最小二乘在个别测试行上会给出极大的误差，所以解正规方程时
+    加 ridge * trace / 维数 的对角项（对条件良好的数据几乎没有影响）。
+    """
+    rng = np.random.default_rng(seed)
+    mse = []
+    for data in (real, synth):
+        X, Y = _lagged(np.asarray(data, dtype=np.float64), window)
+        X = np.hstack([X, np.ones((len(X), 1))])
+        test = rng.random(len(X)) < test_size
+        gram = X[~test].T @ X[~test]
+        gram[np.diag_indices_from(gram)] += ridge * np.trace(gram) / len(gram)
+        coef = np.linalg.solve(gram, X[~test].T @ Y[~test])
+        mse.append(float(np.mean((X[test] @ coef - Y[test]) ** 2)))
+    return abs(mse[0] - mse[1])
+
+
+def discriminative_score(real, synth, test_size=0.3, seed=42):
+    """同笔记本：标准化后逻辑回归区分真实 / 合成，返回 1 - 测试准确率。"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X = np.concatenate([real.reshape(len(real), -1), synth.reshape(len(synth), -1)])
+    y = np.concatenate([np.ones(len(real)), np.zeros(len(synth))])
+    X = StandardScaler().fit_transform(np.nan_to_num(X))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+    clf = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+    return 1.0 - float((clf.predict(X_test) == y_test).mean())
+
+
+def _metrics(real, synth, metrics, window, max_lag, workers):
+    out = {}
+    if "dtw" in metrics:
+        out["dtw"] = float(paired_dtw(real, synth, window, workers).mean())
+    if "nn_dtw" in metrics:
+        dist, out["nn_dtw_exact_fraction"] = nearest_dtw(synth, real, window, workers)
+        out["nn_dtw"] = float(dist.mean())
+    if "ks" in metrics:
+        out["ks"] = ks_statistics(real, synth)[0]
+    if "acf_diff" in metrics:
+        out["acf_diff"] = acf_difference(real, synth, max_lag)[0]
+    if "predictive" in metrics:
+        out["predictive"] = predictive_score(real, synth)
+    if "discriminative" in metrics:
+        out["discriminative"] = discriminative_score(real, synth)
+    return out
+
+
+def _subsample_job(real, synth, idx, metrics, window, max_lag):
+    return _metrics(real[idx], synth[idx], metrics, window, max_lag, 1)
+
+
+def evaluate(real, synth, metrics=DEFAULT_METRICS, window=None, max_lag=10, workers=None, subsamples=0,
+             subsample_size=256, ci=0.95, seed=0):
+    """real / synth: (N, T, F)，dtw 需要两者窗口数相同（成对比较）。
+
+    subsamples == 0：全量计算，返回 {指标: 值}。
+    subsamples > 0：每次无放回抽 subsample_size 个下标（real 与 synth 用同一组），
+    返回 {指标: {"mean", "lo", "hi"}}，lo / hi 为 ci 百分位区间。
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {sorted(unknown)}")
+    n = min(len(real), len(synth))
+    real, synth = np.asarray(real[:n], dtype=np.float64), np.asarray(synth[:n], dtype=np.float64)
+    workers = workers or os.cpu_count()
+    if not subsamples:
+        return _metrics(real, synth, metrics, window, max_lag, workers)
+
+    rng = np.random.default_rng(seed)
+    size = min(subsample_size, n)
+    draws = [np.sort(rng.choice(n, size, replace=False)) for _ in range(subsamples)]
+    workers = min(workers, subsamples)
+    if workers == 1:
+        results = [_subsample_job(real, synth, d, metrics, window, max_lag) for d in draws]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_subsample_job, [real] * subsamples, [synth] * subsamples, draws,
+                                    [metrics] * subsamples, [window] * subsamples, [max_lag] * subsamples))
+    alpha = (1 - ci) / 2
+    report = {}
+    for key in results[0]:
+        values = np.array([r[key] for r in results])
+        report[key] = {"mean": float(values.mean()), "lo": float(np.quantile(values, alpha)),
+                       "hi": float(np.quantile(values, 1 - alpha))}
+    return report
+
+
+def gate(report, limits):
+    """limits: {指标: 上限}。有置信区间时用区间上界比较。返回超限的 {指标: 值}。"""
+    failed = {}
+    for key, limit in limits.items():
+        value = report[key]["hi"] if isinstance(report[key], dict) else report[key]
+        if value > limit:
+            failed[key] = value
+    return failed
+
+
+def load_windows(path, seq_len, stride=None, columns=None):
+    """.npy（windowing 的输出，读同名 .json 取列名与分段）或 CSV / Parquet -> (N, seq_len, F) 窗口，默认不重叠。"""
+    from windowing import WindowDataset
+
+    path = Path(path)
+    stride = stride or seq_len
+    if path.suffix == ".npy":
+        meta = path.with_suffix(".json")
+        ds = WindowDataset.load(path, seq_len, stride) if meta.exists() else \
+            WindowDataset(np.load(path, mmap_mode="r"), seq_len, stride)
+        x = ds.windows[ds.starts]
+        if columns is not None:
+            names = ds.columns or [f"feature_{i}" for i in range(x.shape[2])]
+            x = x[:, :, [names.index(c) for c in columns]]
+        return x
+    frame = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    frame = frame[list(columns)] if columns is not None else frame.select_dtypes("number")
+    ds = WindowDataset(frame.to_numpy(np.float32), seq_len, stride)
+    return ds.windows[ds.starts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("real")
+    parser.add_argument("synthetic")
+    parser.add_argument("--columns", nargs="*", default=None, help="channels to compare (looked up in both files)")
+    parser.add_argument("--synthetic-columns", nargs="*", default=None, help="if named differently in the synthetic file")
+    parser.add_argument("--seq-len", type=int, default=120)
+    parser.add_argument("--stride", type=int, default=None, help="default: non-overlapping windows")
+    parser.add_argument("--metrics", nargs="*", default=list(DEFAULT_METRICS), choices=METRICS)
+    parser.add_argument("--window", type=int, default=None, help="Sakoe-Chiba radius; default unconstrained")
+    parser.add_argument("--max-lag", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--subsamples", type=int, default=0)
+    parser.add_argument("--subsample-size", type=int, default=256)
+    parser.add_argument("--ci", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fail-above", nargs="*", default=[], help="metric=limit pairs; exit 1 if exceeded")
+    parser.add_argument("--json", default=None, help="also write the report here")
+    args = parser.parse_args()
+
+    real = load_windows(args.real, args.seq_len, args.stride, args.columns)
+    synth = load_windows(args.synthetic, args.seq_len, args.stride, args.synthetic_columns or args.columns)
+    start = time.perf_counter()
+    report = evaluate(real, synth, args.metrics, args.window, args.max_lag, args.workers, args.subsamples,
+                      args.subsample_size, args.ci, args.seed)
+    seconds = time.perf_counter() - start
+    print(f"{min(len(real), len(synth))} window pairs of {args.seq_len} x {real.shape[2]}, {seconds:.2f}s")
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(f"{key:>22}: {value['mean']:.4f}  [{value['lo']:.4f}, {value['hi']:.4f}]")
+        else:
+            print(f"{key:>22}: {value:.4f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=1))
+
+    limits = {k: float(v) for k, v in (item.split("=", 1) for item in args.fail_above)}
+    failed = gate(report, limits)
+    if failed:
+        print("FAILED: " + ", ".join(f"{k} {v:.4f} > {limits[k]}" for k, v in failed.items()))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""按需批量生成合成传感器序列：TimeGAN 生成器 + 每个特征一个 ARIMA（RNN_TimeGan_with_ARIMA.ipynb 中的 HybridARIMAGenerator）。
+
+    python synthetic_generator.py --windows 10000 --out databases/synthetic_data/hybrid.parquet
+    python synthetic_generator.py --windows 100000 --out databases/synthetic_data/hybrid.npy --arima simulate
+    python synthetic_generator.py --fit databases/processed_data/TimeGAN_data.csv   # 重新拟合 14 个 ARIMA
+
+    from synthetic_generator import SyntheticSensorGenerator
+    gen = SyntheticSensorGenerator(columns=["cooling_channel10", "temperature_channel1", "maxigauge_channel3"],
+                                   inverse_scale=True)
+    for batch in gen.iter_windows(1000, seed=0):     # (batch, seq_len, 特征) float32
+        ...
+
+与笔记本的区别：
+    - 模型只在第一次用到时加载一次（生成器整体加载，ARIMA 按特征加载），之后都从缓存取；
+    - 生成器一次推理 batch_size 个窗口，而不是每个样本调用一次；
+    - ARIMA 的 forecast 是确定的，每个特征只算一次；arima="simulate" 时在预测值上叠加
+      按 ARMA 参数滤波的随机新息，同一批窗口一次算完；
+    - ARIMA 的加载 / 拟合在进程池里按特征并行；
+    - 结果以生成器形式逐批返回，或直接写 .npy（内存映射）/ .parquet，不经过 CSV。
+合成值 = 0.7 * ARIMA + 0.3 * 生成器输出（取两者共同的前几个特征），位于 MinMax(-1, 1) 缩放空间；
+inverse_scale=True 时用 correlation.csv 中对应通道的 min / max 还原到物理量。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from anomaly_detector import STATS_PATH, load_channel_stats
+
+MODEL_DIR = "Simulation for sensor data"
+GENERATORS = {
+    "rnn": "saved_models_rnn/best_generator.h5",  # 完整 Keras 模型
+    "timegan_arima": "saved_models_timegan_with_arima/generator.weights.h5",  # 只有权重，按 TimeGAN.build_generator 重建
+}
+ARIMA_DIR = "saved_hybrid_models"
+ARIMA_MODES = ("forecast", "simulate", "none")
+ARIMA_WEIGHT, GAN_WEIGHT = 0.7, 0.3
+SEQ_LEN = 120
+OUT_DIR = "databases/synthetic_data"
+
+
+def arima_paths(model_dir=MODEL_DIR, arima_dir=ARIMA_DIR):
+    """best_arima_feature_{i}.pkl，按特征编号排序。"""
+    paths = Path(model_dir, arima_dir).glob("best_arima_feature_*.pkl")
+    return sorted(paths, key=lambda p: int(p.stem.rsplit("_", 1)[1]))
+
+
+def _arima_job(path, seq_len):
+    """在子进程中加载一个 ARIMA 结果，只把生成需要的数组传回主进程。"""
+    import joblib
+
+    res = joblib.load(path)
+    _, d, _ = res.model.order
+    return {"forecast": np.asarray(res.forecast(steps=seq_len), dtype=np.float64),
+            "ar": np.concatenate(([1.0], -np.asarray(res.arparams, dtype=np.float64))),
+            "ma": np.concatenate(([1.0], np.asarray(res.maparams, dtype=np.float64))),
+            "sigma": float(np.sqrt(np.asarray(res.params)[-1])), "d": int(d)}
+
+
+def _fit_job(series, order, path):
+    from statsmodels.tsa.arima.model import ARIMA
+    import joblib
+
+    res = ARIMA(pd.Series(series), order=order).fit()
+    joblib.dump(res, path)
+    return float(res.aic)
+
+
+def fit_arima(data, model_dir=MODEL_DIR, arima_dir=ARIMA_DIR, order=(1, 0, 1), window=SEQ_LEN, workers=None):
+    """data: (行, 特征)，已缩放到 (-1, 1)。同笔记本，用最后 window 行为每个特征拟合一个 ARIMA 并保存，返回 AIC 列表。"""
+    data = np.asarray(data, dtype=np.float64)[-window:]
+    out = Path(model_dir, arima_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = [out / f"best_arima_feature_{i}.pkl" for i in range(data.shape[1])]
+    series = [data[:, i] for i in range(data.shape[1])]
+    workers = min(workers or os.cpu_count(), len(paths)) or 1
+    if workers == 1:
+        return [_fit_job(s, order, p) for s, p in zip(series, paths)]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_fit_job, series, [order] * len(paths), paths))
+
+
+def scale_from_csv(path, columns=None, feature_range=(-1, 1)):
+    """同笔记本的 load_and_preprocess_data：非有限值用列均值替换后 MinMax 缩放，返回 (数组, 列名)。"""
+    df = pd.read_csv(path)
+    df = df[list(columns)] if columns is not None else df.select_dtypes("number")
+    x = df.to_numpy(np.float64)
+    x = np.where(np.isfinite(x), x, np.nanmean(np.where(np.isfinite(x), x, np.nan), axis=0))
+    lo, hi = x.min(axis=0), x.max(axis=0)
+    a, b = feature_range
+    return a + (x - lo) * (b - a) / np.where(hi > lo, hi - lo, 1.0), list(df.columns)
+
+
+class SyntheticSensorGenerator:
+    """模型目录中的生成器与 ARIMA 只在第一次使用时加载并缓存。
+
+    generator: GENERATORS 中的名字或 .h5 路径；arima: forecast（同笔记本）/ simulate / none。
+    columns 只用于输出列名与 inverse_scale，顺序应与 ARIMA 特征编号一致。
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, generator="rnn", arima="forecast", seq_len=SEQ_LEN, columns=None,
+                 inverse_scale=False, stats_path=STATS_PATH, batch_size=1024, workers=None):
+        if arima not in ARIMA_MODES:
+            raise ValueError(f"Unknown arima mode: {arima}")
+        self.model_dir = Path(model_dir)
+        self.generator_path = self.model_dir / GENERATORS.get(generator, generator)
+        self.arima = arima
+        self.seq_len = seq_len
+        self.columns = list(columns) if columns is not None else None
+        self.inverse_scale = inverse_scale
+        self.stats_path = stats_path
+        self.batch_size = batch_size
+        self.workers = workers
+        self.arima_files = arima_paths(model_dir) if arima != "none" else []
+        self._model = None
+        self._arima = {}  # 特征编号 -> _arima_job 的结果
+
+    @property
+    def model(self):
+        if self._model is None:
+            import tensorflow as tf
+
+            if self.generator_path.name.endswith(".weights.h5"):
+                self._model = _build_timegan_generator(tf, len(self.arima_files) or len(self.columns or ()))
+                self._model.load_weights(str(self.generator_path))
+            else:
+                self._model = tf.keras.models.load_model(str(self.generator_path), compile=False)
+        return self._model
+
+    @property
+    def n_features(self):
+        dims = self.model.output_shape[-1]
+        return min(dims, len(self.arima_files)) if self.arima_files else dims
+
+    def load_arima(self, features=None):
+        """把尚未缓存的特征在进程池中并行加载（并预先算好 forecast）。"""
+        features = [i for i in (range(self.n_features) if features is None else features) if i not in self._arima]
+        if not features:
+            return self._arima
+        paths = [self.arima_files[i] for i in features]
+        workers = min(self.workers or os.cpu_count(), len(paths)) or 1
+        if workers == 1:
+            results = [_arima_job(p, self.seq_len) for p in paths]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(_arima_job, paths, [self.seq_len] * len(paths)))
+        self._arima.update(zip(features, results))
+        return self._arima
+
+    def _scale(self):
+        names = self.columns[:self.n_features] if self.columns else None
+        if names is None or len(names) < self.n_features:
+            raise ValueError("inverse_scale needs one column name per generated feature")
+        stats = load_channel_stats(self.stats_path).loc[names]
+        lo, hi = stats["min"].to_numpy(np.float64), stats["max"].to_numpy(np.float64)
+        return lo, hi - lo
+
+    def _arima_part(self, n, rng):
+        """(n, seq_len, 特征)：forecast 广播到每个窗口；simulate 再加上 ARMA 滤波后的新息。"""
+        arima = self.load_arima()
+        forecast = np.stack([arima[i]["forecast"] for i in range(self.n_features)], axis=1)
+        if self.arima == "forecast":
+            return np.broadcast_to(forecast, (n, self.seq_len, self.n_features))
+        out = np.empty((n, self.seq_len, self.n_features))
+        for i in range(self.n_features):
+            a = arima[i]
+            # 预测误差 = sum_j psi_j * eps_{T+h-j}，即零初值的 ARMA 滤波；d 阶差分再累加 d 次
+            dev = lfilter(a["ma"], a["ar"], rng.standard_normal((n, self.seq_len)) * a["sigma"], axis=1)
+            for _ in range(a["d"]):
+                dev = np.cumsum(dev, axis=1)
+            out[:, :, i] = forecast[:, i] + dev
+        return out
+
+    def sample(self, n, rng=None):
+        """n 个窗口，返回 (n, seq_len, 特征) float32。生成器按 batch_size 分块推理。"""
+        rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        model, k = self.model, self.n_features
+        out = np.empty((n, self.seq_len, k), dtype=np.float32)
+        for start in range(0, n, self.batch_size):
+            m = min(self.batch_size, n - start)
+            noise = rng.standard_normal((m, self.seq_len, model.input_shape[-1]), dtype=np.float32)
+            out[start:start + m] = np.asarray(model(noise, training=False))[:, :, :k]
+        if self.arima != "none":
+            out *= GAN_WEIGHT
+            out += ARIMA_WEIGHT * self._arima_part(n, rng)
+        if self.inverse_scale:
+            lo, span = self._scale()
+            out += 1
+            out *= (span / 2).astype(np.float32)
+            out += lo.astype(np.float32)
+        return out
+
+    def iter_windows(self, n_windows, seed=None, batch_windows=None):
+        """逐批产生 (batch, seq_len, 特征) 数组，共 n_windows 个窗口，内存占用与总量无关。"""
+        rng = np.random.default_rng(seed)
+        batch_windows = batch_windows or self.batch_size
+        for start in range(0, n_windows, batch_windows):
+            yield self.sample(min(batch_windows, n_windows - start), rng)
+
+    def column_names(self):
+        if self.columns and len(self.columns) >= self.n_features:
+            return self.columns[:self.n_features]
+        return [f"feature_{i}" for i in range(self.n_features)]
+
+    def to_numpy(self, path, n_windows, seed=None, batch_windows=None):
+        """窗口首尾相接写成 (n_windows * seq_len, 特征) 的 .npy，可用 np.load(mmap_mode="r") 直接读取。"""
+        from numpy.lib.format import open_memmap
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        out = open_memmap(path, mode="w+", dtype=np.float32, shape=(n_windows * self.seq_len, self.n_features))
+        row = 0
+        for batch in self.iter_windows(n_windows, seed, batch_windows):
+            out[row:row + batch.size // self.n_features] = batch.reshape(-1, self.n_features)
+            row += batch.size // self.n_features
+        out.flush()
+        del out
+        return Path(path)
+
+    def to_parquet(self, path, n_windows, seed=None, batch_windows=None, start=None, freq="30s"):
+        """每批一个 row group。start 给定时加一列 datetime（按 freq 递增），否则加 window 列。"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        names = self.column_names()
+        step = pd.Timedelta(freq).value
+        t0 = pd.Timestamp(start).value if start is not None else None
+        writer, row = None, 0
+        try:
+            for batch in self.iter_windows(n_windows, seed, batch_windows):
+                flat = batch.reshape(-1, self.n_features)
+                index = np.arange(row, row + len(flat))
+                if t0 is None:
+                    first = pa.array(index // self.seq_len, type=pa.int64())
+                    arrays, fields = [first], ["window"]
+                else:
+                    arrays, fields = [pa.array((t0 + index * step).astype("datetime64[ns]"))], ["datetime"]
+                arrays += [pa.array(flat[:, i]) for i in range(self.n_features)]
+                table = pa.Table.from_arrays(arrays, names=fields + names)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                row += len(flat)
+        finally:
+            if writer is not None:
+                writer.close()
+        return Path(path)
+
+
+def _build_timegan_generator(tf, n_features, rnn_units=16, dense_units=16, dropout=0.4898095069332775):
+    """RNN_TimeGan_with_ARIMA.ipynb 中 TimeGAN.build_generator 的结构（用于加载 generator.weights.h5）。"""
+    layers = tf.keras.layers
+    inputs = tf.keras.Input(shape=(None, n_features))
+    x = layers.SimpleRNN(rnn_units, return_sequences=True, kernel_initializer="orthogonal")(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(dropout)(x)
+    x = layers.Dense(dense_units, activation="tanh")(x)
+    outputs = layers.TimeDistributed(layers.Dense(n_features, activation="tanh",
+                                                  kernel_initializer="glorot_normal"))(x)
+    return tf.keras.Model(inputs, outputs, name="Generator")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--generator", default="rnn", help=f"one of {sorted(GENERATORS)} or a .h5 path")
+    parser.add_argument("--arima", default="forecast", choices=ARIMA_MODES)
+    parser.add_argument("--windows", type=int, default=1000)
+    parser.add_argument("--seq-len", type=int, default=SEQ_LEN)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--columns", nargs="*", default=None)
+    parser.add_argument("--inverse-scale", action="store_true", help="map back to physical units via correlation.csv")
+    parser.add_argument("--start", default=None, help="first timestamp; adds a datetime column to parquet output")
+    parser.add_argument("--out", default=f"{OUT_DIR}/hybrid_synthetic.parquet", help=".parquet or .npy")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fit", default=None, help="CSV to refit the per-feature ARIMA models on before generating")
+    args = parser.parse_args()
+
+    if args.fit:
+        start = time.perf_counter()
+        data, columns = scale_from_csv(args.fit, args.columns)
+        aic = fit_arima(data, args.model_dir, window=args.seq_len, workers=args.workers)
+        print(f"fitted {len(aic)} ARIMA models in {time.perf_counter() - start:.2f}s, "
+              f"AIC {min(aic):.1f} .. {max(aic):.1f}")
+        args.columns = args.columns or columns
+
+    gen = SyntheticSensorGenerator(args.model_dir, args.generator, args.arima, args.seq_len, args.columns,
+                                   args.inverse_scale, batch_size=args.batch_size, workers=args.workers)
+    start = time.perf_counter()
+    if args.out.endswith(".npy"):
+        path = gen.to_numpy(args.out, args.windows, args.seed)
+    else:
+        path = gen.to_parquet(args.out, args.windows, args.seed, start=args.start)
+    seconds = time.perf_counter() - start
+    steps = args.windows * args.seq_len
+    print(f"{steps} timesteps x {gen.n_features} features -> {path} in {seconds:.2f}s "
+          f"({steps / seconds:,.0f} timesteps/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""共享的滑动窗口数据集：替代各笔记本里的 create_sequences。
+
+    python windowing.py databases/processed_data/TimeGAN_data.csv --out databases/processed_data/windows/timegan.npy
+    python windowing.py --runs databases/data_csv --out databases/processed_data/windows/runs.npy --raw
+
+    from windowing import WindowDataset
+    ds = WindowDataset.load("databases/processed_data/windows/timegan.npy", seq_len=120)
+    ds.windows                                   # (窗口数, seq_len, 通道) 只读视图，不复制
+    for batch in ds.batches(32, seed=0):         # 每次只复制一个 batch
+        ...
+
+源数据只读取一次，写成 float32 .npy，之后用 np.load(mmap_mode="r") 内存映射。窗口是对映射数组的
+跨步视图（np.lib.stride_tricks.sliding_window_view），内存占用与 seq_len 无关；create_sequences
+返回 (n - seq_len + 1) * seq_len 行的副本。
+
+元数据写在同名 .json 中：列名、每列 min / max、数组是否已缩放、各段（run）的行范围。
+窗口不跨段，含 NaN 的窗口默认跳过。--raw 保存原始值，训练时由 batches(scale=True) 逐批缩放。
+"""
+import argparse
+import copy
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from numpy.lib.stride_tricks import sliding_window_view
+
+from resampler import resample_runs
+
+FEATURE_RANGE = (-1.0, 1.0)
+WINDOW_DIR = "databases/processed_data/windows"
+
+
+def create_sequences(data, seq_length):
+    """笔记本 create_sequences 的零拷贝版本：(len - seq_length + 1, seq_length, 通道) 只读视图。"""
+    data = np.asarray(data)
+    return sliding_window_view(data, seq_length, axis=0).swapaxes(1, 2)
+
+
+def _meta_path(path):
+    return Path(path).with_suffix(".json")
+
+
+def _write(path, frames, columns, scaled, feature_range):
+    """frames: 各段的 (行, 通道) float 数组。两遍：先求全局 min / max，再逐段写入内存映射文件。"""
+    lo = np.fmin.reduce([np.fmin.reduce(f, axis=0) for f in frames])  # fmin / fmax 忽略 NaN，全 NaN 列不告警
+    hi = np.fmax.reduce([np.fmax.reduce(f, axis=0) for f in frames])
+    a, b = feature_range
+    span = np.where(hi > lo, hi - lo, 1.0)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    out = open_memmap(path, mode="w+", dtype=np.float32, shape=(sum(len(f) for f in frames), len(columns)))
+    segments, row = [], 0
+    for f in frames:
+        out[row:row + len(f)] = a + (f - lo) * ((b - a) / span) if scaled else f
+        segments.append([row, row + len(f)])
+        row += len(f)
+    out.flush()
+    del out
+    meta = {"columns": list(columns), "min": lo.tolist(), "max": hi.tolist(), "scaled": scaled,
+            "feature_range": list(feature_range), "segments": segments}
+    _meta_path(path).write_text(json.dumps(meta, indent=1))
+    return Path(path)
+
+
+def build_from_csv(source, path, columns=None, scaled=True, feature_range=FEATURE_RANGE):
+    """宽表 CSV / Parquet（如 TimeGAN_data.csv）-> float32 .npy。只读数值列，缺失值保留为 NaN。"""
+    frame = pd.read_parquet(source) if str(source).endswith(".parquet") else pd.read_csv(source)
+    frame = frame[list(columns)] if columns is not None else frame.select_dtypes("number")
+    x = frame.to_numpy(np.float64, copy=True)
+    x[~np.isfinite(x)] = np.nan
+    return _write(path, [x], frame.columns, scaled, feature_range)
+
+
+def build_from_runs(root, path, pattern="cd*", scaled=True, feature_range=FEATURE_RANGE, workers=None):
+    """每个 run 重采样到 30 s 网格（resampler.resample_runs，进程池）后依次写入，每个 run 一段。"""
+    frames = resample_runs(root, pattern, workers=workers)
+    columns = sorted(set().union(*(f.columns for f in frames.values())))
+    arrays = [f.reindex(columns=columns).to_numpy(np.float64) for f in frames.values()]
+    return _write(path, arrays, columns, scaled, feature_range)
+
+
+class WindowDataset:
+    """data: (行, 通道) 数组（通常是内存映射）。窗口起点每 stride 行一个，不跨 segments，可跳过含 NaN 的窗口。"""
+
+    def __init__(self, data, seq_len, stride=1, segments=None, skip_nan=True, data_min=None, data_max=None,
+                 scaled=True, feature_range=FEATURE_RANGE, columns=None):
+        self.data = data
+        self.seq_len = seq_len
+        self.columns = columns
+        self.scaled = scaled
+        self.feature_range = tuple(feature_range)
+        self.data_min = None if data_min is None else np.asarray(data_min, dtype=np.float32)
+        self.data_max = None if data_max is None else np.asarray(data_max, dtype=np.float32)
+        self.windows = create_sequences(data, seq_len)  # (len - seq_len + 1, seq_len, 通道) 视图
+        self.starts = self._starts(segments or [(0, len(data))], stride, skip_nan)
+
+    @classmethod
+    def load(cls, path, seq_len, stride=1, skip_nan=True, mmap_mode="r"):
+        meta = json.loads(_meta_path(path).read_text())
+        return cls(np.load(path, mmap_mode=mmap_mode), seq_len, stride, meta["segments"], skip_nan, meta["min"],
+                   meta["max"], meta["scaled"], meta["feature_range"], meta["columns"])
+
+    def _starts(self, segments, stride, skip_nan):
+        if skip_nan:
+            # 前缀和：窗口 [s, s + seq_len) 内 NaN 行数 = bad[s + seq_len] - bad[s]；按块读取，不整体载入
+            bad = np.zeros(len(self.data) + 1, dtype=np.int64)
+            step = 1 << 20
+            for i in range(0, len(self.data), step):
+                bad[i + 1:i + step + 1] = np.isnan(self.data[i:i + step]).any(axis=1)
+            bad = np.cumsum(bad)
+        starts = []
+        for begin, end in segments:
+            s = np.arange(begin, end - self.seq_len + 1, stride)
+            if skip_nan:
+                s = s[bad[s + self.seq_len] == bad[s]]
+            starts.append(s)
+        return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        """第 i 个有效窗口（视图）。"""
+        return self.windows[self.starts[i]]
+
+    def scale(self, batch):
+        """原始值 -> feature_range，原地修改 batch（float32 副本）。"""
+        a, b = self.feature_range
+        span = np.where(self.data_max > self.data_min, self.data_max - self.data_min, 1).astype(np.float32)
+        batch -= self.data_min
+        batch *= (b - a) / span
+        batch += a
+        return batch
+
+    def inverse_scale(self, batch):
+        a, b = self.feature_range
+        batch = np.asarray(batch, dtype=np.float32)
+        return (batch - a) * ((self.data_max - self.data_min) / (b - a)) + self.data_min
+
+    def batches(self, batch_size=32, shuffle=True, seed=None, drop_last=False, scale=None):
+        """逐个产生 (batch, seq_len, 通道) float32 副本。scale 默认为 not self.scaled（原始数据逐批缩放）。
+
+        打乱的是窗口顺序；批内按起点排序，读内存映射时尽量顺序访问。
+        """
+        scale = not self.scaled if scale is None else scale
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        stop = len(order) - len(order) % batch_size if drop_last else len(order)
+        for i in range(0, stop, batch_size):
+            idx = self.starts[np.sort(order[i:i + batch_size])] if shuffle else self.starts[order[i:i + batch_size]]
+            batch = self.windows[idx].astype(np.float32, copy=False)  # 花式索引只复制这一个 batch
+            yield self.scale(batch) if scale else batch
+
+    def split(self, test_size=0.2):
+        """同笔记本 train_test_split(shuffle=False)：按时间顺序切分起点，返回两个共享同一数组的数据集。"""
+        cut = int(round(len(self) * (1 - test_size)))
+        train, test = copy.copy(self), copy.copy(self)
+        train.starts, test.starts = self.starts[:cut], self.starts[cut:]
+        return train, test
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default="databases/processed_data/TimeGAN_data.csv")
+    parser.add_argument("--runs", default=None, help="build from every run folder under this root instead")
+    parser.add_argument("--pattern", default="cd*")
+    parser.add_argument("--columns", nargs="*", default=None)
+    parser.add_argument("--out", default=f"{WINDOW_DIR}/timegan.npy")
+    parser.add_argument("--raw", action="store_true", help="store unscaled values; batches() scales on the fly")
+    parser.add_argument("--seq-len", type=int, default=120)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.runs:
+        path = build_from_runs(args.runs, args.out, args.pattern, not args.raw, workers=args.workers)
+    else:
+        path = build_from_csv(args.source, args.out, args.columns, not args.raw)
+    build_s = time.perf_counter() - start
+
+    ds = WindowDataset.load(path, args.seq_len)
+    start = time.perf_counter()
+    n = sum(len(b) for b in ds.batches(args.batch_size, seed=0))
+    epoch_s = time.perf_counter() - start
+    copies = len(ds) * args.seq_len * ds.data.shape[1] * 4
+    print(f"{path}: {ds.data.shape[0]} rows x {ds.data.shape[1]} channels ({ds.data.nbytes / 2**20:.1f} MiB), "
+          f"built in {build_s:.2f}s")
+    print(f"{len(ds)} windows of {args.seq_len} (create_sequences would copy {copies / 2**20:.0f} MiB); "
+          f"one shuffled epoch of {n} windows in {epoch_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()